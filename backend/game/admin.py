@@ -1,10 +1,211 @@
-from django.contrib import admin
-from .models import Hostel, Participant, Domain, SelfRating, Game, Round, Action
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from .cache_versions import bump_lobbies
+from .models import (
+    Hostel, Participant, Domain, SelfRating, Game, Lobby, Round, Action, GameScore, HostelStanding,
+    ArchivedRound, ArchivedAction, ArchivedGameScore, ScoreSnapshot, InfluenceScore,
+    DelegationEdgeStat, SuspiciousGroup, ScoringRun,
+)
+from .scoring import calculate_scores_for_round
+from .standings import move_participant
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the database's row estimate for unfiltered changelists of big tables instead of an
+    exact COUNT(*). Filtered lists, and tables under EXACT_BELOW rows, are still counted exactly.
+    """
+    EXACT_BELOW = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_row_count(self.object_list.model)
+            if estimate is not None and estimate >= self.EXACT_BELOW:
+                return estimate
+        return super().count
+
+
+def estimate_row_count(model):
+    """A cheap row-count estimate for `model`'s table, or None if the backend has none."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            # Integer primary keys are the rowid, so both ends are single index seeks.
+            pk = model._meta.pk.column
+            cursor.execute(f'SELECT MAX("{pk}") - MIN("{pk}") + 1 FROM "{table}"')
+            row = cursor.fetchone()
+            return row[0] if row and row[0] is not None else None
+    return None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) Django runs for the "N total" link.
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class LobbyChoiceForm(ActionForm):
+    lobby = forms.ModelChoiceField(queryset=Lobby.objects.select_related('game'), required=False)
+
+
+@admin.register(Participant)
+class ParticipantAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'hostel', 'current_lobby')
+    list_select_related = ('user', 'hostel', 'current_lobby__game')
+    list_filter = ('hostel', 'current_lobby')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('current_lobby',)
+    action_form = LobbyChoiceForm
+    actions = ['reassign_lobby']
+
+    def save_model(self, request, obj, form, change):
+        # Hostel and lobby edits go through the same bookkeeping as the API's membership changes.
+        old = Participant.objects.filter(pk=obj.pk).values('hostel_id', 'current_lobby_id').first() if change else None
+        super().save_model(request, obj, form, change)
+        if old is None:
+            return
+        move_participant(obj, old['hostel_id'], obj.hostel_id)
+        if old['current_lobby_id'] != obj.current_lobby_id:
+            bump_lobbies([old['current_lobby_id'], obj.current_lobby_id])
+
+    @admin.action(description="Move selected participants to the chosen lobby")
+    def reassign_lobby(self, request, queryset):
+        lobby_id = request.POST.get('lobby')
+        lobby = Lobby.objects.filter(id=lobby_id).first() if lobby_id else None
+        if lobby is None:
+            self.message_user(request, "Choose a lobby to move the participants to.", messages.WARNING)
+            return
+        # A participant's game is their own, or else their current lobby's; none means any.
+        other_game = queryset.annotate(
+            effective_game_id=Coalesce('game_id', 'current_lobby__game_id')
+        ).filter(effective_game_id__isnull=False).exclude(effective_game_id=lobby.game_id)
+        if other_game.exists():
+            self.message_user(
+                request, f"{other_game.count()} of the selected participants play in another game than {lobby.name}; nobody was moved.",
+                messages.ERROR,
+            )
+            return
+        old_lobby_ids = set(queryset.exclude(current_lobby=lobby).values_list('current_lobby_id', flat=True))
+        moved = queryset.exclude(current_lobby=lobby).update(current_lobby=lobby)
+        if moved:
+            bump_lobbies((old_lobby_ids - {None}) | {lobby.id})
+        self.message_user(request, f"Moved {moved} participants to {lobby.name}.")
+
+
+@admin.register(Lobby)
+class LobbyAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'game', 'is_active')
+    list_select_related = ('game',)
+    list_filter = ('game', 'is_active')
+    search_fields = ('name',)
+
+
+@admin.register(Round)
+class RoundAdmin(admin.ModelAdmin):
+    list_display = ('id', 'game', 'round_number', 'domain', 'is_completed')
+    list_select_related = ('game', 'domain')
+    list_filter = ('game', 'is_completed')
+    search_fields = ('question_text',)
+    actions = ['score_rounds']
+
+    @admin.action(description="Score and close selected rounds")
+    def score_rounds(self, request, queryset):
+        # Scoring is what closes a round: it also writes the scores, standings, history and
+        # roster snapshot, and a round closed any other way could never be scored afterwards.
+        round_ids = list(queryset.filter(is_completed=False).order_by('game_id', 'round_number').values_list('id', flat=True))
+        for round_id in round_ids:
+            calculate_scores_for_round(round_id)
+        self.message_user(request, f"Scored and closed {len(round_ids)} rounds.")
+
+
+@admin.register(Action)
+class ActionAdmin(LargeTableAdmin):
+    list_display = ('id', 'round', 'participant', 'action_type', 'delegated_to', 'points_awarded')
+    # Action/Round/Participant __str__ follow these relations.
+    list_select_related = ('round__domain', 'participant__user', 'delegated_to__user')
+    list_filter = ('action_type', 'round__game')
+    raw_id_fields = ('round', 'participant', 'delegated_to')
+
+
+@admin.register(GameScore)
+class GameScoreAdmin(LargeTableAdmin):
+    list_display = ('id', 'game', 'participant', 'score')
+    list_select_related = ('game', 'participant__user')
+    list_filter = ('game',)
+    search_fields = ('participant__user__username',)
+    autocomplete_fields = ('participant',)
+
+
+@admin.register(SelfRating)
+class SelfRatingAdmin(LargeTableAdmin):
+    list_display = ('id', 'participant', 'domain', 'rating')
+    list_select_related = ('participant__user', 'domain')
+    list_filter = ('domain',)
+    autocomplete_fields = ('participant',)
+
+
+@admin.register(ScoreSnapshot)
+class ScoreSnapshotAdmin(LargeTableAdmin):
+    list_display = ('id', 'game', 'round_number', 'participant', 'score', 'rank')
+    list_select_related = ('game', 'participant__user')
+    list_filter = ('game',)
+    raw_id_fields = ('participant',)
+
+
+@admin.register(InfluenceScore)
+class InfluenceScoreAdmin(LargeTableAdmin):
+    list_display = ('id', 'game', 'round_number', 'participant', 'reach', 'pagerank')
+    list_select_related = ('game', 'participant__user')
+    list_filter = ('game',)
+    raw_id_fields = ('participant',)
+
+
+@admin.register(DelegationEdgeStat)
+class DelegationEdgeStatAdmin(LargeTableAdmin):
+    list_display = ('id', 'game', 'source', 'target', 'count', 'last_round_number')
+    list_select_related = ('game', 'source__user', 'target__user')
+    list_filter = ('game',)
+    raw_id_fields = ('source', 'target')
+
+
+@admin.register(SuspiciousGroup)
+class SuspiciousGroupAdmin(admin.ModelAdmin):
+    list_display = ('id', 'game', 'kind', 'members_key', 'strength', 'first_round_number', 'last_round_number', 'reviewed')
+    list_select_related = ('game',)
+    list_filter = ('game', 'kind', 'reviewed')
+    list_editable = ('reviewed',)
+
+
+@admin.register(ScoringRun)
+class ScoringRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'game', 'round_number', 'total_ms', 'query_count', 'participants', 'max_chain_depth', 'cycles')
+    list_select_related = ('game',)
+    list_filter = ('game',)
+
+
+@admin.register(ArchivedAction)
+class ArchivedActionAdmin(LargeTableAdmin):
+    list_select_related = ('round', 'participant__user')
+    raw_id_fields = ('round', 'participant', 'delegated_to')
+
 
 admin.site.register(Hostel)
-admin.site.register(Participant)
 admin.site.register(Domain)
-admin.site.register(SelfRating)
 admin.site.register(Game)
-admin.site.register(Round)
-admin.site.register(Action)
\ No newline at end of file
+admin.site.register(HostelStanding)
+admin.site.register(ArchivedRound)
+admin.site.register(ArchivedGameScore)
@@ -0,0 +1,138 @@
+"""
+Optional lobby-affinity mode.
+
+With LOBBY_AFFINITY configured, each app worker owns the lobbies whose id maps to its index
+(lobby_id % WORKER_COUNT) and keeps their roster, open round, that round's actions and the
+leaderboard in memory. The run_lobby_router command sends every gameplay request for a lobby
+to its owner, so the owner can answer lobby reads from memory; submissions are written to the
+DB first and then applied to the in-memory state. After admin writes (scoring, lobby
+assignment, round edits) the router tells every worker to drop its state.
+
+Writes that don't pass through the router (management commands, the Django admin on a worker)
+are caught two ways: a state is reloaded once the round, roster or leaderboard version it was
+built from has moved, which covers any writer sharing the cache, and at the latest STATE_TTL
+seconds after it was loaded.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .cache_versions import get_version
+from .games import open_rounds
+from .models import Action, GameScore, Lobby, Participant
+from .serializers import GameScoreSerializer, RoundSerializer
+
+
+DEFAULT_STATE_TTL = 30
+
+
+def _config():
+    return getattr(settings, 'LOBBY_AFFINITY', {})
+
+
+def is_enabled():
+    config = _config()
+    return config.get('WORKER_COUNT', 0) > 0 and 0 <= config.get('WORKER_INDEX', -1) < config['WORKER_COUNT']
+
+
+def owner_of(lobby_id, worker_count):
+    return lobby_id % worker_count
+
+
+def owns(lobby_id):
+    """True if this worker process is the affinity owner of `lobby_id`."""
+    if not lobby_id or not is_enabled():
+        return False
+    config = _config()
+    return owner_of(lobby_id, config['WORKER_COUNT']) == config['WORKER_INDEX']
+
+
+class LobbyState:
+    """Everything the gameplay reads need for one lobby, loaded in four queries."""
+
+    def __init__(self, lobby_id):
+        self.lobby_id = lobby_id
+        self.lock = threading.Lock()
+        self.loaded_at = time.monotonic()
+        game_id = self.game_id = Lobby.objects.filter(id=lobby_id).values_list('game_id', flat=True).first()
+        # Read before loading, so a write that lands mid-load still marks this state stale.
+        self.versions = self._versions()
+
+        round_obj = open_rounds(game_id).select_related('domain').first()
+        self.round_id = round_obj.id if round_obj else None
+        self.round = RoundSerializer(round_obj).data if round_obj else None
+
+        self.roster = [
+            {'id': p_id, 'username': username}
+            for p_id, username in Participant.objects.filter(current_lobby_id=lobby_id).values_list('id', 'user__username')
+        ]
+
+        # participant id -> delegated_to id (None for SOLVE/PASS) for the open round, by the
+        # lobby each action was submitted from, as the DB-backed graph does.
+        self.actions = {}
+        if self.round_id:
+            self.actions = dict(Action.objects.filter(
+                round_id=self.round_id, lobby_id=lobby_id
+            ).order_by('id').values_list('participant_id', 'delegated_to_id'))
+
+        scores = GameScore.objects.filter(
+            participant__current_lobby_id=lobby_id, game_id=game_id
+        ).select_related('participant__user').order_by('-score')
+        self.leaderboard = GameScoreSerializer(scores, many=True).data
+
+    def _versions(self):
+        return (
+            get_version('round', self.game_id),
+            get_version('roster', self.lobby_id),
+            get_version('leaderboard', self.lobby_id),
+        )
+
+    def is_stale(self):
+        ttl = _config().get('STATE_TTL', DEFAULT_STATE_TTL)
+        return time.monotonic() - self.loaded_at >= ttl or self._versions() != self.versions
+
+    def record_action(self, round_id, participant_id, delegated_to_id):
+        with self.lock:
+            if round_id == self.round_id:
+                self.actions[participant_id] = delegated_to_id
+
+    def delegation_graph(self):
+        with self.lock:
+            nodes = [{'id': str(p['id']), 'data': {'label': p['username']}, 'position': {'x': 0, 'y': 0}} for p in self.roster]
+            edges = [
+                {'id': f"e-{source}-{target}", 'source': str(source), 'target': str(target), 'animated': True}
+                for source, target in self.actions.items()
+                if target is not None
+            ]
+        return {'nodes': nodes, 'edges': edges}
+
+
+class LobbyStateStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.states = {}
+
+    def get(self, lobby_id):
+        with self.lock:
+            state = self.states.get(lobby_id)
+        if state is None or state.is_stale():
+            fresh = LobbyState(lobby_id)
+            with self.lock:
+                current = self.states.get(lobby_id)
+                # Another thread may have reloaded it meanwhile; keep theirs unless it is the stale one.
+                if current is None or current is state:
+                    self.states[lobby_id] = fresh
+                    current = fresh
+            state = current
+        return state
+
+    def reset(self, lobby_id=None):
+        with self.lock:
+            if lobby_id is None:
+                self.states.clear()
+            else:
+                self.states.pop(lobby_id, None)
+
+
+store = LobbyStateStore()
@@ -0,0 +1,80 @@
+from itertools import islice
+
+from django.db import transaction
+
+from .cache_versions import bump_lobbies
+from .models import Action, ArchivedAction, ArchivedGameScore, ArchivedRound, Game, GameScore, Round
+
+DEFAULT_CHUNK_SIZE = 2000
+
+ROUND_FIELDS = ['id', 'game_id', 'domain_id', 'question_text', 'correct_answer', 'is_completed', 'round_number']
+ACTION_FIELDS = ['id', 'round_id', 'participant_id', 'action_type', 'submitted_answer',
+                 'delegated_to_id', 'lobby_id', 'is_solve_correct', 'points_awarded']
+SCORE_FIELDS = ['id', 'game_id', 'participant_id', 'score']
+
+
+def archive_game(game, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Moves an inactive game's rounds, actions and scores into the archive tables in bulk,
+    then deletes them from the live tables. Runs in a single transaction.
+    Returns the number of rows moved per table.
+    """
+    if game.is_active:
+        raise ValueError("Only inactive games can be archived.")
+    if game.is_archived:
+        return {'rounds': 0, 'actions': 0, 'scores': 0}
+
+    with transaction.atomic():
+        moved = {
+            'rounds': _copy(Round.objects.filter(game=game), ArchivedRound, ROUND_FIELDS, chunk_size),
+            'actions': _copy(Action.objects.filter(round__game=game), ArchivedAction, ACTION_FIELDS, chunk_size),
+            'scores': _copy(GameScore.objects.filter(game=game), ArchivedGameScore, SCORE_FIELDS, chunk_size),
+        }
+        # Lobby leaderboards list every score of their members, whatever the game.
+        bump_lobbies(
+            GameScore.objects.filter(game=game).values_list('participant__current_lobby_id', flat=True).distinct(),
+            scopes=('leaderboard',),
+        )
+        # Children first, so each delete is a plain set-based DELETE.
+        Action.objects.filter(round__game=game).delete()
+        GameScore.objects.filter(game=game).delete()
+        Round.objects.filter(game=game).delete()
+
+        game.is_archived = True
+        game.save(update_fields=['is_archived'])
+    return moved
+
+
+def _copy(queryset, archive_model, fields, chunk_size):
+    rows = queryset.order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+    copied = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return copied
+        archive_model.objects.bulk_create([archive_model(**dict(zip(fields, row))) for row in chunk])
+        copied += len(chunk)
+
+
+# --- Read helpers ---
+# Views go through these so archived games stay readable through the same endpoints.
+
+def rounds_for_game(game):
+    return (ArchivedRound if game.is_archived else Round).objects.filter(game=game)
+
+
+def scores_for_game(game):
+    return (ArchivedGameScore if game.is_archived else GameScore).objects.filter(game=game)
+
+
+def actions_for_game(game):
+    return (ArchivedAction if game.is_archived else Action).objects.filter(round__game=game)
+
+
+def find_round(round_id):
+    """Returns the live Round with this id, falling back to the archive; None if neither has it."""
+    return Round.objects.filter(id=round_id).first() or ArchivedRound.objects.filter(id=round_id).first()
+
+
+def archivable_games():
+    return Game.objects.filter(is_active=False, is_archived=False)
@@ -0,0 +1,224 @@
+"""
+Async versions of the read-heavy gameplay endpoints, for deployments served over ASGI.
+
+They return the same payloads as CurrentRoundView, LeaderboardView and DelegationGraphView,
+rendered with the same negotiated renderer (JSON, or MessagePack when asked for), so the
+bytes match too. They also get the same poll throttling and replica reads as their sync
+twins, and share their per-user token buckets. Django's async ORM and async cache API mean
+a waiting request does not pin a worker thread. Payloads are cached under the version
+counters from cache_versions.py when the cache is shared between workers.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache_versions import PAYLOAD_TIMEOUT, aget_version, payload_key, shared_cache
+from .db_router import current_read_alias, read_alias, replica_alias, replica_allowed, replica_payload_timeout
+from .games import active_game_for, open_rounds
+from .models import ArchivedRound, GameScore, Participant, Round
+from .payloads import graph_edges, graph_nodes, round_lobby_id
+from .throttling import get_poll_throttle
+
+_negotiator = DefaultContentNegotiation()
+
+
+def _renderers():
+    # The browsable API needs a DRF view to render into, so these views only offer the data formats.
+    return [cls() for cls in api_settings.DEFAULT_RENDERER_CLASSES if not issubclass(cls, BrowsableAPIRenderer)]
+
+
+def _render(renderer, data, status=200, headers=None):
+    response = HttpResponse(
+        renderer.render(data, renderer.media_type), status=status,
+        content_type=f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type,
+        headers=headers,
+    )
+    response['Vary'] = 'Accept'
+    return response
+
+
+async def _authenticate(request):
+    """
+    Token authentication, matching rest_framework.authentication.TokenAuthentication.
+    Returns (user, participant, None), or (None, None, error) with error as (data, status, headers).
+    """
+    challenge = {'WWW-Authenticate': 'Token'}
+    header = request.headers.get('Authorization', '').split()
+    if not header or header[0].lower() != 'token':
+        return None, None, ({'detail': 'Authentication credentials were not provided.'}, 401, challenge)
+    if len(header) != 2:
+        return None, None, ({'detail': 'Invalid token header. No credentials provided.'}, 401, challenge)
+    token = await Token.objects.select_related('user').filter(key=header[1]).afirst()
+    if token is None:
+        return None, None, ({'detail': 'Invalid token.'}, 401, challenge)
+    if not token.user.is_active:
+        return None, None, ({'detail': 'User inactive or deleted.'}, 401, challenge)
+    participant = await Participant.objects.filter(user=token.user).afirst()
+    return token.user, participant, None
+
+
+async def _cached(key, build):
+    if not shared_cache():
+        return await build()
+    # Same replica handling as payloads.cached.
+    if current_read_alias():
+        key = f"{key}:replica"
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, replica_payload_timeout(PAYLOAD_TIMEOUT))
+    return data
+
+
+class AsyncReadView(View):
+    """
+    What the sync views get from APIView, PollThrottleMixin and ReplicaReadMixin, for async GETs:
+    renderer negotiation, token authentication, poll throttling and replica reads, in that order.
+    Subclasses implement respond(), which returns (data, status).
+    """
+    poll_throttled = False
+    replica_reads = False
+    replica_lag_sensitive = False
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            renderer, _ = _negotiator.select_renderer(Request(request), _renderers())
+        except NotAcceptable as exc:
+            return _render(JSONRenderer(), {'detail': str(exc.detail)}, status=exc.status_code)
+        except Http404:
+            # An unknown ?format=, as DRF answers it.
+            return _render(JSONRenderer(), {'detail': 'Not found.'}, status=404)
+
+        user, participant, error = await _authenticate(request)
+        if error:
+            return _render(renderer, *error)
+
+        throttle, poll_key = get_poll_throttle(), (type(self).__name__, user.pk, request.get_full_path())
+        if self.poll_throttled:
+            refused = throttle.check(poll_key, user.pk)
+            if refused is not None:
+                status, data, headers = refused
+                return _render(renderer, data, status, headers)
+
+        use_replica = self.replica_reads and await sync_to_async(replica_allowed)(user, self.replica_lag_sensitive)
+        with read_alias(replica_alias() if use_replica else None):
+            data, status = await self.respond(request, participant, *args, **kwargs)
+
+        if self.poll_throttled and throttle.config['ENABLED'] and status == 200:
+            throttle.remember(poll_key, participant.current_lobby_id if participant else None, status, data)
+        return _render(renderer, data, status)
+
+    async def respond(self, request, participant, *args, **kwargs):
+        raise NotImplementedError
+
+
+class AsyncCurrentRoundView(AsyncReadView):
+    poll_throttled = True
+
+    async def respond(self, request, participant, *args, **kwargs):
+        active_game = await sync_to_async(active_game_for)(participant)
+        if not active_game:
+            return {"detail": "No active game at the moment."}, 404
+
+        async def build_round():
+            current_round = await open_rounds(active_game.id).select_related('domain').afirst()
+            if not current_round:
+                return {}
+            return {
+                'id': current_round.id,
+                'round_number': current_round.round_number,
+                'domain': str(current_round.domain),
+                'question_text': current_round.question_text,
+            }
+
+        round_version = await aget_version('round', active_game.id)
+        round_data = await _cached(payload_key('current-round', active_game.id, round_version), build_round)
+        if not round_data:
+            return {"detail": "No active round at the moment."}, 404
+
+        lobby_id = participant.current_lobby_id
+        if not lobby_id:
+            return {"detail": "You have not been assigned to a lobby yet."}, 400
+
+        async def build_roster():
+            return [
+                {'id': p_id, 'username': username}
+                async for p_id, username in Participant.objects.filter(current_lobby_id=lobby_id).values_list('id', 'user__username')
+            ]
+
+        roster_version = await aget_version('roster', lobby_id)
+        roster = await _cached(payload_key('roster', lobby_id, roster_version), build_roster)
+        return {
+            'current_round': round_data,
+            'delegation_targets': [p for p in roster if p['id'] != participant.id],
+        }, 200
+
+
+class AsyncLeaderboardView(AsyncReadView):
+    poll_throttled = True
+    replica_reads = True
+    replica_lag_sensitive = True
+
+    async def respond(self, request, participant, *args, **kwargs):
+        lobby_id = participant.current_lobby_id
+        if not lobby_id:
+            return [], 200
+
+        async def build():
+            # Lobby members' scores in the lobby's own game.
+            scores = GameScore.objects.filter(participant__current_lobby_id=lobby_id, game__lobbies=lobby_id).order_by('-score')
+            return [
+                {'participant': {'id': p_id, 'username': username}, 'score': score}
+                async for p_id, username, score in scores.values_list('participant_id', 'participant__user__username', 'score')
+            ]
+
+        version = await aget_version('leaderboard', lobby_id)
+        return await _cached(payload_key('leaderboard', lobby_id, version), build), 200
+
+
+class AsyncDelegationGraphView(AsyncReadView):
+    replica_reads = True
+    replica_lag_sensitive = True
+
+    async def respond(self, request, participant, round_id, *args, **kwargs):
+        # Same live-then-archive lookup as archive.find_round.
+        round_obj = (
+            await Round.objects.filter(id=round_id).afirst()
+            or await ArchivedRound.objects.filter(id=round_id).afirst()
+        )
+        if round_obj is None:
+            return {"detail": "Round not found."}, 404
+
+        lobby_id = await sync_to_async(round_lobby_id)(round_obj, participant)
+        if not lobby_id:
+            return {"detail": "You are not in a lobby."}, 400
+
+        async def build():
+            nodes = [
+                {'id': str(p_id), 'data': {'label': username}, 'position': {'x': 0, 'y': 0}}
+                async for p_id, username in graph_nodes(round_obj, lobby_id)
+            ]
+            edges = [
+                {
+                    'id': f"e-{source}-{target}",
+                    'source': str(source),
+                    'target': str(target),
+                    'animated': True,
+                }
+                async for source, target in graph_edges(round_obj, lobby_id)
+            ]
+            return {'nodes': nodes, 'edges': edges}
+
+        # The graph also lists the lobby's members, so it follows the roster version too.
+        graph_version = await aget_version('graph', round_obj.id, lobby_id)
+        roster_version = await aget_version('roster', lobby_id)
+        key = payload_key('graph', round_obj.id, lobby_id, graph_version, roster_version)
+        return await _cached(key, build), 200
+
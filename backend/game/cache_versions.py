@@ -0,0 +1,87 @@
+"""
+Version counters for cached gameplay payloads.
+
+Each scope has its own counter in the cache:
+    round        per game             current round opened or closed
+    roster       per lobby            lobby membership changed
+    leaderboard  per lobby            scores or membership changed
+    graph        per (round, lobby)   an action was submitted
+
+Cached payloads embed the versions they were built from in their keys, so bumping a
+counter is all a write path has to do. Missing counters start from the current time in
+milliseconds, which keeps them moving forward even if the cache evicts them.
+
+That only holds when every worker process sees the same counters, i.e. the default cache is
+shared (Redis/Memcached, see CACHES in settings). With a per-process cache (LocMemCache) a
+bump on one worker never reaches the others, so payload caching is off (shared_cache() is
+False): payloads are built on every request, and the state-sync endpoint versions its
+pieces by content instead.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+VERSION_TIMEOUT = None  # counters never expire on their own
+PAYLOAD_TIMEOUT = 60 * 10
+
+
+def shared_cache():
+    """True when the default cache is shared by all worker processes; SHARED_CACHE overrides the check."""
+    shared = getattr(settings, 'SHARED_CACHE', None)
+    if shared is None:
+        return not isinstance(caches['default'], (LocMemCache, DummyCache))
+    return shared
+
+
+def version_key(scope, *ids):
+    return ':'.join(['version', scope, *map(str, ids)])
+
+
+def _seed():
+    return int(time.time() * 1000)
+
+
+def get_version(scope, *ids):
+    key = version_key(scope, *ids)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _seed(), VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(scope, *ids):
+    key = version_key(scope, *ids)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _seed(), VERSION_TIMEOUT)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _seed(), VERSION_TIMEOUT)
+
+
+def bump_version(scope, *ids):
+    """Bumps a counter once the surrounding transaction commits (immediately outside one)."""
+    key = version_key(scope, *ids)
+    transaction.on_commit(lambda: _bump(key))
+
+
+def bump_lobbies(lobby_ids, scopes=('roster', 'leaderboard')):
+    for lobby_id in set(lobby_ids):
+        if lobby_id is not None:
+            for scope in scopes:
+                bump_version(scope, lobby_id)
+
+
+def payload_key(name, *parts):
+    return ':'.join(['payload', name, *map(str, parts)])
@@ -0,0 +1,118 @@
+"""
+Cross-round collusion detection.
+
+The scoring engine only penalizes cycles inside one round. Here every round's delegation edges
+are folded into DelegationEdgeStat (how often u delegated to v in the game), and two patterns
+are flagged as SuspiciousGroups once each of their edges has repeated MIN_REPEATS times:
+  - reciprocal pairs: u -> v and v -> u, in any rounds;
+  - rings of three: u -> v -> w -> u, in any rounds.
+Only the round's own edges, their reverses and the frequent edges around their endpoints are
+read, so the work per round grows with that round's edge count, not with the game's history.
+"""
+from django.db.models import F
+
+from .models import DelegationEdgeStat, SuspiciousGroup
+
+MIN_REPEATS = 2
+LOOKUP_CHUNK = 500
+
+key_for = DelegationEdgeStat.key_for
+
+
+def _counts_for(game, pairs):
+    """{(source, target): count} for the pairs that already have a stat row."""
+    keys = {key_for(s, t): (s, t) for s, t in pairs}
+    key_list = list(keys)
+    counts = {}
+    for i in range(0, len(key_list), LOOKUP_CHUNK):
+        rows = DelegationEdgeStat.objects.filter(game=game, edge_key__in=key_list[i:i + LOOKUP_CHUNK])
+        counts.update({keys[key]: count for key, count in rows.values_list('edge_key', 'count')})
+    return counts
+
+
+def record_round_edges(game, round_obj, delegations):
+    """
+    Adds one round's delegations (delegator -> delegate) to the edge counts and flags any
+    reciprocal pair or three-ring they complete. Called by the scoring engine in its transaction.
+    """
+    edges = [(s, t) for s, t in delegations.items() if s != t]
+    if not edges:
+        return []
+
+    previous = _counts_for(game, edges)
+    seen = [key_for(s, t) for s, t in previous]
+    for i in range(0, len(seen), LOOKUP_CHUNK):
+        DelegationEdgeStat.objects.filter(game=game, edge_key__in=seen[i:i + LOOKUP_CHUNK]).update(
+            count=F('count') + 1, last_round_number=round_obj.round_number,
+        )
+    DelegationEdgeStat.objects.bulk_create([
+        DelegationEdgeStat(game=game, source_id=s, target_id=t, edge_key=key_for(s, t), count=1,
+                           last_round_number=round_obj.round_number)
+        for s, t in edges if (s, t) not in previous
+    ], batch_size=1000)
+    counts = {edge: previous.get(edge, 0) + 1 for edge in edges}
+
+    frequent = [edge for edge in edges if counts[edge] >= MIN_REPEATS]
+    if not frequent:
+        return []
+    counts.update(_counts_for(game, [(t, s) for s, t in frequent if (t, s) not in counts]))
+
+    candidates = {}
+    for s, t in frequent:
+        back = counts.get((t, s), 0)
+        if back >= MIN_REPEATS:
+            _flag(candidates, SuspiciousGroup.Kind.PAIR, (s, t), min(counts[(s, t)], back))
+
+    # Rings s -> t -> w -> s: w must be a frequent out-neighbour of t and in-neighbour of s.
+    targets, sources = {t for _, t in frequent}, {s for s, _ in frequent}
+    frequent_out, frequent_in = {}, {}
+    for source, target, count in _frequent_edges(game, 'source_id', targets):
+        frequent_out.setdefault(source, {})[target] = count
+    for source, target, count in _frequent_edges(game, 'target_id', sources):
+        frequent_in.setdefault(target, {})[source] = count
+    for s, t in frequent:
+        outgoing, incoming = frequent_out.get(t, {}), frequent_in.get(s, {})
+        for w in outgoing.keys() & incoming.keys():
+            if w not in (s, t):
+                _flag(candidates, SuspiciousGroup.Kind.RING, (s, t, w), min(counts[(s, t)], outgoing[w], incoming[w]))
+
+    return _save_groups(game, round_obj, candidates)
+
+
+def _frequent_edges(game, endpoint, ids):
+    """Streams (source, target, count) for the frequent edges whose `endpoint` is one of `ids`, LOOKUP_CHUNK ids per query."""
+    ids = list(ids)
+    for i in range(0, len(ids), LOOKUP_CHUNK):
+        rows = DelegationEdgeStat.objects.filter(
+            game=game, count__gte=MIN_REPEATS, **{f'{endpoint}__in': ids[i:i + LOOKUP_CHUNK]},
+        ).values_list('source_id', 'target_id', 'count')
+        yield from rows.iterator(chunk_size=LOOKUP_CHUNK)
+
+
+def _flag(candidates, kind, members, strength):
+    key = (kind, SuspiciousGroup.members_key_for(members))
+    candidates[key] = max(strength, candidates.get(key, 0))
+
+
+def _save_groups(game, round_obj, candidates):
+    if not candidates:
+        return []
+    existing = {
+        (group.kind, group.members_key): group
+        for group in SuspiciousGroup.objects.filter(game=game, members_key__in={key for _, key in candidates})
+    }
+    to_update, to_create = [], []
+    for (kind, key), strength in candidates.items():
+        group = existing.get((kind, key))
+        if group is None:
+            to_create.append(SuspiciousGroup(
+                game=game, kind=kind, members_key=key, strength=strength,
+                first_round_number=round_obj.round_number, last_round_number=round_obj.round_number,
+            ))
+        else:
+            group.strength = strength
+            group.last_round_number = round_obj.round_number
+            to_update.append(group)
+    SuspiciousGroup.objects.bulk_update(to_update, ['strength', 'last_round_number'])
+    SuspiciousGroup.objects.bulk_create(to_create)
+    return to_update + to_create
@@ -0,0 +1,116 @@
+"""
+Read-replica routing for the heavy read endpoints.
+
+Views that opt in with ReplicaReadMixin read from the READ_REPLICA alias, except when:
+  - the user wrote something in the last STICKY_SECONDS (read-your-writes), or
+  - the view is lag-sensitive and a round closed within MAX_LAG_SECONDS, so the replica may
+    not have the new scores yet.
+Everything else, including all writes, uses `default`. If the replica alias is not configured
+in DATABASES, the router is a no-op. Both markers live in the cache, so they only work when
+every worker sees the same cache (cache_versions.shared_cache()); with a per-process cache a
+write on one worker would leave no trace on the others, and all reads stay on the primary.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_versions import shared_cache
+
+DEFAULTS = {'ALIAS': 'replica', 'STICKY_SECONDS': 10, 'MAX_LAG_SECONDS': 5}
+
+_read_alias = ContextVar('read_alias', default=None)
+
+ROUND_CLOSED_KEY = 'replica:round-closed-at'
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'READ_REPLICA', {})}
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica."""
+    alias = _config()['ALIAS']
+    return alias if alias in settings.DATABASES else None
+
+
+def current_read_alias():
+    return _read_alias.get()
+
+
+@contextmanager
+def read_alias(alias):
+    """Routes reads inside the block to `alias`; None keeps them on the primary."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def _sticky_key(user_id):
+    return f'replica:sticky:{user_id}'
+
+
+def mark_user_write(user_id):
+    """Pins the user's reads to the primary for a short while after they write."""
+    cache.set(_sticky_key(user_id), 1, _config()['STICKY_SECONDS'])
+
+
+def mark_round_closed():
+    """Sends lag-sensitive reads to the primary until the replica has caught up with the scores."""
+    transaction.on_commit(lambda: cache.set(ROUND_CLOSED_KEY, time.time(), _config()['MAX_LAG_SECONDS']))
+
+
+def replica_allowed(user, lag_sensitive=False):
+    if replica_alias() is None or not shared_cache():
+        return False
+    if user.is_authenticated and cache.get(_sticky_key(user.id)):
+        return False
+    if lag_sensitive and cache.get(ROUND_CLOSED_KEY) is not None:
+        return False
+    return True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica rows are the primary's rows, so relations across the two are fine.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and is never migrated directly.
+        return db != replica_alias() if replica_alias() else None
+
+
+class ReplicaReadMixin:
+    """
+    For DRF views: serve reads from the replica when replica_allowed() says it is safe.
+    Set `replica_lag_sensitive = True` on views whose data changes when a round closes.
+    """
+    replica_lag_sensitive = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if replica_allowed(request.user, self.replica_lag_sensitive):
+            self._replica_token = _read_alias.set(replica_alias())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def replica_payload_timeout(default):
+    """Payloads built from replica reads may lag, so they are only cached for MAX_LAG_SECONDS."""
+    return _config()['MAX_LAG_SECONDS'] if current_read_alias() else default
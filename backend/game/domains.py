@@ -0,0 +1,21 @@
+"""
+The set of valid Domain ids, cached so rating submissions can be validated without a query.
+Domains only change through the admin and the question import, both of which invalidate it.
+"""
+from django.core.cache import cache
+
+from .models import Domain
+
+DOMAIN_IDS_CACHE_KEY = 'domain-ids'
+
+
+def domain_ids():
+    ids = cache.get(DOMAIN_IDS_CACHE_KEY)
+    if ids is None:
+        ids = frozenset(Domain.objects.values_list('id', flat=True))
+        cache.set(DOMAIN_IDS_CACHE_KEY, ids, None)
+    return ids
+
+
+def invalidate_domain_ids():
+    cache.delete(DOMAIN_IDS_CACHE_KEY)
@@ -0,0 +1,368 @@
+"""
+Columnar export of a finished game for offline analysis.
+
+An archive is a directory with a manifest.json and one .tgc file per table. Each .tgc file holds
+one contiguous, 8-byte aligned block per column followed by a JSON footer:
+
+    MAGIC | column block | column block | ... | footer JSON | uint64 footer length | MAGIC
+
+Column types:
+    int    int64 ('q'),   None stored as INT_NULL
+    float  float64 ('d'), None stored as NaN
+    bool   int8 ('b'),    None stored as -1
+    str    uint32 dictionary codes ('I'), None stored as STR_NULL; the dictionary is in the footer
+    text   int64 end offsets ('q') then the UTF-8 values back to back; a None's end is stored as -1 - end
+
+Free-form columns (question text, answers, justifications) are written as text, since nearly
+every value is distinct. A str column whose dictionary outgrows DICTIONARY_LIMIT is rewritten
+as text too, so neither the writer's memory nor the footer grows with the row count.
+
+Readers mmap the file and hand out zero-copy memoryviews over the column blocks. The views
+are released on close(); anything sliced from them must not be used afterwards.
+"""
+import array
+import json
+import math
+import mmap
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+from django.db.models import Q
+
+from .archive import actions_for_game, rounds_for_game, scores_for_game
+from .models import Participant, SelfRating
+
+MAGIC = b'TGCOL01\0'
+FORMAT_VERSION = 2
+DEFAULT_CHUNK_SIZE = 5000
+# Distinct values a str column may collect before it is rewritten as text.
+DICTIONARY_LIMIT = 4096
+
+INT_NULL = -2 ** 63
+STR_NULL = 2 ** 32 - 1
+
+TYPECODES = {'int': 'q', 'float': 'd', 'bool': 'b', 'str': 'I', 'text': 'q'}
+
+
+def _game_participants(game):
+    return Participant.objects.filter(
+        Q(id__in=scores_for_game(game).values('participant_id')) | Q(id__in=actions_for_game(game).values('participant_id'))
+    ).values('id')
+
+
+# table name -> (queryset factory, [(column name, type, values_list lookup)]). Archived games
+# are read from the Archived* tables, through the same helpers the views use.
+TABLES = {
+    'participants': (
+        lambda game: Participant.objects.filter(id__in=_game_participants(game)).order_by('id'),
+        [('id', 'int', 'id'), ('username', 'str', 'user__username'), ('hostel', 'str', 'hostel__name')],
+    ),
+    'rounds': (
+        lambda game: rounds_for_game(game).order_by('round_number'),
+        [('id', 'int', 'id'), ('round_number', 'int', 'round_number'), ('domain', 'str', 'domain__name'),
+         ('question_text', 'text', 'question_text'), ('correct_answer', 'text', 'correct_answer'),
+         ('is_completed', 'bool', 'is_completed')],
+    ),
+    'actions': (
+        lambda game: actions_for_game(game).order_by('id'),
+        [('id', 'int', 'id'), ('round_id', 'int', 'round_id'), ('participant_id', 'int', 'participant_id'),
+         ('action_type', 'str', 'action_type'), ('submitted_answer', 'text', 'submitted_answer'),
+         ('delegated_to_id', 'int', 'delegated_to_id'), ('is_solve_correct', 'bool', 'is_solve_correct'),
+         ('points_awarded', 'float', 'points_awarded')],
+    ),
+    'scores': (
+        lambda game: scores_for_game(game).order_by('id'),
+        [('participant_id', 'int', 'participant_id'), ('score', 'float', 'score')],
+    ),
+    'self_ratings': (
+        lambda game: SelfRating.objects.filter(participant__in=_game_participants(game)).order_by('id'),
+        [('participant_id', 'int', 'participant_id'), ('domain', 'str', 'domain__name'),
+         ('rating', 'int', 'rating'), ('justification', 'text', 'justification')],
+    ),
+}
+
+
+class _ColumnWriter:
+    """Buffers one column into a temporary spill file so memory stays flat while streaming."""
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.spill = tempfile.TemporaryFile()
+        self.buffer = array.array(TYPECODES[kind])
+        self.dictionary = {} if kind == 'str' else None
+        # text columns: the values themselves, and how many bytes of them have been written
+        self.data = tempfile.TemporaryFile() if kind == 'text' else None
+        self.data_length = 0
+
+    def append(self, value):
+        if self.kind == 'str':
+            if value is None:
+                code = STR_NULL
+            else:
+                code = self.dictionary.setdefault(value, len(self.dictionary))
+                if len(self.dictionary) > DICTIONARY_LIMIT:
+                    self._to_text()
+                    return self.append(value)
+            self.buffer.append(code)
+        elif self.kind == 'text':
+            if value is None:
+                self.buffer.append(-1 - self.data_length)
+            else:
+                encoded = value.encode('utf-8')
+                self.data.write(encoded)
+                self.data_length += len(encoded)
+                self.buffer.append(self.data_length)
+        elif self.kind == 'int':
+            self.buffer.append(INT_NULL if value is None else value)
+        elif self.kind == 'float':
+            self.buffer.append(math.nan if value is None else value)
+        else:
+            self.buffer.append(-1 if value is None else int(value))
+
+    def _to_text(self):
+        """Rewrites the codes written so far as a text column, then drops the dictionary."""
+        self.flush()
+        values = list(self.dictionary)
+        self.dictionary.popitem()  # the value that overflowed; append() writes it again
+        codes, self.spill = self.spill, tempfile.TemporaryFile()
+        self.kind, self.dictionary = 'text', None
+        self.buffer = array.array(TYPECODES['text'])
+        self.data = tempfile.TemporaryFile()
+        codes.seek(0)
+        while True:
+            block = codes.read(1 << 20)
+            if not block:
+                break
+            for code in array.array(TYPECODES['str'], block):
+                self.append(None if code == STR_NULL else values[code])
+            self.flush()
+        codes.close()
+
+    def flush(self):
+        self.buffer.tofile(self.spill)
+        del self.buffer[:]
+
+    def copy_to(self, out):
+        """Writes the column block; returns where the text values start, for text columns."""
+        self.flush()
+        data_offset = None
+        for source in (self.spill, self.data):
+            if source is None:
+                continue
+            if source is self.data:
+                data_offset = out.tell()
+            source.seek(0)
+            while True:
+                block = source.read(1 << 20)
+                if not block:
+                    break
+                out.write(block)
+            source.close()
+        return data_offset
+
+
+def _write_table(path, table, queryset, columns, chunk_size):
+    writers = [_ColumnWriter(name, kind) for name, kind, _ in columns]
+    rows = 0
+    # iterator() streams rows; on PostgreSQL it uses a server-side cursor.
+    for values in queryset.values_list(*[lookup for _, _, lookup in columns]).iterator(chunk_size=chunk_size):
+        for writer, value in zip(writers, values):
+            writer.append(value)
+        rows += 1
+        if rows % chunk_size == 0:
+            for writer in writers:
+                writer.flush()
+
+    footer = {'table': table, 'rows': rows, 'byteorder': sys.byteorder, 'columns': []}
+    with open(path, 'wb') as out:
+        out.write(MAGIC)
+        for writer in writers:
+            offset = out.tell()
+            data_offset = writer.copy_to(out)
+            length = out.tell() - offset
+            out.write(b'\0' * (-out.tell() % 8))
+            column = {'name': writer.name, 'type': writer.kind, 'offset': offset, 'length': length}
+            if writer.dictionary is not None:
+                column['dictionary'] = list(writer.dictionary)
+            if data_offset is not None:
+                column['data_offset'] = data_offset
+            footer['columns'].append(column)
+        encoded = json.dumps(footer, separators=(',', ':')).encode('utf-8')
+        out.write(encoded)
+        out.write(struct.pack('<Q', len(encoded)))
+        out.write(MAGIC)
+    return rows
+
+
+def export_game(game, directory, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Writes `game` into a columnar archive at `directory` and returns the manifest."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        'format': 'tgcol',
+        'version': FORMAT_VERSION,
+        'game': {'id': game.id, 'name': game.name, 'lambda_param': game.lambda_param, 'beta_param': game.beta_param},
+        'tables': {},
+    }
+    for table, (queryset_for, columns) in TABLES.items():
+        filename = f'{table}.tgc'
+        rows = _write_table(directory / filename, table, queryset_for(game), columns, chunk_size)
+        manifest['tables'][table] = {'file': filename, 'rows': rows}
+        if progress:
+            progress(table, rows)
+
+    with open(directory / 'manifest.json', 'w') as handle:
+        json.dump(manifest, handle, indent=2)
+    return manifest
+
+
+class DictionaryColumn:
+    """A dictionary-encoded string column: integer codes plus the list of distinct values."""
+
+    def __init__(self, codes, dictionary):
+        self.codes = codes
+        self.dictionary = dictionary
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        return None if code == STR_NULL else self.dictionary[code]
+
+    def tolist(self):
+        dictionary = self.dictionary
+        return [None if code == STR_NULL else dictionary[code] for code in self.codes]
+
+
+class TextColumn:
+    """A text column: end offsets plus the UTF-8 bytes they index into, decoded on access."""
+
+    def __init__(self, ends, data):
+        self.ends = ends
+        self.data = data
+
+    def __len__(self):
+        return len(self.ends)
+
+    def _end(self, index):
+        end = self.ends[index]
+        return end if end >= 0 else -1 - end
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.ends)
+        end = self.ends[index]
+        if end < 0:
+            return None
+        start = self._end(index - 1) if index else 0
+        return str(self.data[start:end], 'utf-8')
+
+    def tolist(self):
+        values, start = [], 0
+        data = self.data
+        for end in self.ends:
+            if end < 0:
+                values.append(None)
+                start = -1 - end
+            else:
+                values.append(str(data[start:end], 'utf-8'))
+                start = end
+        return values
+
+
+class TableReader:
+    """Memory-maps one .tgc file; columns are zero-copy views until they are decoded."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Every view handed out, so close() can release them before unmapping.
+        self._views = []
+        if self._map[:len(MAGIC)] != MAGIC or self._map[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a columnar game archive table.")
+        end = len(self._map) - len(MAGIC)
+        (footer_length,) = struct.unpack('<Q', self._map[end - 8:end])
+        self.footer = json.loads(self._map[end - 8 - footer_length:end - 8])
+        self.rows = self.footer['rows']
+        self._columns = {column['name']: column for column in self.footer['columns']}
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def _view(self, start, end):
+        view = memoryview(self._map)[start:end]
+        self._views.append(view)
+        return view
+
+    def column(self, name):
+        """Returns a memoryview for numeric columns, a DictionaryColumn or a TextColumn for strings."""
+        spec = self._columns[name]
+        end = spec.get('data_offset', spec['offset'] + spec['length'])
+        view = self._view(spec['offset'], end)
+        if self.footer['byteorder'] == sys.byteorder:
+            values = view.cast(TYPECODES[spec['type']])
+            self._views.append(values)
+        else:
+            # Written on a machine with the other byte order: copy the column and swap it.
+            values = array.array(TYPECODES[spec['type']])
+            values.frombytes(view)
+            values.byteswap()
+        if spec['type'] == 'str':
+            return DictionaryColumn(values, spec['dictionary'])
+        if spec['type'] == 'text':
+            return TextColumn(values, self._view(end, spec['offset'] + spec['length']))
+        return values
+
+    def to_dict(self):
+        """Decodes every column into plain Python lists, with nulls restored as None."""
+        result = {}
+        for name, spec in self._columns.items():
+            values = self.column(name)
+            if spec['type'] in ('str', 'text'):
+                result[name] = values.tolist()
+            elif spec['type'] == 'int':
+                result[name] = [None if v == INT_NULL else v for v in values]
+            elif spec['type'] == 'float':
+                result[name] = [None if math.isnan(v) else v for v in values]
+            else:
+                result[name] = [None if v == -1 else bool(v) for v in values]
+        return result
+
+    def close(self):
+        while self._views:
+            self._views.pop().release()
+        try:
+            self._map.close()
+        except BufferError:
+            # A caller still holds a slice of a column; the mapping goes away with it.
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArchiveReader:
+    """Opens an exported archive directory: ArchiveReader(path).table('actions').column('points_awarded')."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / 'manifest.json') as handle:
+            self.manifest = json.load(handle)
+
+    @property
+    def tables(self):
+        return list(self.manifest['tables'])
+
+    def table(self, name):
+        return TableReader(self.directory / self.manifest['tables'][name]['file'])
@@ -0,0 +1,62 @@
+"""
+Working out which game a request is about.
+
+Several games (say, one per college) can run on one deployment at the same time. Every
+participant is registered into one game, and lobbies, rounds and scores all belong to a game,
+so gameplay requests are scoped by the caller's game rather than by "the" active game.
+"""
+from .models import Game, Lobby, Round
+
+
+class GameRequired(Exception):
+    """Raised when the game can't be inferred because several games are active."""
+
+
+def default_game():
+    """The active game when exactly one is running; None when there are none or several."""
+    games = list(Game.objects.filter(is_active=True).order_by('id')[:2])
+    return games[0] if len(games) == 1 else None
+
+
+def require_game(game_id=None):
+    """
+    The game an admin action targets: `game_id` if given, else the only active game.
+    Raises Game.DoesNotExist for an unknown id and GameRequired if several games are active.
+    """
+    if game_id is not None:
+        return Game.objects.get(id=game_id)
+    game = default_game()
+    if game is None:
+        if Game.objects.filter(is_active=True).exists():
+            raise GameRequired("Several games are active; say which one with game_id.")
+        raise Game.DoesNotExist("No active game found.")
+    return game
+
+
+def game_id_for(participant):
+    """The id of the game `participant` plays in, falling back to their lobby's game."""
+    if participant.game_id:
+        return participant.game_id
+    if participant.current_lobby_id:
+        return Lobby.objects.filter(id=participant.current_lobby_id).values_list('game_id', flat=True).first()
+    return None
+
+
+def active_game_for(participant):
+    """
+    The active game `participant` plays in, or None.
+    Participants registered before games were per-participant fall back to the only active game.
+    """
+    game_id = game_id_for(participant)
+    if game_id is None:
+        return default_game()
+    return Game.objects.filter(id=game_id, is_active=True).first()
+
+
+def open_rounds(game_id):
+    """
+    The game's open rounds in play order. The first one is the current round: the one players
+    see and submit to and the one end-round scores. import_questions can queue later rounds
+    ahead of time, and they stay closed to play until every round before them is scored.
+    """
+    return Round.objects.filter(game_id=game_id, is_completed=False).order_by('round_number')
@@ -0,0 +1,41 @@
+import codecs
+import csv
+import json
+
+
+def detect_format(filename, fmt=None):
+    """Returns 'csv' or 'jsonl' from an explicit format or the file extension, else None."""
+    fmt = (fmt or filename.rsplit('.', 1)[-1]).lower()
+    return fmt if fmt in ('csv', 'jsonl') else None
+
+
+def is_utf8(chunks):
+    """True if the byte chunks decode as UTF-8; checked up front so a bad file is rejected before any row is written."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in chunks:
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def read_rows(handle, fmt):
+    """
+    Yields (line_number, row) pairs from a CSV or JSONL text stream without reading it all.
+    JSONL lines that fail to parse are yielded as {'_error': ...} so callers can report them.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_no, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_no, {'_error': f"Invalid JSON ({exc.msg})."}
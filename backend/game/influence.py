@@ -0,0 +1,232 @@
+"""
+Transitive trust influence.
+
+Two measures over the delegation graph (an edge u -> v means u delegated to v):
+  - reach: how many participants' delegation chains end at v in a round. Chains are resolved
+    for all nodes at once by pointer jumping (next = next[next], log2(n) times); members of a
+    cycle never reach an endpoint and count for nobody.
+  - pagerank: PageRank over the graph, with edges weighted by how often u delegated to v.
+    Each iteration is one sparse matrix-vector product over the edge list.
+
+Both run in vectorized form with numpy when it is installed, and fall back to plain Python
+otherwise (same results; see `manage.py bench_influence` for timings). The PageRank fallback
+solves the acyclic part of the graph exactly in one pass and only iterates over cycles.
+Rows are keyed by round number, with round_number NULL for the game-cumulative graph, which
+is built from the collusion detector's running edge counts rather than the game's actions.
+"""
+from collections import Counter
+from itertools import accumulate, groupby
+from operator import itemgetter, mul, sub
+
+from .models import DelegationEdgeStat, InfluenceScore
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DAMPING = 0.85
+# Stop once an iteration changes the scores (which sum to 1) by less than this in L1 norm.
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+
+
+def _index(nodes):
+    return {node: i for i, node in enumerate(nodes)}
+
+
+def chain_reach(nodes, delegations):
+    """
+    `delegations` maps each delegating node to the node it delegated to (one edge per node).
+    Returns {node: number of other nodes whose chain ends at it}.
+    """
+    nodes = list(nodes)
+    index = _index(nodes)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    jumps = max(1, n.bit_length())
+
+    if np is not None:
+        first = np.arange(n)
+        for source, target in delegations.items():
+            first[index[source]] = index[target]
+        nxt = first
+        for _ in range(jumps):
+            nxt = nxt[nxt]
+        is_end = first == np.arange(n)
+        resolved = is_end[nxt]
+        counts = np.bincount(nxt[resolved], minlength=n) - is_end
+        return dict(zip(nodes, counts.tolist()))
+
+    first = list(range(n))
+    for source, target in delegations.items():
+        first[index[source]] = index[target]
+    nxt = first
+    for _ in range(jumps):
+        nxt = [nxt[j] for j in nxt]
+    counts = [0] * n
+    for i, end in enumerate(nxt):
+        if first[end] == end and end != i:
+            counts[end] += 1
+    return dict(zip(nodes, counts))
+
+
+def pagerank(nodes, weighted_edges):
+    """`weighted_edges` maps (source, target) to a weight. Returns {node: score}, summing to 1."""
+    nodes = list(nodes)
+    index = _index(nodes)
+    for node in set(map(itemgetter(1), weighted_edges)).difference(index):
+        index[node] = len(nodes)
+        nodes.append(node)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    src = list(map(index.__getitem__, map(itemgetter(0), weighted_edges)))
+    dst = list(map(index.__getitem__, map(itemgetter(1), weighted_edges)))
+    weights = list(weighted_edges.values())
+
+    if np is not None:
+        src, dst, weights = np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64), np.array(weights, dtype=float)
+        out_weight = np.bincount(src, weights=weights, minlength=n)
+        coef = DAMPING * weights / out_weight[src] if len(src) else weights
+        dangling = out_weight == 0
+        rank = np.full(n, 1.0 / n)
+        for _ in range(MAX_ITERATIONS):
+            base = (1 - DAMPING + DAMPING * rank[dangling].sum()) / n
+            new = np.bincount(dst, weights=rank[src] * coef, minlength=n) + base
+            done = np.abs(new - rank).sum() < TOLERANCE
+            rank = new
+            if done:
+                break
+        return dict(zip(nodes, rank.tolist()))
+
+    # Pure-Python fallback. The PageRank vector is x / sum(x) for the solution of x = 1 + Mx,
+    # where M holds the damped edge coefficients: the teleport and dangling terms add the same
+    # amount to every node, so they only change the scale. Nodes that no cycle feeds into are
+    # solved exactly in one topological pass (Kahn's algorithm); only nodes on or downstream of
+    # a cycle are left to iterate, and in delegation graphs those are few.
+    out_weight = [0.0] * n
+    for s, w in zip(src, weights):
+        out_weight[s] += w
+    coef = [DAMPING * w / out_weight[s] for s, w in zip(src, weights)]
+    # Out-edges grouped by source: node u's are positions out_start[u]:out_start[u + 1].
+    by_source = sorted(range(len(src)), key=src.__getitem__)
+    out_edges = list(zip(map(dst.__getitem__, by_source), map(coef.__getitem__, by_source)))
+    out_start = [0] * (n + 1)
+    for s in src:
+        out_start[s + 1] += 1
+    out_start = list(accumulate(out_start))
+    indegree = [0] * n
+    for t in dst:
+        indegree[t] += 1
+
+    x = [1.0] * n
+    ready = [i for i, d in enumerate(indegree) if not d]
+    for u in ready:  # grows as nodes become ready
+        xu = x[u]
+        for t, c in out_edges[out_start[u]:out_start[u + 1]]:
+            x[t] += c * xu
+            indegree[t] -= 1
+            if not indegree[t]:
+                ready.append(t)
+
+    if len(ready) < n:
+        # Everything left is reachable from a cycle, and only receives edges from the rest; x
+        # already holds each one's constant part (1 plus what solved nodes pass on to it).
+        solved_total = sum(x[i] for i in ready)
+        rest = [i for i, d in enumerate(indegree) if d]
+        local = _index(rest)
+        edges = sorted(
+            (local[t], local[u], c)
+            for u in rest for t, c in out_edges[out_start[u]:out_start[u + 1]]
+        )
+        constant = [x[i] for i in rest]
+        for i, value in zip(rest, _jacobi(constant, edges, solved_total)):
+            x[i] = value
+
+    total = sum(x)
+    return {node: value / total for node, value in zip(nodes, x)}
+
+
+def _jacobi(constant, edges, solved_total):
+    """
+    Iterates y = constant + My over `edges` (target, source, coef), sorted by target. Each
+    step's matrix-vector product is a running sum of y[source] * coef with one difference
+    per target, all through C-level map/accumulate rather than a Python loop over the edges.
+    """
+    n = len(constant)
+    targets = [t for t, _, _ in edges]
+    src = [s for _, s, _ in edges]
+    coef = [c for _, _, c in edges]
+    bounds = list(accumulate((len(list(group)) for _, group in groupby(targets)), initial=0))
+    present = [t for t, _ in groupby(targets)]
+    y = list(constant)
+    for _ in range(MAX_ITERATIONS):
+        running = list(accumulate(map(mul, map(y.__getitem__, src), coef), initial=0.0))
+        new = list(constant)
+        for t, start, end in zip(present, bounds, bounds[1:]):
+            new[t] += running[end] - running[start]
+        change = sum(map(abs, map(sub, new, y)))
+        y = new
+        # Same stopping rule as the power iteration: the change in normalized scores.
+        if change < TOLERANCE * (solved_total + sum(y)):
+            break
+    return y
+
+
+def record_round_influence(game, round_obj, participant_ids, delegations):
+    """
+    Stores influence for one scored round and refreshes the game-cumulative rows.
+    Called by the scoring engine inside its transaction, after the collusion phase has added
+    this round's edges to DelegationEdgeStat. `delegations` maps delegator -> delegate.
+    """
+    nodes = set(participant_ids) | set(delegations.values())
+    reach = chain_reach(nodes, delegations)
+    ranks = pagerank(nodes, {edge: 1 for edge in delegations.items()})
+    _replace(game, round_obj.round_number, [
+        InfluenceScore(game=game, round_number=round_obj.round_number, participant_id=p_id,
+                       reach=reach[p_id], pagerank=ranks[p_id])
+        for p_id in nodes
+    ])
+    record_cumulative_influence(game, reach)
+
+
+def record_cumulative_influence(game, round_reach):
+    """
+    PageRank over the game's running edge counts (DelegationEdgeStat, one row per distinct
+    delegator -> delegate pair, so it doesn't grow with the number of rounds); reach is the
+    previous cumulative reach plus this round's `round_reach`.
+    """
+    edges = {
+        (source, target): count
+        for source, target, count in DelegationEdgeStat.objects.filter(game=game)
+        .values_list('source_id', 'target_id', 'count').iterator()
+    }
+    total_reach = Counter(dict(
+        InfluenceScore.objects.filter(game=game, round_number__isnull=True).values_list('participant_id', 'reach')
+    ))
+    total_reach.update(round_reach)
+    nodes = set(total_reach) | {p_id for edge in edges for p_id in edge}
+    ranks = pagerank(nodes, edges)
+    _replace(game, None, [
+        InfluenceScore(game=game, round_number=None, participant_id=p_id,
+                       reach=total_reach[p_id], pagerank=ranks[p_id])
+        for p_id in nodes
+    ])
+
+
+def _replace(game, round_number, rows):
+    # round_number=None filters on IS NULL, i.e. the cumulative rows.
+    InfluenceScore.objects.filter(game=game, round_number=round_number).delete()
+    InfluenceScore.objects.bulk_create(rows, batch_size=2000)
+
+
+def influence_ranking(game, round_number=None, limit=50):
+    """The most influential participants of a round (or of the whole game when round_number is None)."""
+    rows = InfluenceScore.objects.filter(game=game, round_number=round_number)
+    return [
+        {'participant': p_id, 'username': username, 'reach': reach, 'pagerank': score}
+        for p_id, username, reach, score in rows.order_by('-pagerank', 'participant_id')
+        .values_list('participant_id', 'participant__user__username', 'reach', 'pagerank')[:limit]
+    ]
@@ -1,18 +1,22 @@
 import random
-from .models import Participant, Lobby, Game
+from django.db import transaction
+from django.db.models import Count, Q
+from .models import Action, GameScore, Participant, Lobby, RoundRosterEntry
+from .cache_versions import bump_lobbies
 
-def assign_participants_to_lobbies(lobby_size: int):
+def assign_participants_to_lobbies(lobby_size: int, active_game):
     """
-    Finds all unassigned participants, shuffles them, and assigns them
+    Finds all unassigned participants of `active_game`, shuffles them, and assigns them
     to newly created lobbies of the specified size.
     """
-    # Find the main active game
-    active_game = Game.objects.filter(is_active=True).first()
-    if not active_game:
-        return {"error": "No active game found."}
+    if not active_game.is_active:
+        return {"error": "The game is not active."}
 
-    # Get all participants who are not currently in a lobby
-    unassigned_participants = list(Participant.objects.filter(current_lobby__isnull=True))
+    # Get all participants of this game who are not currently in a lobby; participants who
+    # registered before any game existed join this one.
+    unassigned_participants = list(Participant.objects.filter(
+        Q(game=active_game) | Q(game__isnull=True), current_lobby__isnull=True
+    ))
     
     # Shuffle them for random assignment
     random.shuffle(unassigned_participants)
@@ -25,7 +29,7 @@ def assign_participants_to_lobbies(lobby_size: int):
         chunk = unassigned_participants[i:i + lobby_size]
         
         # Create a new lobby
-        lobby_number = Lobby.objects.count() + 1
+        lobby_number = Lobby.objects.filter(game=active_game).count() + 1
         new_lobby = Lobby.objects.create(
             name=f"Lobby {lobby_number}",
             game=active_game
@@ -34,12 +38,136 @@ def assign_participants_to_lobbies(lobby_size: int):
         
         # Assign participants in the chunk to the new lobby
         for participant in chunk:
+            participant.game = active_game
             participant.current_lobby = new_lobby
             participant.save()
             total_participants_assigned += 1
+        bump_lobbies([new_lobby.id])
             
     return {
         "status": "Lobby assignment complete.",
         "lobbies_created": num_lobbies_created,
         "participants_assigned": total_participants_assigned
-    }
\ No newline at end of file
+    }
+
+def _target_sizes(sizes, tolerance):
+    """
+    Target sizes (same order as `sizes`) with max - min <= tolerance and the same total,
+    reached with the fewest participants moved. Returns (targets, moves).
+    """
+    total, count = sum(sizes), len(sizes)
+    best = None
+    for low in range(max(0, total // count - tolerance), total // count + 1):
+        high = low + tolerance
+        if not low * count <= total <= high * count:
+            continue
+        targets = [min(max(size, low), high) for size in sizes]
+        excess = sum(targets) - total
+        # Fix the total: first by undoing clamps (which moves nobody), then anywhere in range.
+        for free in (True, False):
+            for i, size in enumerate(sizes):
+                if excess > 0:
+                    step = min(excess, max(targets[i] - (max(size, low) if free else low), 0))
+                    targets[i] -= step
+                    excess -= step
+                elif excess < 0:
+                    step = min(-excess, max((min(size, high) if free else high) - targets[i], 0))
+                    targets[i] += step
+                    excess += step
+        moves = sum(max(size - target, 0) for size, target in zip(sizes, targets))
+        if best is None or moves < best[1]:
+            best = (targets, moves)
+    return best
+
+
+def plan_rebalance(game, tolerance=1, preserve_skill=False):
+    """
+    Works out the fewest moves that bring the game's active lobbies within `tolerance` of each
+    other in size. Movers are the most recently registered members of oversized lobbies, or, with
+    preserve_skill, whoever keeps each lobby's mean score closest to the game's.
+    Returns a list of (participant, from_lobby_id, to_lobby_id).
+    """
+    lobby_ids = list(Lobby.objects.filter(game=game, is_active=True).order_by('id').values_list('id', flat=True))
+    if len(lobby_ids) < 2:
+        return []
+    members = {lobby_id: [] for lobby_id in lobby_ids}
+    for participant in Participant.objects.filter(current_lobby_id__in=lobby_ids).order_by('id'):
+        members[participant.current_lobby_id].append(participant)
+
+    targets, _ = _target_sizes([len(members[lobby_id]) for lobby_id in lobby_ids], tolerance)
+    targets = dict(zip(lobby_ids, targets))
+    skill = {}
+    if preserve_skill:
+        skill = dict(GameScore.objects.filter(game=game, participant__current_lobby_id__in=lobby_ids).values_list('participant_id', 'score'))
+    everyone = [p for lobby_members in members.values() for p in lobby_members]
+    overall_mean = sum(skill.get(p.id, 0) for p in everyone) / len(everyone) if everyone else 0
+
+    def mean(lobby_members):
+        return sum(skill.get(p.id, 0) for p in lobby_members) / len(lobby_members) if lobby_members else overall_mean
+
+    movers = []
+    for lobby_id in lobby_ids:
+        surplus = len(members[lobby_id]) - targets[lobby_id]
+        if surplus <= 0:
+            continue
+        lobby_members = members[lobby_id]
+        if preserve_skill:
+            # A lobby above the game's mean gives away its strongest players, one below its weakest.
+            strongest_first = mean(lobby_members) > overall_mean
+            lobby_members = sorted(lobby_members, key=lambda p: skill.get(p.id, 0), reverse=not strongest_first)
+        leaving, members[lobby_id] = lobby_members[-surplus:], lobby_members[:-surplus]
+        movers.extend((p, lobby_id) for p in leaving)
+
+    moves = []
+    if preserve_skill:
+        movers.sort(key=lambda mover: skill.get(mover[0].id, 0), reverse=True)
+    for participant, from_lobby_id in movers:
+        open_lobbies = [lobby_id for lobby_id in lobby_ids if len(members[lobby_id]) < targets[lobby_id]]
+        # Strongest movers go to the weakest lobbies; without skills this just fills lobbies in order.
+        to_lobby_id = min(open_lobbies, key=lambda lobby_id: mean(members[lobby_id])) if preserve_skill else open_lobbies[0]
+        members[to_lobby_id].append(participant)
+        moves.append((participant, from_lobby_id, to_lobby_id))
+    return moves
+
+
+def rebalance_lobbies(game, tolerance=1, preserve_skill=False, dry_run=False):
+    """
+    Applies plan_rebalance between rounds: one bulk update of the movers' lobbies, and cache
+    invalidation for the affected lobbies only. Refuses while a round has submissions.
+    """
+    if tolerance < 1:
+        return {"error": "tolerance must be at least 1."}
+    if Action.objects.filter(round__game=game, round__is_completed=False).exists():
+        return {"error": "A round is in progress; rebalance between rounds."}
+
+    moves = plan_rebalance(game, tolerance, preserve_skill)
+    if moves and not dry_run:
+        with transaction.atomic():
+            for participant, _, to_lobby_id in moves:
+                participant.current_lobby_id = to_lobby_id
+            Participant.objects.bulk_update([p for p, _, _ in moves], ['current_lobby'])
+            bump_lobbies({lobby_id for _, from_id, to_id in moves for lobby_id in (from_id, to_id)})
+
+    sizes = dict(
+        Participant.objects.filter(current_lobby__game=game, current_lobby__is_active=True)
+        .values('current_lobby_id').annotate(size=Count('id')).values_list('current_lobby_id', 'size')
+    )
+    return {
+        "status": "Dry run: no participants moved." if dry_run else "Lobbies rebalanced.",
+        "moves": [{"participant": p.id, "from_lobby": from_id, "to_lobby": to_id} for p, from_id, to_id in moves],
+        "lobby_sizes": sizes,
+    }
+
+
+def snapshot_round_roster(round_obj):
+    """
+    Records which lobby each of the game's participants was in for `round_obj`, as it closes.
+    Participants who acted are recorded in the lobby they acted from.
+    """
+    members = dict(Participant.objects.filter(current_lobby__game_id=round_obj.game_id).values_list('id', 'current_lobby_id'))
+    members.update(Action.objects.filter(round=round_obj, lobby__isnull=False).values_list('participant_id', 'lobby_id'))
+    RoundRosterEntry.objects.bulk_create([
+        RoundRosterEntry(game_id=round_obj.game_id, round_number=round_obj.round_number, participant_id=p_id, lobby_id=lobby_id)
+        for p_id, lobby_id in members.items()
+    ], batch_size=2000, ignore_conflicts=True)
+    return len(members)
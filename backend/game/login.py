@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password
+from django.db import close_old_connections
+
+UserModel = get_user_model()
+
+DEFAULTS = {
+    'WORKERS': 4,              # concurrent password checks
+    'MAX_PENDING': 64,         # admitted logins (running + queued) before new ones are shed
+    'TIMEOUT': 10,             # seconds a request waits for its password check
+    'RETRY_AFTER': 2,          # seconds suggested to shed clients
+    'HASHER_UPGRADE': 'inline',  # 'inline', 'deferred' or 'never' (see UpgradePolicyBackend)
+    'THROUGHPUT_WINDOW': 60,   # seconds of history used for logins_per_second
+}
+
+
+class LoginRejected(Exception):
+    """Raised when the gate is full and a login is shed instead of queued."""
+
+
+class LoginGate:
+    """
+    Runs authentication on a bounded thread pool with admission control.
+    PBKDF2 in hashlib releases the GIL, so threads give real parallelism here while
+    keeping the number of CPU-heavy checks in flight capped.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.executor = ThreadPoolExecutor(max_workers=config['WORKERS'], thread_name_prefix='login')
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.active = 0
+        self.peak_pending = 0
+        self.counters = {'succeeded': 0, 'failed': 0, 'rejected': 0, 'timed_out': 0}
+        self.recent = deque()
+
+    def authenticate(self, request, username, password):
+        """
+        Returns the User for valid credentials, None otherwise; raises LoginRejected when full
+        or when the check takes longer than TIMEOUT. Goes through AUTHENTICATION_BACKENDS, so
+        user_login_failed fires as usual. Like DRF's token login, it doesn't send user_logged_in,
+        which would write last_login on every login.
+        """
+        with self.lock:
+            if self.pending >= self.config['MAX_PENDING']:
+                self.counters['rejected'] += 1
+                raise LoginRejected()
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        try:
+            future = self.executor.submit(self._authenticate, request, username, password)
+        except RuntimeError:
+            # reset_login_gate() shut this gate's pool down after the caller fetched it.
+            self._release(None)
+            raise LoginRejected()
+        # The slot is freed when the check finishes, not when the caller stops waiting: a
+        # check that is already hashing can't be cancelled and still holds a worker.
+        future.add_done_callback(self._release)
+        try:
+            user = future.result(timeout=self.config['TIMEOUT'])
+        except TimeoutError:
+            future.cancel()
+            with self.lock:
+                self.counters['timed_out'] += 1
+            raise LoginRejected()
+
+        with self.lock:
+            self.counters['succeeded' if user is not None else 'failed'] += 1
+            now = time.monotonic()
+            self.recent.append(now)
+            self._trim_window(now)
+        return user
+
+    def _authenticate(self, request, username, password):
+        """Runs on the pool. Backends hash unknown usernames too and upgrade outdated hashes."""
+        with self.lock:
+            self.active += 1
+        try:
+            return authenticate(request, username=username, password=password)
+        finally:
+            with self.lock:
+                self.active -= 1
+            # Pool threads are not request threads, so nothing else closes their connection.
+            close_old_connections()
+
+    def _release(self, future):
+        with self.lock:
+            self.pending -= 1
+
+    def _trim_window(self, now):
+        horizon = now - self.config['THROUGHPUT_WINDOW']
+        while self.recent and self.recent[0] < horizon:
+            self.recent.popleft()
+
+    def metrics(self):
+        with self.lock:
+            self._trim_window(time.monotonic())
+            return {
+                **self.counters,
+                'in_flight': self.pending,
+                'active_checks': self.active,
+                'queue_depth': self.pending - self.active,
+                'peak_pending': self.peak_pending,
+                'logins_per_second': len(self.recent) / self.config['THROUGHPUT_WINDOW'],
+                'workers': self.config['WORKERS'],
+                'max_pending': self.config['MAX_PENDING'],
+            }
+
+
+class UpgradePolicyBackend(ModelBackend):
+    """
+    ModelBackend that upgrades outdated password hashes per LOGIN_GATE['HASHER_UPGRADE']:
+    'inline' rehashes before the login returns (Django's behaviour), 'deferred' rehashes on the
+    gate's pool after it returns, and 'never' leaves stored hashes alone.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames cost the same as wrong passwords.
+            UserModel().set_password(password)
+            return None
+        if check_password(password, user.password, setter=self._upgrader(user)) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def _upgrader(self, user):
+        policy = get_login_gate().config['HASHER_UPGRADE']
+        if policy == 'inline':
+            return lambda raw_password: _rehash(user.pk, raw_password)
+        if policy == 'deferred':
+            return lambda raw_password: _submit_rehash(user.pk, raw_password)
+        return None
+
+
+def _submit_rehash(user_id, raw_password):
+    try:
+        get_login_gate().executor.submit(_deferred_rehash, user_id, raw_password)
+    except RuntimeError:
+        # The gate was reset meanwhile; the hash is upgraded on a later login.
+        pass
+
+
+def _rehash(user_id, raw_password):
+    user = UserModel(pk=user_id)
+    user.set_password(raw_password)
+    UserModel._default_manager.filter(pk=user_id).update(password=user.password)
+
+
+def _deferred_rehash(user_id, raw_password):
+    try:
+        _rehash(user_id, raw_password)
+    finally:
+        close_old_connections()
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_login_gate():
+    """Returns the process-wide LoginGate, built from settings.LOGIN_GATE on first use."""
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            _gate = LoginGate({**DEFAULTS, **getattr(settings, 'LOGIN_GATE', {})})
+        return _gate
+
+
+def reset_login_gate():
+    """Drops the current gate so the next login rebuilds it (used when settings change)."""
+    global _gate
+    with _gate_lock:
+        if _gate is not None:
+            _gate.executor.shutdown(wait=False)
+        _gate = None
+
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game.archive import DEFAULT_CHUNK_SIZE, archivable_games, archive_game
+from game.models import Game
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves inactive games' rounds, actions and scores out of the live tables into the "
+        "archive tables. Archived games stay readable through the rounds, leaderboard and "
+        "delegation-graph endpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--game', type=int, help="Archive only this game (it must be inactive).")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows copied per bulk insert.")
+        parser.add_argument('--dry-run', action='store_true', help="List the games that would be archived.")
+
+    def handle(self, *args, **options):
+        games = archivable_games()
+        if options['game']:
+            games = Game.objects.filter(id=options['game'])
+            if not games.exists():
+                raise CommandError(f"Game {options['game']} not found.")
+
+        for game in games:
+            if options['dry_run']:
+                self.stdout.write(f"Would archive '{game.name}' (id {game.id}).")
+                continue
+            try:
+                moved = archive_game(game, chunk_size=options['chunk_size'])
+            except ValueError as exc:
+                raise CommandError(f"'{game.name}': {exc}")
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived '{game.name}': {moved['rounds']} rounds, {moved['actions']} actions, {moved['scores']} scores."
+            ))
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from game.models import Game, Participant, Round
+
+ENDPOINTS = [
+    ('current-round', '/api/current-round/', '/api/async/current-round/'),
+    ('leaderboard', '/api/leaderboard/', '/api/async/leaderboard/'),
+    ('delegation-graph', '/api/rounds/{round_id}/delegation-graph/', '/api/async/rounds/{round_id}/delegation-graph/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares concurrent-client throughput of the sync (WSGI handler) and async (ASGI handler) "
+        "read endpoints in-process, after checking that both return identical responses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and handler.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Concurrent clients.")
+        parser.add_argument('--username', help="Participant to authenticate as (defaults to any participant in a lobby).")
+
+    def handle(self, *args, **options):
+        # The in-process clients send Host: testserver, as they do under the test runner.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self._run(options)
+
+    def _run(self, options):
+        participants = Participant.objects.filter(current_lobby__isnull=False).select_related('user')
+        if options['username']:
+            participants = participants.filter(user__username=options['username'])
+        participant = participants.first()
+        if not participant:
+            raise CommandError("Need a participant who is in a lobby.")
+        token, _ = Token.objects.get_or_create(user=participant.user)
+        headers = {'Authorization': f'Token {token.key}'}
+
+        game = Game.objects.filter(is_active=True).first()
+        round_obj = Round.objects.filter(game=game).order_by('-round_number').first() if game else None
+        if not round_obj:
+            raise CommandError("Need an active game with at least one round.")
+
+        self.stdout.write(f"{'endpoint':<18}{'wsgi req/s':>12}{'asgi req/s':>12}  identical")
+        for name, sync_path, async_path in ENDPOINTS:
+            sync_path = sync_path.format(round_id=round_obj.id)
+            async_path = async_path.format(round_id=round_obj.id)
+
+            sync_response = Client().get(sync_path, headers=headers)
+            async_response = asyncio.run(AsyncClient().get(async_path, headers=headers))
+            identical = (sync_response.status_code, sync_response.content) == (async_response.status_code, async_response.content)
+
+            wsgi_rate = self._bench_sync(sync_path, headers, options['requests'], options['concurrency'])
+            asgi_rate = asyncio.run(self._bench_async(async_path, headers, options['requests'], options['concurrency']))
+            self.stdout.write(f"{name:<18}{wsgi_rate:>12.1f}{asgi_rate:>12.1f}  {'yes' if identical else 'NO'}")
+
+    def _bench_sync(self, path, headers, total, concurrency):
+        def worker(count):
+            client = Client()
+            for _ in range(count):
+                client.get(path, headers=headers)
+
+        shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, shares))
+        return total / (time.perf_counter() - start)
+
+    async def _bench_async(self, path, headers, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                await client.get(path, headers=headers)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return total / (time.perf_counter() - start)
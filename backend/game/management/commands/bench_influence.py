@@ -0,0 +1,38 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from game import influence
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the influence engine (chain reach and PageRank) on a random delegation graph. "
+        "Reports which implementation ran: numpy if installed, otherwise the pure-Python fallback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=100_000, help="Delegation edges (one per delegating node).")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        edge_count = options['edges']
+        # Roughly a quarter of the nodes solve or pass; everyone else delegates once.
+        nodes = list(range(edge_count + edge_count // 3))
+        delegators = rng.sample(nodes, edge_count)
+        delegations = {p: rng.choice(nodes) for p in delegators}
+        delegations = {p: t for p, t in delegations.items() if p != t}
+        weighted = {edge: rng.randint(1, 5) for edge in delegations.items()}
+
+        self.stdout.write(f"Implementation: {'numpy' if influence.np is not None else 'pure Python'}")
+        self.stdout.write(f"Graph: {len(nodes)} nodes, {len(delegations)} edges")
+        for name, run in (
+            ('chain reach', lambda: influence.chain_reach(nodes, delegations)),
+            ('pagerank', lambda: influence.pagerank(nodes, weighted)),
+        ):
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {name:<12} {elapsed * 1000:8.1f} ms  (max {max(result.values()):.4g})")
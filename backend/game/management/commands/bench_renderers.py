@@ -0,0 +1,67 @@
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from game.renderers import packb, unpackb
+
+
+def _payloads(size):
+    """Synthetic payloads shaped like the gameplay responses, `size` rows/nodes each."""
+    return {
+        'delegation graph': {
+            'nodes': [{'id': str(i), 'data': {'label': f'user_{i}'}, 'position': {'x': 0, 'y': 0}} for i in range(size)],
+            'edges': [
+                {'id': f'e-{i}-{(i * 7) % size}', 'source': str(i), 'target': str((i * 7) % size), 'animated': True}
+                for i in range(0, size, 2)
+            ],
+        },
+        'leaderboard': [
+            {'participant': {'id': i, 'username': f'user_{i}'}, 'score': round(100 - i * 0.37, 2)} for i in range(size)
+        ],
+        'all ratings': [
+            {'participant': {'id': i // 4, 'username': f'user_{i // 4}'}, 'domain': f'Domain {i % 4}', 'rating': i % 11}
+            for i in range(size)
+        ],
+        'round list': [
+            {'id': i, 'round_number': i + 1, 'domain': f'Domain {i % 4}', 'question_text': f'Question {i}: what is {i} * 3?'}
+            for i in range(size)
+        ],
+    }
+
+
+def _best_ms(run, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the JSON renderer with the interned MessagePack renderer on payloads shaped "
+        "like the leaderboard, delegation graph, all-ratings and round-list responses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=2000, help="Rows (or graph nodes) per payload.")
+        parser.add_argument('--repeats', type=int, default=20, help="Runs per measurement; the best is reported.")
+
+    def handle(self, *args, **options):
+        json_renderer = JSONRenderer()
+        repeats = options['repeats']
+        self.stdout.write(f"{'payload':<18}{'format':<9}{'bytes':>10}{'gzipped':>10}{'encode ms':>11}{'decode ms':>11}")
+        for name, data in _payloads(options['size']).items():
+            for label, encode, decode in (
+                ('json', json_renderer.render, json.loads),
+                ('msgpack', packb, unpackb),
+            ):
+                encode_ms, body = _best_ms(lambda: encode(data), repeats)
+                decode_ms, _ = _best_ms(lambda: decode(body), repeats)
+                self.stdout.write(
+                    f"{name:<18}{label:<9}{len(body):>10}{len(gzip.compress(body)):>10}{encode_ms:>11.2f}{decode_ms:>11.2f}"
+                )
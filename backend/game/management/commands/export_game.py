@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from game.export import DEFAULT_CHUNK_SIZE, export_game
+from game.models import Game
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports a game's rounds, actions, scores, participants and self-ratings into a "
+        "columnar archive directory that can be read back with game.export.ArchiveReader."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('game_id', type=int)
+        parser.add_argument('output_dir')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows fetched per cursor batch.")
+
+    def handle(self, *args, **options):
+        game = Game.objects.filter(id=options['game_id']).first()
+        if not game:
+            raise CommandError(f"Game {options['game_id']} not found.")
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size must be a positive integer.")
+
+        def progress(table, rows):
+            self.stdout.write(f"Wrote {rows} rows to {table}.")
+
+        export_game(game, options['output_dir'], chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Exported '{game.name}' to {options['output_dir']}."))
@@ -0,0 +1,130 @@
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from game.cache_versions import bump_version
+from game.domains import invalidate_domain_ids
+from game.games import GameRequired, require_game
+from game.import_utils import detect_format, read_rows
+from game.models import Domain, Game, Round
+
+REQUIRED_FIELDS = ('domain', 'question_text', 'correct_answer')
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a CSV or JSONL question bank into Rounds for a game. "
+        "Each row needs domain, question_text and correct_answer; round_number is optional "
+        "and is allocated after the highest existing round when missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to a .csv or .jsonl question bank.")
+        parser.add_argument('--game', type=int, help="Game id to import into (defaults to the active game).")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (defaults to the file extension).")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows per bulk insert.")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        fmt = detect_format(path.name, options['format'])
+        if not fmt:
+            raise CommandError("Cannot tell the format from the extension; pass --format csv or --format jsonl.")
+
+        chunk_size = options['chunk_size']
+        if chunk_size <= 0:
+            raise CommandError("--chunk-size must be a positive integer.")
+
+        try:
+            game = require_game(options['game'])
+        except (Game.DoesNotExist, GameRequired) as exc:
+            raise CommandError(str(exc) if not options['game'] else "No matching game found.")
+
+        # Everything we need to validate a row is loaded once up front,
+        # so no per-row queries are made while streaming.
+        domain_ids = dict(Domain.objects.values_list('name', 'id'))
+        taken_numbers = set(Round.objects.filter(game=game).values_list('round_number', flat=True))
+        next_number = max(taken_numbers, default=0) + 1
+
+        created = 0
+        skipped = 0
+        with path.open(newline='', encoding='utf-8') as handle:
+            rows = read_rows(handle, fmt)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+
+                rounds = []
+                for line_no, row in chunk:
+                    error = _validate(row)
+                    if not error:
+                        number, error = _round_number(row, taken_numbers, next_number)
+                    if error:
+                        skipped += 1
+                        self.stderr.write(f"Line {line_no}: {error}")
+                        continue
+
+                    taken_numbers.add(number)
+                    next_number = max(next_number, number + 1)
+                    rounds.append((str(row['domain']).strip(), Round(
+                        game=game,
+                        question_text=row['question_text'],
+                        correct_answer=row['correct_answer'],
+                        round_number=number,
+                    )))
+
+                with transaction.atomic():
+                    new_names = {name for name, _ in rounds} - domain_ids.keys()
+                    if new_names:
+                        for domain in Domain.objects.bulk_create([Domain(name=name) for name in sorted(new_names)]):
+                            domain_ids[domain.name] = domain.id
+                        transaction.on_commit(invalidate_domain_ids)
+                    for name, r in rounds:
+                        r.domain_id = domain_ids[name]
+                    Round.objects.bulk_create([r for _, r in rounds])
+
+                created += len(rounds)
+                self.stdout.write(f"Imported {created} rounds ({skipped} skipped)...")
+
+        # bulk_create skips the Round signals, so announce the new rounds ourselves.
+        bump_version('round', game.id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {created} rounds imported into '{game.name}', {skipped} rows skipped."
+        ))
+
+
+def _validate(row):
+    if not isinstance(row, dict):
+        return "Expected an object."
+    if '_error' in row:
+        return row['_error']
+    missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or '').strip()]
+    if missing:
+        return f"Missing {', '.join(missing)}."
+    if len(str(row['domain']).strip()) > Domain._meta.get_field('name').max_length:
+        return "Domain name is too long."
+    if len(str(row['correct_answer'])) > Round._meta.get_field('correct_answer').max_length:
+        return "correct_answer is too long."
+    return None
+
+
+def _round_number(row, taken_numbers, next_number):
+    raw = row.get('round_number')
+    if raw in (None, ''):
+        while next_number in taken_numbers:
+            next_number += 1
+        return next_number, None
+    try:
+        number = int(raw)
+    except (TypeError, ValueError):
+        return None, f"Invalid round_number {raw!r}."
+    if number <= 0:
+        return None, "round_number must be positive."
+    if number in taken_numbers:
+        return None, f"Round number {number} already exists in this game."
+    return number, None
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game.games import GameRequired, require_game
+from game.import_utils import detect_format, read_rows
+from game.models import Game
+from game.onboarding import DEFAULT_CHUNK_SIZE, onboard_roster
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-registers participants from a CSV or JSONL roster with username, password, "
+        "and optional email and hostel columns. Passwords are hashed in a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to a .csv or .jsonl roster.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (defaults to the file extension).")
+        parser.add_argument('--workers', type=int, help="Hashing processes (0 hashes inline; defaults to the CPU count).")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per bulk insert.")
+        parser.add_argument('--game', type=int, help="Game to register the roster into (defaults to the only active game).")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+        fmt = detect_format(path.name, options['format'])
+        if not fmt:
+            raise CommandError("Cannot tell the format from the extension; pass --format csv or --format jsonl.")
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size must be a positive integer.")
+        try:
+            game = require_game(options['game'])
+        except Game.DoesNotExist:
+            if options['game']:
+                raise CommandError("No matching game found.")
+            game = None  # nothing running yet: participants are not bound to a game
+        except GameRequired as exc:
+            raise CommandError(str(exc))
+
+        def progress(report):
+            self.stdout.write(f"Created {report['created']} participants ({len(report['errors'])} errors)...")
+
+        with path.open(newline='', encoding='utf-8') as handle:
+            report = onboard_roster(
+                read_rows(handle, fmt),
+                game=game,
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+                progress=progress,
+            )
+
+        for error in report['errors']:
+            self.stderr.write(f"Line {error['line']} ({error['username'] or '?'}): {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {report['created']} participants created, {len(report['errors'])} rows rejected."
+        ))
@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from game.db_router import replica_alias
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies the primary SQLite database into the replica file, standing in for real replication "
+        "when developing locally. Use --every to keep refreshing (the interval is the simulated lag)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0, help="Refresh every N seconds until interrupted.")
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias is None:
+            raise CommandError("No replica configured. Set TRUST_GAME_REPLICA_DB to a second SQLite file.")
+        primary, replica = connections.databases['default'], connections.databases[alias]
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError("refresh_replica only copies SQLite files; use the database's own replication.")
+
+        while True:
+            started = time.perf_counter()
+            source, target = sqlite3.connect(primary['NAME']), sqlite3.connect(replica['NAME'])
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+            self.stdout.write(f"Replica refreshed in {time.perf_counter() - started:.3f}s.")
+            if not options['every']:
+                return
+            try:
+                time.sleep(options['every'])
+            except KeyboardInterrupt:
+                return
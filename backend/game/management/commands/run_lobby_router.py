@@ -0,0 +1,147 @@
+import http.client
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from game.affinity import owner_of
+from game.models import Participant
+
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailers',
+              'transfer-encoding', 'upgrade', 'content-length'}
+TOKEN_TTL = 30
+
+
+class Router:
+    """Maps each request to a worker: the owner of the caller's lobby, or round-robin otherwise."""
+
+    def __init__(self, workers, secret):
+        self.workers = workers
+        self.secret = secret
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.round_robin = itertools.cycle(range(len(workers)))
+
+    def pick(self, path, authorization):
+        lobby_id = None
+        if path.startswith('/api/') and not path.startswith('/api/admin/'):
+            parts = (authorization or '').split()
+            if len(parts) == 2 and parts[0].lower() == 'token':
+                lobby_id = self.lobby_for_token(parts[1])
+        if lobby_id:
+            return self.workers[owner_of(lobby_id, len(self.workers))]
+        if path.startswith('/api/admin/') or path.startswith('/admin/'):
+            return self.workers[0]
+        with self.lock:
+            return self.workers[next(self.round_robin)]
+
+    def lobby_for_token(self, key):
+        now = time.monotonic()
+        with self.lock:
+            cached = self.tokens.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+        try:
+            lobby_id = Participant.objects.filter(user__auth_token__key=key).values_list('current_lobby_id', flat=True).first()
+        finally:
+            # Handler threads are short-lived, so don't leave their connections open.
+            connection.close()
+        with self.lock:
+            self.tokens[key] = (lobby_id, now + TOKEN_TTL)
+        return lobby_id
+
+    def after_admin_write(self):
+        """Lobby membership, rounds or scores may have changed: forget routes and worker state."""
+        with self.lock:
+            self.tokens.clear()
+        for worker in self.workers:
+            try:
+                forward(worker, 'POST', '/api/internal/lobby-state/reset/',
+                        {'Content-Type': 'application/json', 'X-Affinity-Secret': self.secret}, b'{}')
+            except OSError:
+                pass
+
+
+def forward(worker, method, path, headers, body):
+    target = urlsplit(worker)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, response.getheaders(), response.read()
+    finally:
+        conn.close()
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _proxy(self):
+        router = self.server.router
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+
+        worker = router.pick(self.path, self.headers.get('Authorization'))
+        try:
+            status, response_headers, data = forward(worker, self.command, self.path, headers, body)
+        except OSError as exc:
+            status, response_headers = 502, [('Content-Type', 'application/json')]
+            data = json.dumps({'detail': f'Worker {worker} unavailable: {exc}'}).encode()
+
+        self.send_response(status)
+        for name, value in response_headers:
+            if name.lower() not in HOP_BY_HOP:
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+        is_admin_write = self.command != 'GET' and (self.path.startswith('/api/admin/') or self.path.startswith('/admin/'))
+        if is_admin_write and status < 400:
+            router.after_admin_write()
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _proxy
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a small HTTP router for lobby-affinity mode. Start one app worker per --workers URL, "
+        "each with LOBBY_AFFINITY_WORKERS=<count>, LOBBY_AFFINITY_WORKER=<its position in the list> "
+        "and the same LOBBY_AFFINITY_SECRET, e.g.\n"
+        "  LOBBY_AFFINITY_WORKERS=2 LOBBY_AFFINITY_WORKER=0 LOBBY_AFFINITY_SECRET=s manage.py runserver 8001\n"
+        "  LOBBY_AFFINITY_WORKERS=2 LOBBY_AFFINITY_WORKER=1 LOBBY_AFFINITY_SECRET=s manage.py runserver 8002\n"
+        "  LOBBY_AFFINITY_SECRET=s manage.py run_lobby_router --workers http://127.0.0.1:8001,http://127.0.0.1:8002"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', required=True, help="Comma-separated worker base URLs, in worker-index order.")
+        parser.add_argument('--bind', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8000)
+
+    def handle(self, *args, **options):
+        workers = [w.strip().rstrip('/') for w in options['workers'].split(',') if w.strip()]
+        if not workers:
+            raise CommandError("At least one worker URL is required.")
+        secret = settings.LOBBY_AFFINITY.get('SECRET')
+        if not secret:
+            raise CommandError("Set LOBBY_AFFINITY_SECRET so the router can reset worker state.")
+
+        server = ThreadingHTTPServer((options['bind'], options['port']), ProxyHandler)
+        server.router = Router(workers, secret)
+        self.stdout.write(f"Routing http://{options['bind']}:{options['port']} to {len(workers)} workers. Ctrl-C to stop.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
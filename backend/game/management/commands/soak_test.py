@@ -0,0 +1,440 @@
+import asyncio
+import json
+import math
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from game.models import Domain, Game, Round
+
+PHASES = ('register', 'login', 'assign-lobbies', 'open', 'submit', 'end-round', 'leaderboard')
+ANSWER = '42'
+# How players act when they submit, and how often a solver gets it right.
+ACTION_MIX = (('SOLVE', 0.5), ('DELEGATE', 0.35), ('PASS', 0.15))
+SOLVE_ACCURACY = 0.7
+# A probe that waited longer than this for the write lock counts as contended.
+CONTENDED_MS = 1.0
+
+
+def _percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+class _HttpClient:
+    """
+    Just enough HTTP/1.1 for the soak test: JSON bodies, token auth, and a capped pool of
+    keep-alive connections shared by every simulated player.
+    """
+
+    def __init__(self, url, max_connections, timeout):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError("--url must be an http:// URL.")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle = []
+
+    async def request(self, method, path, token=None, data=None):
+        """Returns (status, headers, body). Raises OSError, EOFError or TimeoutError when the request fails."""
+        body = json.dumps(data).encode() if data is not None else b''
+        head = [
+            f'{method} {self.prefix}{path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Accept: application/json',
+            f'Content-Length: {len(body)}',
+        ]
+        if data is not None:
+            head.append('Content-Type: application/json')
+        if token:
+            head.append(f'Authorization: Token {token}')
+        raw = ('\r\n'.join(head) + '\r\n\r\n').encode() + body
+
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                if reused:
+                    reader, writer = self._idle.pop()
+                else:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+                try:
+                    writer.write(raw)
+                    status, headers, payload = await asyncio.wait_for(self._read_response(reader), self.timeout)
+                except TimeoutError:
+                    writer.close()
+                    raise
+                except (OSError, EOFError, ValueError):
+                    writer.close()
+                    if reused:
+                        # The server dropped a connection that sat idle; retry on a new one.
+                        continue
+                    raise
+                if headers.get('connection', '').lower() == 'close':
+                    writer.close()
+                else:
+                    self._idle.append((reader, writer))
+                return status, headers, payload
+
+    def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+    async def _read_response(self, reader):
+        version, status = (await reader.readuntil(b'\r\n')).split(b' ', 2)[:2]
+        headers = {}
+        while (line := await reader.readuntil(b'\r\n')) != b'\r\n':
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if version == b'HTTP/1.0' and headers.get('connection', '').lower() != 'keep-alive':
+            headers['connection'] = 'close'
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            payload = bytearray()
+            while size := int((await reader.readuntil(b'\r\n')).split(b';')[0], 16):
+                payload.extend((await reader.readexactly(size + 2))[:-2])
+            await reader.readuntil(b'\r\n')
+            return int(status), headers, bytes(payload)
+        if 'content-length' in headers:
+            return int(status), headers, await reader.readexactly(int(headers['content-length']))
+        headers['connection'] = 'close'
+        return int(status), headers, await reader.read()
+
+
+class _LockProbe(threading.Thread):
+    """Samples DB lock contention every `interval` seconds, filed under the harness's current phase."""
+    description = ''
+    unit = ''
+
+    def __init__(self, current_phase, interval):
+        super().__init__(daemon=True)
+        self.current_phase = current_phase
+        self.interval = interval
+        self.samples = defaultdict(list)
+        self.timeouts = Counter()
+        self.stopping = threading.Event()
+
+    def run(self):
+        self.open()
+        try:
+            while not self.stopping.wait(self.interval):
+                phase = self.current_phase()
+                value = self.sample()
+                if value is None:
+                    self.timeouts[phase] += 1
+                else:
+                    self.samples[phase].append(value)
+        finally:
+            self.close()
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+
+
+class _SqliteLockProbe(_LockProbe):
+    """
+    Times BEGIN IMMEDIATE on the server's database file, which waits for the same write lock
+    every request that writes has to take, then rolls straight back. The probe holds the lock
+    for microseconds, so it adds almost no contention itself.
+    """
+    description = 'SQLite BEGIN IMMEDIATE wait'
+    unit = 'ms'
+
+    def __init__(self, path, lock_timeout, *args):
+        super().__init__(*args)
+        self.path = path
+        self.lock_timeout = lock_timeout
+
+    def open(self):
+        self.db = sqlite3.connect(self.path, timeout=self.lock_timeout, isolation_level=None, check_same_thread=False)
+
+    def sample(self):
+        started = time.perf_counter()
+        try:
+            self.db.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            return None
+        waited = (time.perf_counter() - started) * 1000
+        self.db.execute('ROLLBACK')
+        return waited
+
+    def close(self):
+        self.db.close()
+
+    @staticmethod
+    def contended(value):
+        return value > CONTENDED_MS
+
+
+class _PostgresLockProbe(_LockProbe):
+    """Counts lock requests that are waiting (not yet granted) in pg_locks."""
+    description = 'Postgres ungranted locks'
+    unit = 'locks'
+
+    def open(self):
+        pass
+
+    def sample(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM pg_locks WHERE NOT granted')
+            return cursor.fetchone()[0]
+
+    def close(self):
+        # Django connections are per thread; this one belongs to the probe.
+        connection.close()
+
+    @staticmethod
+    def contended(value):
+        return value > 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Soak-tests a running server (runserver, gunicorn or an ASGI server) with simulated players. "
+        "Players register and log in through the API and are put in lobbies. For each round they "
+        "poll current-round/, submit an action near the end of the round, and fetch leaderboard/ "
+        "once admin/end-round/ returns. Reports latency percentiles, error and throttling rates, "
+        "and DB write-lock contention for each phase. The server must use the same database "
+        "as this command, since rounds are opened here through the ORM, as the Django admin "
+        "would open them. A fresh game and question domain are created, and they and the players "
+        "are deleted afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000/api', help="API root of the server under test.")
+        parser.add_argument('--players', type=int, default=200)
+        parser.add_argument('--lobby-size', type=int, default=10)
+        parser.add_argument('--rounds', type=int, default=3)
+        parser.add_argument('--round-seconds', type=float, default=30, help="How long each round stays open.")
+        parser.add_argument('--submit-window', type=float, default=10, help="Players submit during the last N seconds of a round.")
+        parser.add_argument('--poll-interval', type=float, default=2, help="Seconds between one player's current-round polls.")
+        parser.add_argument('--connections', type=int, default=100, help="Most HTTP connections open at once.")
+        parser.add_argument('--timeout', type=float, default=60, help="Seconds before a request counts as timed out.")
+        parser.add_argument('--probe-interval', type=float, default=0.05, help="Seconds between lock contention samples.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help="Keep the soak game and its players afterwards.")
+
+    def handle(self, *args, **options):
+        if options['players'] < 2 or options['lobby_size'] < 2:
+            raise CommandError("Need at least 2 players and a lobby size of at least 2.")
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.phase = None
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.phase_seconds = Counter()
+
+        stamp = int(time.time())
+        self.prefix = f'soak{stamp}_'
+        self.game = Game.objects.create(name=f"Soak test {stamp}")
+        admin = User.objects.create_user(f'{self.prefix}admin', is_staff=True)
+        self.admin_token = Token.objects.create(user=admin).key
+        self.domain = Domain.objects.create(name=f"Soak test {stamp}")
+
+        probe = self._lock_probe()
+        if probe:
+            probe.start()
+        try:
+            asyncio.run(self._soak())
+        finally:
+            if probe:
+                probe.stop()
+            if not options['keep']:
+                User.objects.filter(username__startswith=self.prefix).delete()
+                self.game.delete()
+                self.domain.delete()
+            self._report(probe)
+
+    def _lock_probe(self):
+        args = (lambda: self.phase, self.options['probe_interval'])
+        if connection.vendor == 'sqlite' and not connection.is_in_memory_db():
+            return _SqliteLockProbe(connection.settings_dict['NAME'], self.options['timeout'], *args)
+        if connection.vendor == 'postgresql':
+            return _PostgresLockProbe(*args)
+        return None
+
+    @contextmanager
+    def _in_phase(self, name):
+        self.phase = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] += time.perf_counter() - started
+
+    async def _call(self, endpoint, method, path, token=None, data=None):
+        """Sends one request and files it under the current phase. Returns the JSON body of a 2xx, else None."""
+        key = (self.phase, endpoint)
+        started = time.perf_counter()
+        try:
+            status, headers, body = await self.client.request(method, path, token, data)
+        except TimeoutError:
+            self.outcomes[key]['timeout'] += 1
+            return None
+        except (OSError, EOFError, ValueError):
+            self.outcomes[key]['connection error'] += 1
+            return None
+        self.latencies[key].append((time.perf_counter() - started) * 1000)
+        if status == 429 or (status == 200 and 'retry-after' in headers):
+            # Rejected, or an earlier response replayed by the poll throttle.
+            self.outcomes[key]['throttled'] += 1
+        elif status < 300:
+            self.outcomes[key]['ok'] += 1
+            return json.loads(body) if body else {}
+        elif status >= 500 and b'database is locked' in body:
+            self.outcomes[key][f'{status} database is locked'] += 1
+        else:
+            self.outcomes[key][str(status)] += 1
+        return None
+
+    async def _soak(self):
+        options = self.options
+        self.client = _HttpClient(options['url'], options['connections'], options['timeout'])
+        try:
+            await self._run_players()
+        finally:
+            self.client.close()
+
+    async def _run_players(self):
+        options = self.options
+        players = [{'username': f'{self.prefix}{i}', 'targets': []} for i in range(options['players'])]
+
+        with self._in_phase('register'):
+            await asyncio.gather(*(self._register(player) for player in players))
+        with self._in_phase('login'):
+            await asyncio.gather(*(self._login(player) for player in players))
+        players = [player for player in players if player.get('token')]
+        if len(players) < 2:
+            raise CommandError("Fewer than 2 players could log in; see the server log.")
+        with self._in_phase('assign-lobbies'):
+            await self._call('assign-lobbies', 'POST', '/admin/assign-lobbies/', self.admin_token,
+                             {'lobby_size': options['lobby_size'], 'game_id': self.game.id})
+
+        for number in range(1, options['rounds'] + 1):
+            await sync_to_async(Round.objects.create)(
+                game=self.game, domain=self.domain, round_number=number,
+                question_text=f"Soak round {number}", correct_answer=ANSWER,
+            )
+            await self._play_round(players)
+        self.logged_in = len(players)
+
+    async def _register(self, player):
+        data = await self._call('register', 'POST', '/register/', data={
+            'username': player['username'], 'email': f"{player['username']}@example.com",
+            'password': player['username'], 'game_id': self.game.id,
+        })
+        if data:
+            player['id'] = data['participant_id']
+
+    async def _login(self, player):
+        if 'id' not in player:
+            return
+        # Like the client, back off and retry when the login gate sheds load.
+        for _ in range(3):
+            data = await self._call('login', 'POST', '/login/', data={
+                'username': player['username'], 'password': player['username'],
+            })
+            if data:
+                player['token'] = data['token']
+                return
+            await asyncio.sleep(self.rng.uniform(1, 3))
+
+    async def _play_round(self, players):
+        options = self.options
+        window = min(options['submit_window'], options['round_seconds'])
+        closes = time.monotonic() + options['round_seconds']
+        polling = asyncio.gather(*(self._poll(player, closes) for player in players))
+        with self._in_phase('open'):
+            await asyncio.sleep(options['round_seconds'] - window)
+        with self._in_phase('submit'):
+            await asyncio.gather(*(self._submit(player, self.rng.uniform(0, window)) for player in players))
+            await polling
+        with self._in_phase('end-round'):
+            await self._call('end-round', 'POST', '/admin/end-round/', self.admin_token, {'game_id': self.game.id})
+        with self._in_phase('leaderboard'):
+            await asyncio.gather(*(self._call('leaderboard', 'GET', '/leaderboard/', player['token']) for player in players))
+
+    async def _poll(self, player, closes):
+        interval = self.options['poll_interval']
+        # Spread the first polls out, as players arrive over a few seconds.
+        await asyncio.sleep(self.rng.uniform(0, interval))
+        while time.monotonic() < closes:
+            data = await self._call('current-round', 'GET', '/current-round/', player['token'])
+            if data:
+                player['targets'] = [target['id'] for target in data['delegation_targets']]
+            await asyncio.sleep(min(interval * self.rng.uniform(0.8, 1.2), max(closes - time.monotonic(), 0)))
+
+    async def _submit(self, player, delay):
+        await asyncio.sleep(delay)
+        action_type = self.rng.choices([a for a, _ in ACTION_MIX], [w for _, w in ACTION_MIX])[0]
+        if action_type == 'DELEGATE' and not player['targets']:
+            action_type = 'SOLVE'
+        if action_type == 'SOLVE':
+            data = {'action_type': 'SOLVE', 'submitted_answer': ANSWER if self.rng.random() < SOLVE_ACCURACY else 'no idea'}
+        elif action_type == 'DELEGATE':
+            data = {'action_type': 'DELEGATE', 'delegated_to': self.rng.choice(player['targets'])}
+        else:
+            data = {'action_type': 'PASS'}
+        await self._call('submit-action', 'POST', '/submit-action/', player['token'], data)
+
+    def _report(self, probe):
+        options = self.options
+        self.stdout.write(
+            f"{options['players']} players ({getattr(self, 'logged_in', 0)} logged in), lobbies of "
+            f"{options['lobby_size']}, {options['rounds']} rounds against {options['url']}\n"
+        )
+        self.stdout.write(
+            f"{'phase':<16}{'endpoint':<16}{'requests':>9}{'req/s':>9}{'errors':>8}{'throttled':>10}"
+            f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+        failures = []
+        for key in sorted(self.outcomes, key=lambda key: (PHASES.index(key[0]), key[1])):
+            outcomes = self.outcomes[key]
+            total = sum(outcomes.values())
+            errors = {outcome: n for outcome, n in outcomes.items() if outcome not in ('ok', 'throttled')}
+            if errors:
+                failures.append((key, errors))
+            ordered = sorted(self.latencies[key])
+            seconds = self.phase_seconds[key[0]]
+            self.stdout.write(
+                f"{key[0]:<16}{key[1]:<16}{total:>9}{total / seconds if seconds else 0:>9.1f}"
+                f"{sum(errors.values()) / total:>8.1%}{outcomes['throttled'] / total:>10.1%}"
+                + ''.join(f"{_percentile(ordered, q):>9.1f}" for q in (0.5, 0.9, 0.99, 1))
+            )
+        for (phase, endpoint), errors in failures:
+            details = ', '.join(f"{outcome} x{n}" for outcome, n in sorted(errors.items()))
+            self.stdout.write(f"  {phase} {endpoint}: {details}")
+
+        if probe is None:
+            self.stdout.write("\nNo lock contention probe for this database backend.")
+            return
+        self.stdout.write(f"\nLock contention ({probe.description}, sampled every {probe.interval * 1000:.0f} ms)")
+        self.stdout.write(
+            f"{'phase':<16}{'samples':>9}{'contended':>11}{'p50':>9}{'p99':>9}{'max':>9}{'timeouts':>10}  ({probe.unit})"
+        )
+        for phase in PHASES:
+            ordered = sorted(probe.samples[phase])
+            if not ordered and not probe.timeouts[phase]:
+                continue
+            contended = sum(1 for value in ordered if probe.contended(value)) + probe.timeouts[phase]
+            samples = len(ordered) + probe.timeouts[phase]
+            self.stdout.write(
+                f"{phase:<16}{samples:>9}{contended / samples:>11.1%}"
+                + ''.join(f"{_percentile(ordered, q):>9.1f}" for q in (0.5, 0.99, 1))
+                + f"{probe.timeouts[phase]:>10}"
+            )
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_hostel_standings(apps, schema_editor):
+    GameScore = apps.get_model('game', 'GameScore')
+    HostelStanding = apps.get_model('game', 'HostelStanding')
+
+    standings = {}
+    scores = GameScore.objects.filter(participant__hostel__isnull=False).values_list(
+        'game_id', 'participant__hostel_id', 'participant_id', 'score'
+    )
+    for game_id, hostel_id, participant_id, score in scores:
+        standing = standings.get((game_id, hostel_id))
+        if standing is None:
+            standing = standings[(game_id, hostel_id)] = HostelStanding(game_id=game_id, hostel_id=hostel_id)
+        standing.total_score += score
+        standing.participant_count += 1
+        if standing.best_score is None or score > standing.best_score:
+            standing.best_score = score
+            standing.best_participant_id = participant_id
+    HostelStanding.objects.bulk_create(standings.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_alter_round_unique_together_remove_round_lobby'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostelStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_score', models.FloatField(default=0)),
+                ('participant_count', models.PositiveIntegerField(default=0)),
+                ('best_score', models.FloatField(blank=True, null=True)),
+                ('best_participant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='game.participant')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hostel_standings', to='game.game')),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='game.hostel')),
+            ],
+            options={
+                'unique_together': {('game', 'hostel')},
+            },
+        ),
+        migrations.RunPython(backfill_hostel_standings, migrations.RunPython.noop),
+    ]
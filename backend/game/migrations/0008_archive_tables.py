@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_hostelstanding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ArchivedRound',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('question_text', models.TextField()),
+                ('correct_answer', models.CharField(max_length=255)),
+                ('is_completed', models.BooleanField(default=True)),
+                ('round_number', models.PositiveIntegerField()),
+                ('domain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='game.domain')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_rounds', to='game.game')),
+            ],
+            options={
+                'unique_together': {('game', 'round_number')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action_type', models.CharField(choices=[('SOLVE', 'Solve'), ('DELEGATE', 'Delegate'), ('PASS', 'Pass')], max_length=10)),
+                ('submitted_answer', models.TextField(blank=True, null=True)),
+                ('is_solve_correct', models.BooleanField(blank=True, null=True)),
+                ('points_awarded', models.FloatField(default=0)),
+                ('delegated_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='game.participant')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.participant')),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actions', to='game.archivedround')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedGameScore',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('score', models.FloatField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_scores', to='game.game')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.participant')),
+            ],
+            options={
+                'unique_together': {('game', 'participant')},
+            },
+        ),
+    ]
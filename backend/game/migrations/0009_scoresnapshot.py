@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveIntegerField()),
+                ('lobby_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_snapshots', to='game.game')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_snapshots', to='game.participant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['participant', 'game', 'round_number'], name='game_scores_partici_3cdbe7_idx')],
+                'unique_together': {('game', 'round_number', 'participant')},
+            },
+        ),
+    ]
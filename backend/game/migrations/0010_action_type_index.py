@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_scoresnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='action',
+            index=models.Index(fields=['action_type', 'round'], name='game_action_action__58a686_idx'),
+        ),
+    ]
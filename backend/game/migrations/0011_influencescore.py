@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0010_action_type_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InfluenceScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveIntegerField(blank=True, null=True)),
+                ('reach', models.PositiveIntegerField(default=0)),
+                ('pagerank', models.FloatField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='influence_scores', to='game.game')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='influence_scores', to='game.participant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['game', 'round_number', '-pagerank'], name='game_influe_game_id_74c010_idx')],
+            },
+        ),
+    ]
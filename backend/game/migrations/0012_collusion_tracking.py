@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0011_influencescore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DelegationEdgeStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('edge_key', models.BigIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_round_number', models.PositiveIntegerField(blank=True, null=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delegation_edge_stats', to='game.game')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.participant')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='game.participant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['game', 'source', 'count'], name='game_delega_game_id_27a178_idx'), models.Index(fields=['game', 'target', 'count'], name='game_delega_game_id_b76078_idx')],
+                'unique_together': {('game', 'edge_key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SuspiciousGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('PAIR', 'Reciprocal pair'), ('RING', 'Three-ring')], max_length=4)),
+                ('members_key', models.CharField(max_length=100)),
+                ('strength', models.PositiveIntegerField(default=0)),
+                ('first_round_number', models.PositiveIntegerField()),
+                ('last_round_number', models.PositiveIntegerField()),
+                ('reviewed', models.BooleanField(default=False)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suspicious_groups', to='game.game')),
+            ],
+            options={
+                'unique_together': {('game', 'kind', 'members_key')},
+            },
+        ),
+    ]
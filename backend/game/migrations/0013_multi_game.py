@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_participant_games(apps, schema_editor):
+    Participant = apps.get_model('game', 'Participant')
+    Game = apps.get_model('game', 'Game')
+    Lobby = apps.get_model('game', 'Lobby')
+
+    # Participants in a lobby belong to the lobby's game.
+    for lobby_id, game_id in Lobby.objects.values_list('id', 'game_id'):
+        Participant.objects.filter(current_lobby_id=lobby_id, game__isnull=True).update(game_id=game_id)
+
+    # The rest registered for whichever game was running; that's only knowable if there was one.
+    active = list(Game.objects.filter(is_active=True).values_list('id', flat=True)[:2])
+    if len(active) == 1:
+        Participant.objects.filter(game__isnull=True).update(game_id=active[0])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0012_collusion_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='game',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='participants', to='game.game'),
+        ),
+        migrations.AddIndex(
+            model_name='action',
+            index=models.Index(fields=['round', 'participant'], name='game_action_round_i_296093_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamescore',
+            index=models.Index(fields=['game', '-score'], name='game_gamesc_game_id_9313cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['game', 'current_lobby'], name='game_partic_game_id_783d8a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='round',
+            index=models.Index(fields=['game', 'is_completed', '-round_number'], name='game_round_game_id_a825a9_idx'),
+        ),
+        migrations.RunPython(backfill_participant_games, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0013_multi_game'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('total_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField()),
+                ('participants', models.PositiveIntegerField()),
+                ('delegations', models.PositiveIntegerField()),
+                ('max_chain_depth', models.PositiveIntegerField(default=0)),
+                ('cycles', models.PositiveIntegerField(default=0)),
+                ('cycle_members', models.PositiveIntegerField(default=0)),
+                ('largest_cycle', models.PositiveIntegerField(default=0)),
+                ('phases', models.JSONField(default=list)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scoring_runs', to='game.game')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['game', '-round_number'], name='game_scorin_game_id_6cc3f5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_lobby_snapshots(apps, schema_editor):
+    Participant = apps.get_model('game', 'Participant')
+    RoundRosterEntry = apps.get_model('game', 'RoundRosterEntry')
+
+    # Lobbies weren't recorded until now: the current lobby is the best guess for past actions.
+    current_lobby = Subquery(Participant.objects.filter(id=OuterRef('participant_id')).values('current_lobby_id')[:1])
+    for model_name, round_model_name in (('Action', 'Round'), ('ArchivedAction', 'ArchivedRound')):
+        action_model = apps.get_model('game', model_name)
+        action_model.objects.filter(lobby__isnull=True).update(lobby_id=current_lobby)
+
+        # Scored rounds list the game's current lobby members, as the graph did before, and
+        # everyone who acted in the lobby they acted from.
+        members_by_game = {}
+        rounds = apps.get_model('game', round_model_name).objects.filter(is_completed=True)
+        for round_id, game_id, round_number in rounds.values_list('id', 'game_id', 'round_number').iterator():
+            if game_id not in members_by_game:
+                members_by_game[game_id] = dict(
+                    Participant.objects.filter(current_lobby__game_id=game_id).values_list('id', 'current_lobby_id')
+                )
+            members = dict(members_by_game[game_id])
+            members.update(action_model.objects.filter(round_id=round_id, lobby__isnull=False).values_list('participant_id', 'lobby_id'))
+            RoundRosterEntry.objects.bulk_create([
+                RoundRosterEntry(game_id=game_id, round_number=round_number, participant_id=p_id, lobby_id=lobby_id)
+                for p_id, lobby_id in members.items()
+            ], batch_size=2000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0014_scoring_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundRosterEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='lobby',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='actions', to='game.lobby'),
+        ),
+        migrations.AddField(
+            model_name='archivedaction',
+            name='lobby',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='game.lobby'),
+        ),
+        migrations.AddIndex(
+            model_name='action',
+            index=models.Index(fields=['round', 'lobby'], name='game_action_round_i_7a09c0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedaction',
+            index=models.Index(fields=['round', 'lobby'], name='game_archiv_round_i_9ad690_idx'),
+        ),
+        migrations.AddField(
+            model_name='roundrosterentry',
+            name='game',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roster_entries', to='game.game'),
+        ),
+        migrations.AddField(
+            model_name='roundrosterentry',
+            name='lobby',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roster_entries', to='game.lobby'),
+        ),
+        migrations.AddField(
+            model_name='roundrosterentry',
+            name='participant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roster_entries', to='game.participant'),
+        ),
+        migrations.AddIndex(
+            model_name='roundrosterentry',
+            index=models.Index(fields=['game', 'round_number', 'lobby'], name='game_roundr_game_id_be6986_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='roundrosterentry',
+            unique_together={('game', 'round_number', 'participant')},
+        ),
+        migrations.RunPython(backfill_lobby_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# SQLite: an external-content FTS5 table over game_selfrating, kept in sync by triggers so
+# bulk_create() and queryset.update() writes are indexed too (they skip model signals).
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE game_selfrating_fts USING fts5(
+        justification, content='game_selfrating', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER game_selfrating_fts_insert AFTER INSERT ON game_selfrating BEGIN
+        INSERT INTO game_selfrating_fts(rowid, justification) VALUES (new.id, new.justification);
+    END
+    """,
+    """
+    CREATE TRIGGER game_selfrating_fts_delete AFTER DELETE ON game_selfrating BEGIN
+        INSERT INTO game_selfrating_fts(game_selfrating_fts, rowid, justification) VALUES ('delete', old.id, old.justification);
+    END
+    """,
+    """
+    CREATE TRIGGER game_selfrating_fts_update AFTER UPDATE OF justification ON game_selfrating BEGIN
+        INSERT INTO game_selfrating_fts(game_selfrating_fts, rowid, justification) VALUES ('delete', old.id, old.justification);
+        INSERT INTO game_selfrating_fts(rowid, justification) VALUES (new.id, new.justification);
+    END
+    """,
+    # Index the rows that already exist.
+    "INSERT INTO game_selfrating_fts(game_selfrating_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS game_selfrating_fts_update",
+    "DROP TRIGGER IF EXISTS game_selfrating_fts_delete",
+    "DROP TRIGGER IF EXISTS game_selfrating_fts_insert",
+    "DROP TABLE IF EXISTS game_selfrating_fts",
+]
+
+# Postgres: the index lives on the table itself, so there is nothing to keep in sync. The
+# expression must match the one search.py queries with for the planner to use it.
+POSTGRES_FORWARD = [
+    "CREATE INDEX game_selfrating_justification_fts ON game_selfrating "
+    "USING GIN (to_tsvector('english', justification))",
+]
+POSTGRES_REVERSE = ["DROP INDEX IF EXISTS game_selfrating_justification_fts"]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0015_action_lobby_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
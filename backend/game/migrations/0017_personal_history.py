@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def resolve_chains(delegation_graph):
+    # A frozen copy of game.score_history.resolve_chains, so later changes to the app code
+    # can't change what this migration does. Returns {delegator: (end, length)}, with end
+    # None for chains that loop forever.
+    resolved = {}
+    for start in delegation_graph:
+        path, on_path = [], set()
+        node = start
+        while node in delegation_graph and node not in resolved and node not in on_path:
+            path.append(node)
+            on_path.add(node)
+            node = delegation_graph[node]
+        if node in on_path:
+            end, length = None, 0
+        elif node in resolved:
+            end, length = resolved[node]
+        else:
+            end, length = node, 0
+        for node in reversed(path):
+            length += 1
+            resolved[node] = (end, length if end is not None else 0)
+    return resolved
+
+
+def backfill_history(apps, schema_editor):
+    HistoryEntry = apps.get_model('game', 'HistoryEntry')
+    ScoreSnapshot = apps.get_model('game', 'ScoreSnapshot')
+
+    for action_model_name, round_model_name in (('Action', 'Round'), ('ArchivedAction', 'ArchivedRound')):
+        action_model = apps.get_model('game', action_model_name)
+        rounds = apps.get_model('game', round_model_name).objects.filter(is_completed=True).select_related('domain')
+        for round_obj in rounds.iterator():
+            actions = {
+                action.participant_id: action
+                for action in action_model.objects.filter(round_id=round_obj.id).select_related('participant__user', 'delegated_to__user')
+            }
+            if not actions:
+                continue
+            scores_after = dict(
+                ScoreSnapshot.objects.filter(game_id=round_obj.game_id, round_number=round_obj.round_number)
+                .values_list('participant_id', 'score')
+            )
+            usernames = {p_id: action.participant.user.username for p_id, action in actions.items()}
+            usernames.update(
+                (action.delegated_to_id, action.delegated_to.user.username)
+                for action in actions.values() if action.delegated_to_id
+            )
+            chains = resolve_chains({
+                p_id: action.delegated_to_id
+                for p_id, action in actions.items() if action.action_type == 'DELEGATE' and action.delegated_to_id
+            })
+            entries = []
+            for p_id, action in actions.items():
+                end, length = chains.get(p_id, (p_id, 0))
+                end_action = actions.get(end)
+                if end is None:
+                    outcome = 'CYCLE'
+                elif end_action is None or end_action.action_type == 'DELEGATE':
+                    outcome = 'NO_ACTION'
+                elif end_action.action_type == 'PASS':
+                    outcome = 'PASSED'
+                else:
+                    outcome = 'CORRECT' if end_action.is_solve_correct else 'WRONG'
+                entries.append(HistoryEntry(
+                    game_id=round_obj.game_id, round_number=round_obj.round_number, participant_id=p_id,
+                    domain_name=round_obj.domain.name, action_type=action.action_type,
+                    delegated_to_id=action.delegated_to_id, delegated_to_username=usernames.get(action.delegated_to_id, ''),
+                    chain_end_id=end, chain_end_username=usernames.get(end, ''), chain_length=length,
+                    outcome=outcome, points=action.points_awarded, score_after=scores_after.get(p_id, 0),
+                ))
+            HistoryEntry.objects.bulk_create(entries, batch_size=2000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0016_selfrating_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveIntegerField()),
+                ('domain_name', models.CharField(max_length=100)),
+                ('action_type', models.CharField(choices=[('SOLVE', 'Solve'), ('DELEGATE', 'Delegate'), ('PASS', 'Pass')], max_length=10)),
+                ('delegated_to_username', models.CharField(blank=True, max_length=150)),
+                ('chain_end_username', models.CharField(blank=True, max_length=150)),
+                ('chain_length', models.PositiveIntegerField(default=0)),
+                ('outcome', models.CharField(choices=[('CORRECT', 'Solved correctly'), ('WRONG', 'Solved incorrectly'), ('PASSED', 'Passed'), ('CYCLE', 'Delegation cycle'), ('NO_ACTION', 'Chain ended with someone who did not act')], max_length=10)),
+                ('points', models.FloatField()),
+                ('score_after', models.FloatField()),
+                ('chain_end', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='game.participant')),
+                ('delegated_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='game.participant')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history_entries', to='game.game')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history_entries', to='game.participant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['participant', 'game', '-round_number'], name='game_histor_partici_2fdc8e_idx')],
+                'unique_together': {('game', 'round_number', 'participant')},
+            },
+        ),
+        migrations.RunPython(backfill_history, migrations.RunPython.noop),
+    ]
@@ -11,6 +11,8 @@ class Hostel(models.Model):
 class Game(models.Model):
     name = models.CharField(max_length=200, default="The Trust Gambit")
     is_active = models.BooleanField(default=True)
+    # Set once the game's rounds, actions and scores have been moved to the archive tables.
+    is_archived = models.BooleanField(default=False)
     lambda_param = models.FloatField(default=0.5) 
     beta_param = models.FloatField(default=0.2)   
 
@@ -27,9 +29,14 @@ class Lobby(models.Model):
     
 class Participant(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
+    # The game this participant registered for; several games can run at once (see games.py).
+    game = models.ForeignKey(Game, on_delete=models.SET_NULL, null=True, blank=True, related_name='participants')
     hostel = models.ForeignKey(Hostel, on_delete=models.SET_NULL, null=True, blank=True)
     current_lobby = models.ForeignKey(Lobby, on_delete=models.SET_NULL, null=True, blank=True, related_name='participants')
 
+    class Meta:
+        indexes = [models.Index(fields=['game', 'current_lobby'])]
+
     def __str__(self):
         return self.user.username
 
@@ -66,6 +73,8 @@ class Round(models.Model):
 
     class Meta:
         unique_together = ('game', 'round_number')
+        # The open round of a game, newest first.
+        indexes = [models.Index(fields=['game', 'is_completed', '-round_number'])]
 
     def __str__(self):
         return f"Round {self.round_number} ({self.domain.name})"
@@ -89,10 +98,22 @@ class Action(models.Model):
         blank=True,
         related_name='delegated_by'
     )
+    # The lobby the participant submitted from, so later lobby moves don't rewrite history.
+    lobby = models.ForeignKey(Lobby, on_delete=models.SET_NULL, null=True, blank=True, related_name='actions')
     
     is_solve_correct = models.BooleanField(null=True, blank=True)
     points_awarded = models.FloatField(default=0)
 
+    class Meta:
+        # Backs the admin's action-type filter, alone or combined with a round/game filter.
+        indexes = [
+            models.Index(fields=['action_type', 'round']),
+            # One action per participant per round is checked on every submission.
+            models.Index(fields=['round', 'participant']),
+            # A lobby's actions in a round: delegation graphs and per-lobby splits.
+            models.Index(fields=['round', 'lobby']),
+        ]
+
     def __str__(self):
         return f"{self.participant.user.username} chose to {self.action_type} in Round {self.round.round_number}"
 
@@ -103,6 +124,248 @@ class GameScore(models.Model):
 
     class Meta:
         unique_together = ('game', 'participant')
+        indexes = [models.Index(fields=['game', '-score'])]
+
+    def __str__(self):
+        return f"{self.participant.user.username}: {self.score} points in {self.game.name}"
+
+class HostelStanding(models.Model):
+    """
+    Materialized per-(game, hostel) aggregate of GameScore totals.
+    Kept up to date incrementally by the scoring engine (see standings.py).
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='hostel_standings')
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='standings')
+    total_score = models.FloatField(default=0)
+    participant_count = models.PositiveIntegerField(default=0)
+    best_participant = models.ForeignKey(Participant, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    best_score = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('game', 'hostel')
+
+    @property
+    def mean_score(self):
+        if not self.participant_count:
+            return 0
+        return self.total_score / self.participant_count
+
+    def __str__(self):
+        return f"{self.hostel.name}: {self.total_score} points in {self.game.name}"
+
+
+# --- Archive tables ---
+# Completed games are moved here in bulk (see archive.py) so the live tables stay small.
+# Rows keep their original primary keys, so existing round ids remain valid.
+
+class ArchivedRound(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='archived_rounds')
+    domain = models.ForeignKey(Domain, on_delete=models.CASCADE)
+    question_text = models.TextField()
+    correct_answer = models.CharField(max_length=255)
+    is_completed = models.BooleanField(default=True)
+    round_number = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('game', 'round_number')
+
+    def __str__(self):
+        return f"Archived round {self.round_number} ({self.domain.name})"
+
+class ArchivedAction(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    round = models.ForeignKey(ArchivedRound, on_delete=models.CASCADE, related_name='actions')
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='+')
+    action_type = models.CharField(max_length=10, choices=Action.ActionType.choices)
+    submitted_answer = models.TextField(null=True, blank=True)
+    delegated_to = models.ForeignKey(Participant, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    lobby = models.ForeignKey(Lobby, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    is_solve_correct = models.BooleanField(null=True, blank=True)
+    points_awarded = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['round', 'lobby'])]
+
+    def __str__(self):
+        return f"{self.participant.user.username} chose to {self.action_type} in archived round {self.round.round_number}"
+
+class ArchivedGameScore(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='archived_scores')
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('game', 'participant')
+
+    def __str__(self):
+        return f"{self.participant.user.username}: {self.score} points in {self.game.name}"
+
+class ScoreSnapshot(models.Model):
+    """
+    A participant's running total and rank right after a round was scored.
+    Keyed by round number rather than Round so history survives archiving.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='score_snapshots')
+    round_number = models.PositiveIntegerField()
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='score_snapshots')
+    score = models.FloatField()
+    rank = models.PositiveIntegerField()
+    lobby_rank = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('game', 'round_number', 'participant')
+        indexes = [models.Index(fields=['participant', 'game', 'round_number'])]
+
+    def __str__(self):
+        return f"{self.participant.user.username}: {self.score} (rank {self.rank}) after round {self.round_number}"
+
+class RoundRosterEntry(models.Model):
+    """
+    Which lobby a participant was in for a scored round, written when the round closes.
+    Keyed by round number rather than Round so it survives archiving.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='roster_entries')
+    round_number = models.PositiveIntegerField()
+    lobby = models.ForeignKey(Lobby, on_delete=models.CASCADE, related_name='roster_entries')
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='roster_entries')
+
+    class Meta:
+        unique_together = ('game', 'round_number', 'participant')
+        indexes = [models.Index(fields=['game', 'round_number', 'lobby'])]
+
+    def __str__(self):
+        return f"{self.participant_id} in {self.lobby_id} for round {self.round_number}"
+
+class HistoryEntry(models.Model):
+    """
+    One participant's round, as the history page shows it: what they did, where their
+    delegation chain ended and what it earned. Written at scoring time so the page is one
+    indexed query. Keyed by round number so it survives archiving.
+    """
+    class Outcome(models.TextChoices):
+        CORRECT = 'CORRECT', 'Solved correctly'
+        WRONG = 'WRONG', 'Solved incorrectly'
+        PASSED = 'PASSED', 'Passed'
+        CYCLE = 'CYCLE', 'Delegation cycle'
+        NO_ACTION = 'NO_ACTION', 'Chain ended with someone who did not act'
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='history_entries')
+    round_number = models.PositiveIntegerField()
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='history_entries')
+    domain_name = models.CharField(max_length=100)
+    action_type = models.CharField(max_length=10, choices=Action.ActionType.choices)
+    delegated_to = models.ForeignKey(Participant, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    delegated_to_username = models.CharField(max_length=150, blank=True)
+    # Where the chain stopped: the participant themself for Solve/Pass, None for cycles.
+    chain_end = models.ForeignKey(Participant, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    chain_end_username = models.CharField(max_length=150, blank=True)
+    chain_length = models.PositiveIntegerField(default=0)
+    outcome = models.CharField(max_length=10, choices=Outcome.choices)
+    points = models.FloatField()
+    score_after = models.FloatField()
+
+    class Meta:
+        unique_together = ('game', 'round_number', 'participant')
+        indexes = [models.Index(fields=['participant', 'game', '-round_number'])]
+
+    def __str__(self):
+        return f"{self.participant_id} in round {self.round_number}: {self.get_outcome_display()} ({self.points:+g})"
+
+class InfluenceScore(models.Model):
+    """
+    Transitive trust influence of a participant (see influence.py), per scored round, or for
+    the whole game when round_number is NULL. Keyed by round number so it survives archiving.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='influence_scores')
+    round_number = models.PositiveIntegerField(null=True, blank=True)
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='influence_scores')
+    # Participants whose delegation chain ends at this one (summed over rounds when cumulative).
+    reach = models.PositiveIntegerField(default=0)
+    pagerank = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['game', 'round_number', '-pagerank'])]
+
+    def __str__(self):
+        scope = f"round {self.round_number}" if self.round_number is not None else "all rounds"
+        return f"{self.participant.user.username}: reach {self.reach}, pagerank {self.pagerank:.4f} ({scope})"
+
+class DelegationEdgeStat(models.Model):
+    """How many rounds of a game `source` delegated to `target` in (see collusion.py)."""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='delegation_edge_stats')
+    source = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='+')
+    target = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='+')
+    # source_id and target_id packed into one integer, so a round's edges are looked up with one IN.
+    edge_key = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    last_round_number = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('game', 'edge_key')
+        # Frequent out- and in-edges of a participant, for ring detection.
+        indexes = [models.Index(fields=['game', 'source', 'count']), models.Index(fields=['game', 'target', 'count'])]
+
+    @staticmethod
+    def key_for(source_id, target_id):
+        return (source_id << 32) | target_id
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.target_id}: {self.count}x"
+
+class SuspiciousGroup(models.Model):
+    """A reciprocal pair or three-ring whose delegations keep repeating across rounds."""
+    class Kind(models.TextChoices):
+        PAIR = 'PAIR', 'Reciprocal pair'
+        RING = 'RING', 'Three-ring'
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='suspicious_groups')
+    kind = models.CharField(max_length=4, choices=Kind.choices)
+    # Sorted participant ids joined with '-', e.g. "3-8-12".
+    members_key = models.CharField(max_length=100)
+    # The fewest times any edge of the group has been used.
+    strength = models.PositiveIntegerField(default=0)
+    first_round_number = models.PositiveIntegerField()
+    last_round_number = models.PositiveIntegerField()
+    reviewed = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('game', 'kind', 'members_key')
+
+    @staticmethod
+    def members_key_for(participant_ids):
+        return '-'.join(str(p_id) for p_id in sorted(participant_ids))
+
+    @property
+    def member_ids(self):
+        return [int(p_id) for p_id in self.members_key.split('-')]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.members_key} ({self.strength}x)"
+
+class ScoringRun(models.Model):
+    """
+    Timings and sizes of one calculate_scores_for_round call (see tracing.py).
+    Keyed by round number so the history survives archiving.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='scoring_runs')
+    round_number = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    total_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    participants = models.PositiveIntegerField()
+    delegations = models.PositiveIntegerField()
+    # Longest delegation chain that ends in a Solve/Pass (or a dangling delegation), in edges.
+    max_chain_depth = models.PositiveIntegerField(default=0)
+    cycles = models.PositiveIntegerField(default=0)
+    cycle_members = models.PositiveIntegerField(default=0)
+    largest_cycle = models.PositiveIntegerField(default=0)
+    # [{"name", "ms", "queries", "rows"}, ...] in execution order.
+    phases = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [models.Index(fields=['game', '-round_number'])]
 
     def __str__(self):
-        return f"{self.participant.user.username}: {self.score} points in {self.game.name}"
\ No newline at end of file
+        return f"Scoring of round {self.round_number}: {self.total_ms:.0f} ms, {self.query_count} queries"
@@ -0,0 +1,189 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from rest_framework.authtoken.models import Token
+
+from .models import Hostel, Participant
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def onboard_roster(rows, game=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Creates a User, Participant and Token for every roster row.
+
+    `rows` yields (line_number, row) pairs as produced by import_utils.read_rows; each row
+    needs username and password, and may carry email and hostel (a hostel name or id).
+    Participants are registered into `game`.
+    Passwords are hashed across the process-wide pool from get_hash_pool() (workers=0 hashes
+    inline) and the rows are inserted chunk by chunk with bulk_create. Invalid rows are reported,
+    never fatal.
+    """
+    if workers is None:
+        workers = getattr(settings, 'ONBOARDING_HASH_WORKERS', None)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    hostels = {}
+    for hostel_id, name in Hostel.objects.values_list('id', 'name'):
+        hostels[name.lower()] = hostel_id
+        hostels[str(hostel_id)] = hostel_id
+
+    report = {'created': 0, 'errors': []}
+    seen_usernames = set()
+    pool = get_hash_pool(workers) if workers > 1 else None
+    try:
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            valid = []
+            for line_no, row in chunk:
+                entry, error = _clean_row(row, hostels, seen_usernames)
+                if error:
+                    report['errors'].append({'line': line_no, 'username': _username(row), 'error': error})
+                else:
+                    seen_usernames.add(entry['username'])
+                    entry['game_id'] = game.id if game else None
+                    valid.append((line_no, entry))
+
+            # One query per chunk catches usernames that are already registered.
+            taken = set(User.objects.filter(
+                username__in=[entry['username'] for _, entry in valid]
+            ).values_list('username', flat=True))
+            for line_no, entry in valid:
+                if entry['username'] in taken:
+                    report['errors'].append({'line': line_no, 'username': entry['username'], 'error': "Username already exists."})
+            valid = [(line_no, entry) for line_no, entry in valid if entry['username'] not in taken]
+
+            passwords = [entry['password'] for _, entry in valid]
+            if pool:
+                hashes = pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4)))
+            else:
+                hashes = map(make_password, passwords)
+            for (_, entry), hashed in zip(valid, hashes):
+                entry['password'] = hashed
+
+            report['created'] += _insert_chunk(valid, report['errors'])
+            if progress:
+                progress(report)
+    except BrokenProcessPool:
+        # A worker died; the next import gets a fresh pool.
+        reset_hash_pool()
+        raise
+    return report
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool(workers):
+    """
+    Returns the process-wide hashing pool, started on first use and reused by every import,
+    so a web worker doesn't spawn processes per request. Asking for another size replaces it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._max_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        return _pool
+
+
+def reset_hash_pool():
+    """Shuts the pool down; the next import starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _init_worker():
+    # Spawned (non-forked) workers need settings loaded before make_password can run;
+    # in forked workers this is a no-op.
+    django.setup()
+
+
+def _username(row):
+    return str(row.get('username') or '').strip() if isinstance(row, dict) else ''
+
+
+def _clean_row(row, hostels, seen_usernames):
+    if not isinstance(row, dict):
+        return None, "Expected an object."
+    if '_error' in row:
+        return None, row['_error']
+
+    username = _username(row)
+    password = str(row.get('password') or '')
+    if not username:
+        return None, "Missing username."
+    if len(username) > User._meta.get_field('username').max_length:
+        return None, "Username is too long."
+    if not password:
+        return None, "Missing password."
+    if username in seen_usernames:
+        return None, "Duplicate username in roster."
+
+    hostel = str(row.get('hostel') or '').strip()
+    hostel_id = None
+    if hostel:
+        hostel_id = hostels.get(hostel.lower())
+        if hostel_id is None:
+            return None, f"Unknown hostel {hostel!r}."
+
+    return {
+        'username': username,
+        'email': str(row.get('email') or '').strip(),
+        'password': password,
+        'hostel_id': hostel_id,
+    }, None
+
+
+def _insert_chunk(valid, errors):
+    """Bulk inserts a cleaned chunk; falls back to row-by-row savepoints if the bulk insert conflicts."""
+    if not valid:
+        return 0
+    try:
+        with transaction.atomic():
+            _bulk_insert([entry for _, entry in valid])
+        return len(valid)
+    except IntegrityError:
+        pass
+
+    # Someone registered one of these usernames concurrently; isolate the offending rows.
+    created = 0
+    for line_no, entry in valid:
+        try:
+            with transaction.atomic():
+                _bulk_insert([entry])
+            created += 1
+        except IntegrityError:
+            errors.append({'line': line_no, 'username': entry['username'], 'error': "Username already exists."})
+    return created
+
+
+def _bulk_insert(entries):
+    users = User.objects.bulk_create([
+        User(username=entry['username'], email=entry['email'], password=entry['password'])
+        for entry in entries
+    ])
+    Participant.objects.bulk_create([
+        Participant(user=user, hostel_id=entry['hostel_id'], game_id=entry['game_id'])
+        for user, entry in zip(users, entries)
+    ])
+    # bulk_create skips Token.save(), which is where keys are normally generated.
+    Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
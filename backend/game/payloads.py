@@ -0,0 +1,115 @@
+"""
+Builders for the gameplay payloads shared by the regular views and the state-sync endpoint.
+Each one is cached under the version counters it depends on (see cache_versions.py), and
+concurrent misses for the same entry are coalesced into one build (see singleflight.py).
+"""
+from django.core.cache import cache
+
+from .cache_versions import PAYLOAD_TIMEOUT, get_version, payload_key, shared_cache
+from .db_router import current_read_alias, replica_payload_timeout
+from .games import open_rounds
+from .models import Action, GameScore, Participant, RoundRosterEntry
+from .serializers import GameScoreSerializer, RoundSerializer
+from .singleflight import flights
+
+
+def cached(key, build):
+    """build(), cached under `key` when the cache is shared between workers (see cache_versions.py)."""
+    if not shared_cache():
+        return build()
+    # Replica reads may lag the version counters, so they get their own short-lived entries.
+    if current_read_alias():
+        key = f"{key}:replica"
+    data = cache.get(key)
+    if data is None:
+        def build_and_store():
+            data = build()
+            cache.set(key, data, replica_payload_timeout(PAYLOAD_TIMEOUT))
+            return data
+        data = flights.do(key, build_and_store, lookup=lambda: cache.get(key))
+    return data
+
+
+def current_round(game):
+    """The current open round of `game` (see games.open_rounds), or None."""
+    return open_rounds(game.id).select_related('domain').first()
+
+
+def round_payload(game):
+    def build():
+        round_obj = current_round(game)
+        return RoundSerializer(round_obj).data if round_obj else {}
+    return cached(payload_key('round', game.id, get_version('round', game.id)), build) or None
+
+
+def roster_payload(lobby_id):
+    def build():
+        return [
+            {'id': p_id, 'username': username}
+            for p_id, username in Participant.objects.filter(current_lobby_id=lobby_id).values_list('id', 'user__username')
+        ]
+    return cached(payload_key('roster-list', lobby_id, get_version('roster', lobby_id)), build)
+
+
+def leaderboard_payload(lobby_id):
+    def build():
+        queryset = GameScore.objects.filter(
+            participant__current_lobby_id=lobby_id, game__lobbies=lobby_id
+        ).select_related('participant__user').order_by('-score')
+        return GameScoreSerializer(queryset, many=True).data
+    return cached(payload_key('leaderboard-list', lobby_id, get_version('leaderboard', lobby_id)), build)
+
+
+def graph_version(round_id, lobby_id):
+    """The graph lists lobby members as nodes, so it changes with the round's edges or the roster."""
+    return f"{round_id}.{get_version('graph', round_id, lobby_id)}.{get_version('roster', lobby_id)}"
+
+
+def _roster_snapshot(round_obj):
+    return RoundRosterEntry.objects.filter(game_id=round_obj.game_id, round_number=round_obj.round_number)
+
+
+def round_lobby_id(round_obj, participant):
+    """The lobby `participant` played `round_obj` in: the snapshot once it's scored, else their current one."""
+    if round_obj.is_completed:
+        lobby_id = _roster_snapshot(round_obj).filter(participant=participant).values_list('lobby_id', flat=True).first()
+        if lobby_id:
+            return lobby_id
+    return participant.current_lobby_id
+
+
+def graph_nodes(round_obj, lobby_id):
+    """(participant id, username) rows for the graph: the round's roster snapshot once it's scored."""
+    if round_obj.is_completed:
+        return _roster_snapshot(round_obj).filter(lobby_id=lobby_id).order_by('participant_id').values_list(
+            'participant_id', 'participant__user__username'
+        )
+    return Participant.objects.filter(current_lobby_id=lobby_id).values_list('id', 'user__username')
+
+
+def graph_edges(round_obj, lobby_id):
+    """(source, target) rows for the delegations made from `lobby_id` in `round_obj`; one (round, lobby) index scan."""
+    return round_obj.actions.filter(
+        lobby_id=lobby_id,
+        action_type=Action.ActionType.DELEGATE,
+        delegated_to__isnull=False,
+    ).order_by('id').values_list('participant_id', 'delegated_to_id')
+
+
+def delegation_graph_payload(round_obj, lobby_id):
+    """Nodes for every lobby member and an edge for each delegation made in `round_obj`."""
+    def build():
+        nodes = [
+            {'id': str(p_id), 'data': {'label': username}, 'position': {'x': 0, 'y': 0}}
+            for p_id, username in graph_nodes(round_obj, lobby_id)
+        ]
+        edges = []
+        for source, target in graph_edges(round_obj, lobby_id):
+            edges.append({
+                'id': f"e-{source}-{target}",
+                'source': str(source),
+                'target': str(target),
+                'animated': True,
+            })
+        return {'nodes': nodes, 'edges': edges}
+    return cached(payload_key('graph', lobby_id, graph_version(round_obj.id, lobby_id)), build)
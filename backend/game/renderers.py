@@ -0,0 +1,269 @@
+"""
+A compact binary alternative to JSON for the large gameplay payloads (leaderboards, delegation
+graphs, rating and round lists), chosen by content negotiation:
+
+    Accept: application/vnd.trustgame+msgpack     (or ?format=msgpack)
+
+The encoding is a MessagePack dialect with key interning. Map keys are numbered in order of
+first appearance. The first occurrence is written as a string, later ones as its number, a
+positive int, which is one byte for the first 128 distinct keys. Payload keys are always
+strings (as in JSON), so in this format an int key is always a back-reference. A stock
+MessagePack decoder will parse the bytes, but repeated keys come out as those numbers until
+the key table is rebuilt; unpackb() here does that. Maps with int keys from other encoders
+are not this format and don't decode correctly.
+
+The codec is pure Python, so encoding and especially decoding cost more CPU than the C json
+module; what it buys is bandwidth (roughly a third of the JSON size, a little smaller
+than JSON even once gzipped).
+
+JSON is still listed first in DEFAULT_RENDERER_CLASSES, so clients that don't ask for this
+format get exactly the bytes they got before. See `manage.py bench_renderers` for sizes and
+timings.
+"""
+import struct
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+MEDIA_TYPE = 'application/vnd.trustgame+msgpack'
+
+_json_default = JSONEncoder().default
+_pack_double = struct.Struct('>d').pack
+_unpack_double = struct.Struct('>d').unpack_from
+_float32 = struct.Struct('>f')
+
+# (limit, marker, struct) per size class, smallest first.
+_UINTS = ((0xff, 0xcc, struct.Struct('>B')), (0xffff, 0xcd, struct.Struct('>H')),
+          (0xffffffff, 0xce, struct.Struct('>I')), (0xffffffffffffffff, 0xcf, struct.Struct('>Q')))
+_INTS = ((0x7f, 0xd0, struct.Struct('>b')), (0x7fff, 0xd1, struct.Struct('>h')),
+         (0x7fffffff, 0xd2, struct.Struct('>i')), (0x7fffffffffffffff, 0xd3, struct.Struct('>q')))
+_STRS = ((0xff, 0xd9, struct.Struct('>B')), (0xffff, 0xda, struct.Struct('>H')), (0xffffffff, 0xdb, struct.Struct('>I')))
+_BINS = ((0xff, 0xc4, struct.Struct('>B')), (0xffff, 0xc5, struct.Struct('>H')), (0xffffffff, 0xc6, struct.Struct('>I')))
+_ARRAYS = ((0xffff, 0xdc, struct.Struct('>H')), (0xffffffff, 0xdd, struct.Struct('>I')))
+_MAPS = ((0xffff, 0xde, struct.Struct('>H')), (0xffffffff, 0xdf, struct.Struct('>I')))
+
+
+def _sized(out, n, classes):
+    for limit, marker, size in classes:
+        if n <= limit:
+            out.append(marker)
+            out.extend(size.pack(n))
+            return
+    raise ValueError("Value too large to encode.")
+
+
+def _json_key(key):
+    # The key json.dumps would write for a non-string dict key.
+    if key is True:
+        return 'true'
+    if key is False:
+        return 'false'
+    if key is None:
+        return 'null'
+    return str(key)
+
+
+def packb(data):
+    """Encodes JSON-compatible data (plus whatever DRF's JSONEncoder handles) as interned MessagePack."""
+    out = bytearray()
+    append, extend = out.append, out.extend
+    # key -> the bytes that refer back to it once it has been written.
+    keys = {}
+
+    def encode_int(value):
+        if 0 <= value < 0x80:
+            append(value)
+        elif -0x20 <= value < 0:
+            append(value & 0xff)
+        elif value > 0:
+            if value > 0xffffffffffffffff:
+                encode_str(str(value))
+            else:
+                _sized(out, value, _UINTS)
+        elif value < -0x8000000000000000:
+            encode_str(str(value))
+        else:
+            for limit, marker, size in _INTS:
+                if value >= -limit - 1:
+                    append(marker)
+                    extend(size.pack(value))
+                    return
+
+    def encode_str(value):
+        raw = value.encode('utf-8')
+        n = len(raw)
+        if n < 32:
+            append(0xa0 | n)
+        else:
+            _sized(out, n, _STRS)
+        extend(raw)
+
+    def encode(value):
+        kind = type(value)
+        if kind is str:
+            encode_str(value)
+        elif kind is int:
+            encode_int(value)
+        elif value is None:
+            append(0xc0)
+        elif value is True:
+            append(0xc3)
+        elif value is False:
+            append(0xc2)
+        elif kind is float:
+            append(0xcb)
+            extend(_pack_double(value))
+        elif isinstance(value, dict):
+            n = len(value)
+            if n < 16:
+                append(0x80 | n)
+            else:
+                _sized(out, n, _MAPS)
+            for key, item in value.items():
+                if type(key) is not str:
+                    key = key if isinstance(key, str) else _json_key(key)
+                ref = keys.get(key)
+                if ref is None:
+                    keys[key] = _key_ref(len(keys))
+                    encode_str(key)
+                else:
+                    extend(ref)
+                # Most values are short strings; skip the dispatch for them.
+                if type(item) is str and len(item) < 32 and item.isascii():
+                    append(0xa0 | len(item))
+                    extend(item.encode())
+                else:
+                    encode(item)
+        elif isinstance(value, (list, tuple)):
+            n = len(value)
+            if n < 16:
+                append(0x90 | n)
+            else:
+                _sized(out, n, _ARRAYS)
+            for item in value:
+                encode(item)
+        elif isinstance(value, str):
+            encode_str(value)
+        elif isinstance(value, int):
+            encode_int(int(value))
+        elif isinstance(value, float):
+            encode(float(value))
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            _sized(out, len(value), _BINS)
+            extend(value)
+        else:
+            # Dates, decimals, UUIDs, lazy strings, querysets...: whatever JSON would have written.
+            encode(_json_default(value))
+
+    encode(data)
+    return bytes(out)
+
+
+def _key_ref(index):
+    if index < 0x80:
+        return bytes((index,))
+    ref = bytearray()
+    _sized(ref, index, _UINTS)
+    return bytes(ref)
+
+
+def unpackb(data):
+    """Decodes packb() output back to Python objects. Every int map key is read as a back-reference."""
+    view = memoryview(data)
+    keys = []
+    pos = 0
+
+    def read(n):
+        nonlocal pos
+        if pos + n > len(view):
+            raise ValueError("Truncated payload.")
+        chunk = view[pos:pos + n]
+        pos += n
+        return chunk
+
+    def read_uint(size):
+        return int.from_bytes(read(size), 'big')
+
+    def read_int(size):
+        return int.from_bytes(read(size), 'big', signed=True)
+
+    def decode_map(n):
+        result = {}
+        for _ in range(n):
+            key = decode()
+            if type(key) is int:
+                try:
+                    key = keys[key]
+                except IndexError:
+                    raise ValueError("Unknown interned key.") from None
+            elif type(key) is str:
+                keys.append(key)
+            else:
+                raise ValueError("Map keys must be strings.")
+            result[key] = decode()
+        return result
+
+    def decode():
+        marker = read(1)[0]
+        if marker < 0x80:
+            return marker
+        if marker >= 0xe0:
+            return marker - 0x100
+        if marker <= 0x8f:
+            return decode_map(marker & 0x0f)
+        if marker <= 0x9f:
+            return [decode() for _ in range(marker & 0x0f)]
+        if marker <= 0xbf:
+            return str(read(marker & 0x1f), 'utf-8')
+        if marker == 0xc0:
+            return None
+        if marker == 0xc2:
+            return False
+        if marker == 0xc3:
+            return True
+        if marker in (0xc4, 0xc5, 0xc6):
+            return bytes(read(read_uint(1 << (marker - 0xc4))))
+        if marker == 0xca:
+            return _float32.unpack(read(4))[0]
+        if marker == 0xcb:
+            return _unpack_double(read(8))[0]
+        if 0xcc <= marker <= 0xcf:
+            return read_uint(1 << (marker - 0xcc))
+        if 0xd0 <= marker <= 0xd3:
+            return read_int(1 << (marker - 0xd0))
+        if marker in (0xd9, 0xda, 0xdb):
+            return str(read(read_uint(1 << (marker - 0xd9))), 'utf-8')
+        if marker in (0xdc, 0xdd):
+            return [decode() for _ in range(read_uint(2 if marker == 0xdc else 4))]
+        if marker in (0xde, 0xdf):
+            return decode_map(read_uint(2 if marker == 0xde else 4))
+        raise ValueError(f"Unsupported MessagePack type 0x{marker:02x}.")
+
+    result = decode()
+    if pos != len(view):
+        raise ValueError("Trailing bytes after payload.")
+    return result
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return packb(data)
+
+
+class MessagePackParser(BaseParser):
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return unpackb(stream.read())
+        except (ValueError, UnicodeDecodeError, RecursionError) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
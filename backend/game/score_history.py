@@ -0,0 +1,188 @@
+from .models import Action, GameScore, HistoryEntry, ScoreSnapshot
+
+
+def _ranks(entries):
+    """Standard competition ranking (1, 2, 2, 4) over (key, score) pairs, best score first."""
+    ranks = {}
+    previous = None
+    for position, (key, score) in enumerate(sorted(entries, key=lambda e: -e[1]), start=1):
+        if score != previous:
+            rank = position
+            previous = score
+        ranks[key] = rank
+    return ranks
+
+
+def record_round_snapshot(game, round_obj):
+    """
+    Appends one ScoreSnapshot per participant with a GameScore in `game`, in a single bulk insert.
+    Called by the scoring engine inside its transaction, after the round's points are applied.
+    """
+    rows = list(GameScore.objects.filter(game=game).values_list('participant_id', 'participant__current_lobby_id', 'score'))
+    game_ranks = _ranks([(p_id, score) for p_id, _, score in rows])
+
+    by_lobby = {}
+    for p_id, lobby_id, score in rows:
+        if lobby_id is not None:
+            by_lobby.setdefault(lobby_id, []).append((p_id, score))
+    lobby_ranks = {}
+    for entries in by_lobby.values():
+        lobby_ranks.update(_ranks(entries))
+
+    ScoreSnapshot.objects.bulk_create([
+        ScoreSnapshot(
+            game=game,
+            round_number=round_obj.round_number,
+            participant_id=p_id,
+            score=score,
+            rank=game_ranks[p_id],
+            lobby_rank=lobby_ranks.get(p_id),
+        )
+        for p_id, _, score in rows
+    ])
+
+
+def resolve_chains(delegation_graph):
+    """
+    Follows every delegation chain to its end. Returns {delegator: (end, length)}, where end is
+    the first participant who didn't delegate and length counts edges; end is None for chains
+    that loop forever.
+    """
+    resolved = {}
+    for start in delegation_graph:
+        path, on_path = [], set()
+        node = start
+        while node in delegation_graph and node not in resolved and node not in on_path:
+            path.append(node)
+            on_path.add(node)
+            node = delegation_graph[node]
+        if node in on_path:
+            end, length = None, 0
+        elif node in resolved:
+            end, length = resolved[node]
+        else:
+            end, length = node, 0
+        for node in reversed(path):
+            length += 1
+            resolved[node] = (end, length if end is not None else 0)
+    return resolved
+
+
+def record_personal_history(game, round_obj, actions, scores_after):
+    """
+    Writes one HistoryEntry per action of a scored round, in a single bulk insert.
+    `actions` must have participant__user and delegated_to__user loaded; `scores_after` maps
+    participant id -> running total after the round.
+    """
+    action_map = {action.participant_id: action for action in actions}
+    usernames = {}
+    for action in actions:
+        usernames[action.participant_id] = action.participant.user.username
+        if action.delegated_to_id:
+            usernames[action.delegated_to_id] = action.delegated_to.user.username
+    chains = resolve_chains({
+        action.participant_id: action.delegated_to_id
+        for action in actions if action.action_type == Action.ActionType.DELEGATE and action.delegated_to_id
+    })
+
+    entries = []
+    for p_id, action in action_map.items():
+        end, length = chains.get(p_id, (p_id, 0))
+        end_action = action_map.get(end)
+        if end is None:
+            outcome = HistoryEntry.Outcome.CYCLE
+        elif end_action is None or end_action.action_type == Action.ActionType.DELEGATE:
+            # Delegated to someone who didn't act, or a delegation with no target.
+            outcome = HistoryEntry.Outcome.NO_ACTION
+        elif end_action.action_type == Action.ActionType.PASS:
+            outcome = HistoryEntry.Outcome.PASSED
+        else:
+            outcome = HistoryEntry.Outcome.CORRECT if end_action.is_solve_correct else HistoryEntry.Outcome.WRONG
+        entries.append(HistoryEntry(
+            game=game,
+            round_number=round_obj.round_number,
+            participant_id=p_id,
+            domain_name=round_obj.domain.name,
+            action_type=action.action_type,
+            delegated_to_id=action.delegated_to_id,
+            delegated_to_username=usernames.get(action.delegated_to_id, ''),
+            chain_end_id=end,
+            chain_end_username=usernames.get(end, ''),
+            chain_length=length,
+            outcome=outcome,
+            points=action.points_awarded,
+            score_after=scores_after.get(p_id, 0),
+        ))
+    HistoryEntry.objects.bulk_create(entries, batch_size=2000, ignore_conflicts=True)
+    return len(entries)
+
+
+def personal_history_page(game, participant, offset, limit):
+    """(rounds played, entries newest first) for one page of a participant's history."""
+    entries = HistoryEntry.objects.filter(participant=participant, game=game)
+    page = entries.order_by('-round_number')[offset:offset + limit].values(
+        'round_number', 'domain_name', 'action_type', 'delegated_to_id', 'delegated_to_username',
+        'chain_end_id', 'chain_end_username', 'chain_length', 'outcome', 'points', 'score_after',
+    )
+    return entries.count(), [
+        {
+            'round': row['round_number'],
+            'domain': row['domain_name'],
+            'action': row['action_type'],
+            'delegated_to': (
+                {'id': row['delegated_to_id'], 'username': row['delegated_to_username']} if row['delegated_to_id'] else None
+            ),
+            'chain_end': (
+                {'id': row['chain_end_id'], 'username': row['chain_end_username']} if row['chain_end_id'] else None
+            ),
+            'chain_length': row['chain_length'],
+            'outcome': row['outcome'],
+            'points': row['points'],
+            'score_after': row['score_after'],
+        }
+        for row in page
+    ]
+
+
+def participant_trajectory(game, participant):
+    """Compact parallel arrays of one participant's history in `game`."""
+    snapshots = ScoreSnapshot.objects.filter(participant=participant, game=game).order_by('round_number')
+    trajectory = {'participant': participant.id, 'rounds': [], 'scores': [], 'ranks': [], 'lobby_ranks': []}
+    for round_number, score, rank, lobby_rank in snapshots.values_list('round_number', 'score', 'rank', 'lobby_rank'):
+        trajectory['rounds'].append(round_number)
+        trajectory['scores'].append(score)
+        trajectory['ranks'].append(rank)
+        trajectory['lobby_ranks'].append(lobby_rank)
+    return trajectory
+
+
+def lobby_trajectories(game, lobby_id):
+    """
+    Trajectories for everyone currently in a lobby, aligned on a shared `rounds` array.
+    Entries are None for rounds a participant had no score in yet.
+    """
+    snapshots = ScoreSnapshot.objects.filter(
+        game=game, participant__current_lobby_id=lobby_id
+    ).order_by('round_number').values_list('round_number', 'participant_id', 'participant__user__username', 'score', 'rank')
+
+    rounds = []
+    participants = {}
+    for round_number, p_id, username, score, rank in snapshots:
+        if not rounds or rounds[-1] != round_number:
+            rounds.append(round_number)
+        entry = participants.setdefault(p_id, {'id': p_id, 'username': username, 'scores': {}, 'ranks': {}})
+        entry['scores'][round_number] = score
+        entry['ranks'][round_number] = rank
+
+    return {
+        'rounds': rounds,
+        'participants': [
+            {
+                'id': entry['id'],
+                'username': entry['username'],
+                'scores': [entry['scores'].get(r) for r in rounds],
+                'ranks': [entry['ranks'].get(r) for r in rounds],
+            }
+            for entry in participants.values()
+        ],
+    }
@@ -1,108 +1,176 @@
+import logging
+
+from django.db import transaction
+
 from .models import Round, Action, GameScore
+from .cache_versions import bump_lobbies
+from .collusion import record_round_edges
+from .db_router import mark_round_closed
+from .influence import record_round_influence
+from .lobby_utils import snapshot_round_roster
+from .score_history import record_personal_history, record_round_snapshot
+from .standings import apply_score_deltas
+from .tracing import ScoringTrace, delegation_stats
+
+logger = logging.getLogger(__name__)
 
 def calculate_scores_for_round(round_id):
     """
     Main function to orchestrate the scoring process for a completed round.
-    This function should be called when a round ends.
+    This function should be called when a round ends. Each phase is timed and the run is
+    stored as a ScoringRun (see tracing.py).
     """
-    try:
-        round_obj = Round.objects.get(id=round_id)
-    except Round.DoesNotExist:
-        print(f"Error: Round with id {round_id} not found.")
-        return
-
-    if round_obj.is_completed:
-        print(f"Error: Round {round_id} has already been scored.")
-        return
-
-    game = round_obj.game
-    actions = Action.objects.filter(round=round_obj)
-    action_map = {action.participant.id: action for action in actions}
-    # This dictionary will store the final scores for the round, including bonuses.
-    final_round_points = {p_id: 0 for p_id in action_map.keys()}
-    # This dictionary will store the base points (pre-bonus) used for delegation calculations.
-    base_round_points = {p_id: 0 for p_id in action_map.keys()}
-
-    # --- R4: Detect and Penalize Cycles FIRST ---
-    delegation_graph = {
-        p_id: action.delegated_to.id
-        for p_id, action in action_map.items()
-        if action.action_type == Action.ActionType.DELEGATE and action.delegated_to
-    }
-    all_cycle_members = set()
-
-    # Find all participants who are part of any cycle.
-    for p_id in delegation_graph:
-        # Avoid re-checking if already identified as part of a cycle
-        if p_id in all_cycle_members:
-            continue
-        path = [p_id]
-        current = p_id
-        while current in delegation_graph:
-            current = delegation_graph[current]
-            if current in path:
-                cycle_start_index = path.index(current)
-                # Penalize all members of the found cycle
-                for member_id in path[cycle_start_index:]:
-                    base_round_points[member_id] = -1- 2*game.lambda_param
-                    all_cycle_members.add(member_id)
-                break 
-            path.append(current)
-            # Protection against non-existent nodes in buggy data
-            if current not in delegation_graph and current not in action_map:
-                break
-    
-    # --- R2: Score terminal actions (Solve/Pass) for non-cycle members ---
-    for p_id, action in action_map.items():
-        if p_id in all_cycle_members:
-            continue
-
-        if action.action_type == Action.ActionType.PASS:
-            base_round_points[p_id] = 0
-        elif action.action_type == Action.ActionType.SOLVE:
-            is_correct = (action.submitted_answer or '').lower() == (round_obj.correct_answer or '').lower()
-            action.is_solve_correct = is_correct
-            base_round_points[p_id] = 1 if is_correct else -1
-    
-    # --- R2 (Delegation): Calculate delegation points based on pre-bonus scores ---
-    memo = {}
-    for p_id in action_map:
-        if action_map[p_id].action_type == Action.ActionType.DELEGATE:
-            _calculate_delegation_points(p_id, action_map, base_round_points, game, memo, all_cycle_members)
-
-    # All base scores are now calculated. Copy them to the final score map.
-    for p_id, points in base_round_points.items():
-        final_round_points[p_id] = points
-
-    # --- R3: Apply Reputation Bonus AFTER all base scores are set ---
-    trust_counts = {}
-    for action in actions:
-        if action.action_type == Action.ActionType.DELEGATE and action.delegated_to:
-            delegated_to_id = action.delegated_to.id
-            trust_counts[delegated_to_id] = trust_counts.get(delegated_to_id, 0) + 1
-    
-    for p_id, base_points in base_round_points.items():
-        # Bonus is only applied if the base score (from solving) is positive.
-        if base_points > 0 and action_map[p_id].action_type == Action.ActionType.SOLVE:
-            bonus = game.beta_param * trust_counts.get(p_id, 0)
-            final_round_points[p_id] += bonus
-
-    # --- Finalize and Save Scores ---
-    for p_id, points in final_round_points.items():
-        action = action_map[p_id]
-        action.points_awarded = points
-        action.save()
-
-        score_obj, created = GameScore.objects.get_or_create(
-            game=game,
-            participant=action.participant
-        )
-        score_obj.score += points
-        score_obj.save()
-
-    round_obj.is_completed = True
-    round_obj.save()
-    print(f"Scoring for Round {round_id} complete.")
+    trace = ScoringTrace()
+    with trace.run():
+        try:
+            round_obj = Round.objects.select_related('game', 'domain').get(id=round_id)
+        except Round.DoesNotExist:
+            logger.error("Round with id %s not found.", round_id)
+            return
+
+        if round_obj.is_completed:
+            logger.warning("Round %s has already been scored.", round_id)
+            return
+
+        game = round_obj.game
+        with trace.phase('load') as phase:
+            actions = list(Action.objects.filter(round=round_obj).select_related('participant__user', 'delegated_to__user'))
+            action_map = {action.participant.id: action for action in actions}
+            phase.rows = len(actions)
+        # This dictionary will store the final scores for the round, including bonuses.
+        final_round_points = {p_id: 0 for p_id in action_map.keys()}
+        # This dictionary will store the base points (pre-bonus) used for delegation calculations.
+        base_round_points = {p_id: 0 for p_id in action_map.keys()}
+
+        # --- R4: Detect and Penalize Cycles FIRST ---
+        with trace.phase('cycles') as phase:
+            delegation_graph = {
+                p_id: action.delegated_to.id
+                for p_id, action in action_map.items()
+                if action.action_type == Action.ActionType.DELEGATE and action.delegated_to
+            }
+            all_cycle_members = set()
+            cycles = set()
+
+            # Find all participants who are part of any cycle.
+            for p_id in delegation_graph:
+                # Avoid re-checking if already identified as part of a cycle
+                if p_id in all_cycle_members:
+                    continue
+                path = [p_id]
+                current = p_id
+                while current in delegation_graph:
+                    current = delegation_graph[current]
+                    if current in path:
+                        cycle_start_index = path.index(current)
+                        # Penalize all members of the found cycle
+                        for member_id in path[cycle_start_index:]:
+                            base_round_points[member_id] = -1- 2*game.lambda_param
+                            all_cycle_members.add(member_id)
+                        cycles.add(frozenset(path[cycle_start_index:]))
+                        break 
+                    path.append(current)
+                    # Protection against non-existent nodes in buggy data
+                    if current not in delegation_graph and current not in action_map:
+                        break
+            phase.rows = len(delegation_graph)
+
+        # --- R2: Score terminal actions (Solve/Pass) for non-cycle members ---
+        with trace.phase('terminal') as phase:
+            for p_id, action in action_map.items():
+                if p_id in all_cycle_members:
+                    continue
+
+                if action.action_type == Action.ActionType.PASS:
+                    base_round_points[p_id] = 0
+                elif action.action_type == Action.ActionType.SOLVE:
+                    is_correct = (action.submitted_answer or '').lower() == (round_obj.correct_answer or '').lower()
+                    action.is_solve_correct = is_correct
+                    base_round_points[p_id] = 1 if is_correct else -1
+            phase.rows = len(action_map) - len(delegation_graph)
+
+        # --- R2 (Delegation): Calculate delegation points based on pre-bonus scores ---
+        with trace.phase('delegation') as phase:
+            memo = {}
+            for p_id in action_map:
+                if action_map[p_id].action_type == Action.ActionType.DELEGATE:
+                    _calculate_delegation_points(p_id, action_map, base_round_points, game, memo, all_cycle_members)
+            trace.stats = delegation_stats(delegation_graph, cycles)
+            phase.rows = len(memo)
+
+        # All base scores are now calculated. Copy them to the final score map.
+        for p_id, points in base_round_points.items():
+            final_round_points[p_id] = points
+
+        # --- R3: Apply Reputation Bonus AFTER all base scores are set ---
+        with trace.phase('bonus') as phase:
+            trust_counts = {}
+            for action in actions:
+                if action.action_type == Action.ActionType.DELEGATE and action.delegated_to:
+                    delegated_to_id = action.delegated_to.id
+                    trust_counts[delegated_to_id] = trust_counts.get(delegated_to_id, 0) + 1
+
+            for p_id, base_points in base_round_points.items():
+                # Bonus is only applied if the base score (from solving) is positive.
+                if base_points > 0 and action_map[p_id].action_type == Action.ActionType.SOLVE:
+                    bonus = game.beta_param * trust_counts.get(p_id, 0)
+                    final_round_points[p_id] += bonus
+            phase.rows = len(trust_counts)
+
+        # --- Finalize and Save Scores ---
+        with transaction.atomic():
+            # The admin's score action and end-round can race for the same round: lock it and
+            # check again, so only one of them applies the scores.
+            if Round.objects.select_for_update().filter(id=round_obj.id).values_list('is_completed', flat=True).get():
+                logger.warning("Round %s has already been scored.", round_id)
+                return
+            with trace.phase('persist') as phase:
+                score_changes = []
+                for p_id, points in final_round_points.items():
+                    action = action_map[p_id]
+                    action.points_awarded = points
+                    action.save()
+
+                    score_obj, created = GameScore.objects.get_or_create(
+                        game=game,
+                        participant=action.participant
+                    )
+                    score_obj.score += points
+                    score_obj.save()
+                    score_changes.append((action.participant, points, score_obj.score, created))
+                phase.rows = len(score_changes)
+
+            with trace.phase('standings'):
+                # Fold this round's deltas into the hostel standings in the same transaction.
+                apply_score_deltas(game, score_changes)
+            with trace.phase('history') as phase:
+                # Append this round's totals and ranks to the score history, and each player's
+                # resolved chain to their personal history.
+                record_round_snapshot(game, round_obj)
+                phase.rows = record_personal_history(
+                    game, round_obj, actions, {participant.id: total for participant, _, total, _ in score_changes}
+                )
+            with trace.phase('roster') as phase:
+                # Who played in which lobby, for this round's graphs once players move on.
+                phase.rows = snapshot_round_roster(round_obj)
+
+            round_obj.is_completed = True
+            round_obj.save()
+            with trace.phase('collusion'):
+                # Cross-round reciprocal pairs and rings, which the per-round cycle check can't see.
+                record_round_edges(game, round_obj, delegation_graph)
+            with trace.phase('influence'):
+                # Transitive influence for this round and the game so far (reads the edge counts
+                # the collusion phase just updated).
+                record_round_influence(game, round_obj, action_map.keys(), delegation_graph)
+
+            # The scored lobbies' cached leaderboards are now stale (the round version is
+            # bumped by the Round post_save signal).
+            bump_lobbies([action.participant.current_lobby_id for action in action_map.values()], scopes=('leaderboard',))
+            mark_round_closed()
+
+    trace.stats.update(participants=len(action_map), delegations=len(delegation_graph))
+    trace.save(game, round_obj)
 
 
 def _calculate_delegation_points(p_id, action_map, base_round_points, game, memo, cycle_members):
@@ -0,0 +1,125 @@
+"""
+Full-text search over self-rating justifications, for organizers choosing domains or checking
+claims ("competition math", "olympiad").
+
+On SQLite, queries go to the game_selfrating_fts FTS5 table. It is an external-content
+index over game_selfrating that triggers keep in sync (migration 0016), and results are
+ranked by bm25. On Postgres, a GIN index on to_tsvector('english', justification) is used,
+ranked by ts_rank. Other backends fall back to an unranked substring scan.
+
+Every search term must match. Terms are stemmed ("olympiads" finds "olympiad"), and a
+trailing * matches a prefix ("olymp*").
+
+If a later migration makes Django rebuild game_selfrating on SQLite (most AlterField
+operations do), the triggers go with the old table. That migration has to recreate them
+from migration 0016's SQL.
+"""
+import re
+
+from django.db import connection
+
+from .models import SelfRating
+
+_TERM = re.compile(r'(\w+)(\*?)', re.UNICODE)
+SNIPPET_WORDS = 12
+
+
+def _terms(query):
+    return [(word, bool(star)) for word, star in _TERM.findall(query)]
+
+
+def _fts5_query(terms):
+    # Each term quoted, so user input can't inject FTS5 operators or column filters.
+    return ' '.join(f'"{word}"' + ('*' if prefix else '') for word, prefix in terms)
+
+
+def _tsquery(terms):
+    return ' & '.join(f"{word}:*" if prefix else word for word, prefix in terms)
+
+
+def _filters(domain_id, min_rating, max_rating, game_id):
+    clauses, params = [], []
+    for clause, value in (
+        ('r.domain_id = %s', domain_id),
+        ('r.rating >= %s', min_rating),
+        ('r.rating <= %s', max_rating),
+        ('p.game_id = %s', game_id),
+    ):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    return ''.join(f' AND {clause}' for clause in clauses), params
+
+
+def search_justifications(query, domain_id=None, min_rating=None, max_rating=None, game_id=None, offset=0, limit=20):
+    """
+    Returns (total matches, page), best matches first. Each page entry is a SelfRating with
+    `search_rank` (higher is better) and `snippet` (the matching text, terms in [brackets]).
+    """
+    terms = _terms(query)
+    if not terms:
+        return 0, []
+    where, params = _filters(domain_id, min_rating, max_rating, game_id)
+    join = 'JOIN game_participant p ON p.id = r.participant_id'
+
+    if connection.vendor == 'sqlite':
+        source = f'game_selfrating_fts JOIN game_selfrating r ON r.id = game_selfrating_fts.rowid {join}'
+        match = 'game_selfrating_fts MATCH %s'
+        rank = '-bm25(game_selfrating_fts)'
+        snippet = f"snippet(game_selfrating_fts, 0, '[', ']', '…', {SNIPPET_WORDS})"
+        search_params = [_fts5_query(terms)]
+        select_params = []
+    elif connection.vendor == 'postgresql':
+        source = f'game_selfrating r {join}'
+        vector, tsquery = "to_tsvector('english', r.justification)", "to_tsquery('english', %s)"
+        match = f'{vector} @@ {tsquery}'
+        rank = f'ts_rank({vector}, {tsquery})'
+        snippet = (
+            f"ts_headline('english', r.justification, {tsquery}, "
+            f"'StartSel=[, StopSel=], MaxWords={SNIPPET_WORDS}, MinWords=3')"
+        )
+        search_params = [_tsquery(terms)]
+        # ts_rank and ts_headline each take the query too.
+        select_params = search_params * 2
+    else:
+        return _substring_search(terms, domain_id, min_rating, max_rating, game_id, offset, limit)
+
+    count_sql = f'SELECT COUNT(*) FROM {source} WHERE {match}{where}'
+    page_sql = (
+        f'SELECT r.id, {rank} AS search_rank, {snippet} FROM {source} WHERE {match}{where} '
+        f'ORDER BY search_rank DESC, r.id LIMIT %s OFFSET %s'
+    )
+    return _run(count_sql, search_params + params, page_sql, select_params + search_params + params, offset, limit)
+
+
+def _run(count_sql, count_params, page_sql, page_params, offset, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(count_sql, count_params)
+        total = cursor.fetchone()[0]
+        if not total or offset >= total:
+            return total, []
+        cursor.execute(page_sql, page_params + [limit, offset])
+        hits = cursor.fetchall()
+    ratings = SelfRating.objects.select_related('participant__user', 'domain').in_bulk([row[0] for row in hits])
+    page = []
+    for rating_id, rank, snippet in hits:
+        rating = ratings[rating_id]
+        rating.search_rank = rank
+        rating.snippet = snippet
+        page.append(rating)
+    return total, page
+
+
+def _substring_search(terms, domain_id, min_rating, max_rating, game_id, offset, limit):
+    queryset = SelfRating.objects.select_related('participant__user', 'domain').order_by('id')
+    for word, _ in terms:
+        queryset = queryset.filter(justification__icontains=word)
+    for lookup, value in (('domain_id', domain_id), ('rating__gte', min_rating),
+                          ('rating__lte', max_rating), ('participant__game_id', game_id)):
+        if value is not None:
+            queryset = queryset.filter(**{lookup: value})
+    page = list(queryset[offset:offset + limit])
+    for rating in page:
+        rating.search_rank = 0
+        rating.snippet = rating.justification
+    return queryset.count(), page
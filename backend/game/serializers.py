@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import GameScore, Participant, Domain, SelfRating, Hostel, Action, Round
+from .models import GameScore, Participant, Domain, SelfRating, Hostel, Action, Round, HostelStanding
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -47,6 +47,45 @@ class SelfRatingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Participant has already rated this domain.")
         return data
         
+class CredentialField(serializers.CharField):
+    """A CharField that rejects numbers instead of coercing them to strings."""
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        return super().to_internal_value(data)
+
+class LoginSerializer(serializers.Serializer):
+    """Shape check for login credentials; the password itself is checked by the LoginGate."""
+    username = CredentialField()
+    password = CredentialField(trim_whitespace=False)
+
+class BulkSelfRatingItemSerializer(serializers.Serializer):
+    """
+    One entry of a bulk rating submission. Domains are checked against the cached id set
+    (context['domain_ids']) and duplicates are left to the DB unique constraint.
+    """
+    domain = serializers.IntegerField()
+    rating = serializers.IntegerField(min_value=0, max_value=10)
+    justification = serializers.CharField(max_length=500)
+
+    def validate_domain(self, value):
+        if value not in self.context['domain_ids']:
+            raise serializers.ValidationError(f"Invalid domain id {value}.")
+        return value
+
+class BulkSelfRatingSerializer(serializers.ListSerializer):
+    child = BulkSelfRatingItemSerializer()
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError("Submit at least one rating.")
+        domains = [item['domain'] for item in data]
+        repeated = sorted({d for d in domains if domains.count(d) > 1})
+        if repeated:
+            raise serializers.ValidationError(f"Domains rated more than once: {repeated}.")
+        return data
+
 class SimpleParticipantSerializer(serializers.ModelSerializer):
     """A simple serializer to list participants for delegation choices."""
     username = serializers.CharField(source='user.username', read_only=True)
@@ -119,3 +158,13 @@ class GameScoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = GameScore
         fields = ['participant', 'score']
+
+class HostelStandingSerializer(serializers.ModelSerializer):
+    """ Serializer for the hostel standings table. """
+    hostel = serializers.StringRelatedField()
+    best_participant = SimpleParticipantSerializer(read_only=True)
+    mean_score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = HostelStanding
+        fields = ['hostel', 'total_score', 'mean_score', 'participant_count', 'best_participant', 'best_score']
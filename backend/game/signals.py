@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache_versions import bump_version
+from .domains import invalidate_domain_ids
+from .models import Domain, Round
+
+
+@receiver([post_save, post_delete], sender=Round)
+def round_changed(sender, instance, **kwargs):
+    # Rounds are opened and edited through the Django admin, outside any of our views.
+    bump_version('round', instance.game_id)
+
+
+@receiver([post_save, post_delete], sender=Domain)
+def domain_changed(sender, instance, **kwargs):
+    invalidate_domain_ids()
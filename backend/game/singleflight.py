@@ -0,0 +1,198 @@
+"""
+Single-flight: concurrent requests for the same payload share one computation.
+
+Within a process, the first caller for a key (the leader) computes the value while later
+callers wait on an Event and share the leader's result, or its exception. That is all that
+happens with a per-process cache (the default LocMemCache): each process builds its own copy
+once either way.
+
+With a cache shared between processes (Redis/Memcached/file), leaders also take an flock on
+a lock file for their key, waiting up to WAIT_TIMEOUT for any other process's leader for the
+same key to finish, and then re-check the shared cache, because that process may just have
+filled it. A leader that can't get the lock in time computes without it. The kernel drops a
+holder's lock if its process dies. Lock files are removed on release.
+
+fcntl is POSIX-only; without it only in-process coalescing applies.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CROSS_PROCESS': None,  # None: only when the default cache is shared between processes
+    'LOCK_DIR': os.path.join(tempfile.gettempdir(), 'trust-game-singleflight'),
+    'WAIT_TIMEOUT': 10,     # seconds a caller waits on a leader (or a leader on the lock) before computing itself
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'SINGLE_FLIGHT', {})}
+
+
+def _cross_process(config):
+    if fcntl is None:
+        return False
+    if config['CROSS_PROCESS'] is None:
+        return not isinstance(caches['default'], (LocMemCache, DummyCache))
+    return config['CROSS_PROCESS']
+
+
+def lock_path(key, config):
+    return os.path.join(config['LOCK_DIR'], hashlib.md5(key.encode()).hexdigest() + '.lock')
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.counters = {'computed': 0, 'coalesced': 0, 'filled_by_other_process': 0, 'wait_timeouts': 0, 'lock_timeouts': 0}
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def do(self, key, compute, lookup=None):
+        """
+        Returns compute(), or the result of an identical in-flight call.
+        `lookup`, if given, is tried once the cross-process lock is held; a non-None result is
+        used instead of computing. Without the lock it isn't called (the caller just missed).
+        """
+        config = _config()
+        if not config['ENABLED']:
+            return compute()
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(config['WAIT_TIMEOUT']):
+                self._count('coalesced')
+                if call.error is not None:
+                    raise call.error
+                return call.value
+            self._count('wait_timeouts')
+            return compute()
+
+        try:
+            if _cross_process(config):
+                with _process_lock(lock_path(key, config), config['WAIT_TIMEOUT']) as held:
+                    if held.timed_out:
+                        self._count('lock_timeouts')
+                    value = self._compute(compute, lookup if held.fd is not None else None)
+            else:
+                value = self._compute(compute, None)
+            call.value = value
+            return value
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def _compute(self, compute, lookup):
+        value = lookup() if lookup is not None else None
+        if value is not None:
+            self._count('filled_by_other_process')
+            return value
+        value = compute()
+        self._count('computed')
+        return value
+
+    def metrics(self):
+        with self.lock:
+            return {**self.counters, 'in_flight': len(self.calls)}
+
+    def reset(self):
+        with self.lock:
+            self.counters = dict.fromkeys(self.counters, 0)
+
+
+class _process_lock:
+    """
+    An exclusive flock on the key's lock file, held until exit; the file is unlinked before
+    unlocking. A waiter that wakes up holding a file that was unlinked meanwhile retries on
+    the path, so two processes never hold different files for the same key.
+    The lock is polled without blocking; after `timeout` seconds the block runs unlocked
+    (fd is None and timed_out is set), so a stuck holder can't hang the request.
+    """
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self.fd = None
+        self.timed_out = False
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            while True:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                if not self._acquire(fd, deadline):
+                    os.close(fd)
+                    self.timed_out = True
+                    return self
+                try:
+                    current = os.stat(self.path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(fd).st_ino:
+                    self.fd = fd
+                    return self
+                os.close(fd)
+        except OSError:
+            # An unusable lock directory only costs the cross-process coalescing.
+            return self
+
+    @staticmethod
+    def _acquire(fd, deadline):
+        delay = 0.005
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 0.1)
+
+    def __exit__(self, *exc_info):
+        if self.fd is not None:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+flights = SingleFlight()
@@ -0,0 +1,110 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import GameScore, HostelStanding
+
+STANDINGS_CACHE_TIMEOUT = 60 * 60
+
+
+def standings_cache_key(game_id):
+    return f"hostel-standings:{game_id}"
+
+
+def invalidate_hostel_standings(game_id):
+    """
+    Drops the cached standings payload once the surrounding transaction commits,
+    so readers never cache numbers that might still be rolled back.
+    """
+    transaction.on_commit(lambda: cache.delete(standings_cache_key(game_id)))
+
+
+def apply_score_deltas(game, changes):
+    """
+    Folds one round's score changes into the materialized HostelStanding rows.
+
+    `changes` is a list of (participant, points, new_total, created) tuples, one per
+    participant whose GameScore was touched. Must be called inside the scoring
+    transaction. Only the hostels that appear in `changes` are read or written.
+    """
+    by_hostel = {}
+    for participant, points, new_total, created in changes:
+        if participant.hostel_id is None:
+            continue
+        by_hostel.setdefault(participant.hostel_id, []).append((participant.id, points, new_total, created))
+
+    if not by_hostel:
+        return
+
+    standings = {
+        s.hostel_id: s
+        for s in HostelStanding.objects.select_for_update().filter(game=game, hostel_id__in=by_hostel.keys())
+    }
+    missing = [HostelStanding(game=game, hostel_id=h_id) for h_id in by_hostel if h_id not in standings]
+    if missing:
+        for standing in HostelStanding.objects.bulk_create(missing):
+            standings[standing.hostel_id] = standing
+
+    for hostel_id, rows in by_hostel.items():
+        standing = standings[hostel_id]
+        standing.total_score += sum(points for _, points, _, _ in rows)
+        standing.participant_count += sum(1 for _, _, _, created in rows if created)
+
+        # The current leader lost points: someone outside this round's changes may
+        # now be ahead, so fall back to one indexed lookup for this hostel only.
+        leader_dropped = any(
+            p_id == standing.best_participant_id and new_total < standing.best_score
+            for p_id, _, new_total, _ in rows
+        )
+        if leader_dropped:
+            _recompute_best(standing)
+        else:
+            p_id, _, new_total, _ = max(rows, key=lambda row: row[2])
+            if standing.best_score is None or new_total > standing.best_score:
+                standing.best_participant_id = p_id
+                standing.best_score = new_total
+
+    HostelStanding.objects.bulk_update(
+        standings.values(),
+        ['total_score', 'participant_count', 'best_participant', 'best_score'],
+    )
+    invalidate_hostel_standings(game.id)
+
+
+def move_participant(participant, old_hostel_id, new_hostel_id):
+    """
+    Moves a participant's existing GameScores from one hostel's standings to another's.
+    Used when a participant changes hostel on their profile.
+    """
+    if old_hostel_id == new_hostel_id:
+        return
+
+    with transaction.atomic():
+        for score in GameScore.objects.filter(participant=participant).select_related('game'):
+            standings = HostelStanding.objects.select_for_update().filter(game=score.game)
+            if old_hostel_id is not None:
+                old = standings.filter(hostel_id=old_hostel_id).first()
+                if old:
+                    old.total_score -= score.score
+                    old.participant_count -= 1
+                    if old.best_participant_id == participant.id:
+                        old.best_participant_id = None
+                        old.best_score = None
+                        _recompute_best(old, exclude_participant_id=participant.id)
+                    old.save()
+            if new_hostel_id is not None:
+                new, _ = HostelStanding.objects.get_or_create(game=score.game, hostel_id=new_hostel_id)
+                new.total_score += score.score
+                new.participant_count += 1
+                if new.best_score is None or score.score > new.best_score:
+                    new.best_participant_id = participant.id
+                    new.best_score = score.score
+                new.save()
+            invalidate_hostel_standings(score.game_id)
+
+
+def _recompute_best(standing, exclude_participant_id=None):
+    best = GameScore.objects.filter(game_id=standing.game_id, participant__hostel_id=standing.hostel_id)
+    if exclude_participant_id is not None:
+        best = best.exclude(participant_id=exclude_participant_id)
+    best = best.order_by('-score').values_list('participant_id', 'score').first()
+    standing.best_participant_id, standing.best_score = best if best else (None, None)
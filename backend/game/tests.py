@@ -1,7 +1,44 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
-from .models import Game, Round, Participant, Action, GameScore, Domain
+import array
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from asgiref.sync import async_to_sync, sync_to_async
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, LiveServerTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from .models import Game, Round, Participant, Action, GameScore, Domain, Hostel, HostelStanding, Lobby, ArchivedAction, SelfRating, InfluenceScore, DelegationEdgeStat, SuspiciousGroup, ScoringRun, RoundRosterEntry, HistoryEntry
 from .scoring import calculate_scores_for_round
+from . import affinity, db_router, export, influence
+from .archive import archive_game
+from .cache_versions import bump_version, get_version
+from .export import ArchiveReader, export_game
+from .import_utils import read_rows
+from .lobby_utils import plan_rebalance
+from .management.commands import soak_test
+from .login import DEFAULTS as LOGIN_DEFAULTS, LoginGate, LoginRejected, get_login_gate, reset_login_gate
+from .onboarding import get_hash_pool, onboard_roster, reset_hash_pool
+from .payloads import graph_edges
+from .renderers import MEDIA_TYPE, packb, unpackb
+from .singleflight import SingleFlight, lock_path
+from .standings import standings_cache_key
+from .throttling import get_poll_throttle, reset_poll_throttle
+from .tracing import delegation_stats, scoring_trend
 
 class ScoringEngineTest(TestCase):
 
@@ -87,3 +124,1618 @@ class ScoringEngineTest(TestCase):
         self.assertEqual(score_b, -1)
         self.assertEqual(score_c, -1)
 
+
+class HostelStandingsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit", lambda_param=0.5, beta_param=0.2)
+        self.domain = Domain.objects.create(name="Logic Puzzles")
+        self.h1 = Hostel.objects.create(name="H1")
+        self.h2 = Hostel.objects.create(name="H2")
+        self.p_a = Participant.objects.create(user=User.objects.create_user('user_a'), hostel=self.h1)
+        self.p_b = Participant.objects.create(user=User.objects.create_user('user_b'), hostel=self.h1)
+        self.p_c = Participant.objects.create(user=User.objects.create_user('user_c'), hostel=self.h2)
+
+    def _play_round(self, number, answers):
+        round = Round.objects.create(game=self.game, domain=self.domain, round_number=number, question_text="Q", correct_answer="ok")
+        for participant, answer in answers:
+            Action.objects.create(round=round, participant=participant, action_type='SOLVE', submitted_answer=answer)
+        with self.captureOnCommitCallbacks(execute=True):
+            calculate_scores_for_round(round.id)
+
+    def test_standings_follow_round_deltas(self):
+        self._play_round(1, [(self.p_a, "ok"), (self.p_b, "wrong"), (self.p_c, "ok")])
+        h1 = HostelStanding.objects.get(game=self.game, hostel=self.h1)
+        self.assertEqual(h1.total_score, 0)
+        self.assertEqual(h1.participant_count, 2)
+        self.assertEqual(h1.best_participant, self.p_a)
+
+        # The leader drops below the other H1 player, so the best player must move.
+        self._play_round(2, [(self.p_a, "wrong"), (self.p_b, "ok")])
+        self._play_round(3, [(self.p_a, "wrong")])
+        h1.refresh_from_db()
+        self.assertEqual(h1.total_score, -1)
+        self.assertEqual(h1.participant_count, 2)
+        self.assertEqual(h1.best_participant, self.p_b)
+        self.assertAlmostEqual(h1.mean_score, -0.5)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_endpoint_is_cached_until_next_round(self):
+        self._play_round(1, [(self.p_a, "ok"), (self.p_c, "wrong")])
+        client = APIClient()
+        client.force_authenticate(self.p_a.user)
+        response = client.get('/api/hostel-standings/')
+        self.assertEqual([row['hostel'] for row in response.data], ["H1", "H2"])
+        self.assertIsNotNone(cache.get(standings_cache_key(self.game.id)))
+
+        self._play_round(2, [(self.p_c, "ok")])
+        self.assertIsNone(cache.get(standings_cache_key(self.game.id)))
+
+    def test_hostel_change_in_the_admin_moves_standings(self):
+        self._play_round(1, [(self.p_a, "ok"), (self.p_c, "ok")])
+        client = Client()
+        client.force_login(User.objects.create_superuser('admin', password='pw'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/admin/game/participant/{self.p_a.id}/change/', {
+                'user': self.p_a.user_id, 'hostel': self.h2.id, 'game': '', 'current_lobby': '',
+            })
+        self.assertEqual(response.status_code, 302)
+        standings = {s.hostel_id: s for s in HostelStanding.objects.filter(game=self.game)}
+        self.assertEqual((standings[self.h1.id].total_score, standings[self.h1.id].participant_count), (0, 0))
+        self.assertEqual((standings[self.h2.id].total_score, standings[self.h2.id].participant_count), (2, 2))
+
+
+class ImportQuestionsTest(TestCase):
+
+    def setUp(self):
+        self.game = Game.objects.create(name="Test Gambit")
+        self.domain = Domain.objects.create(name="Logic Puzzles")
+        Round.objects.create(game=self.game, domain=self.domain, round_number=1, question_text="Q1", correct_answer="a")
+
+    def _import(self, suffix, content, *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as handle:
+            handle.write(content)
+        err = StringIO()
+        call_command('import_questions', handle.name, '--chunk-size', '2', *args, stdout=StringIO(), stderr=err)
+        return err.getvalue()
+
+    def test_csv_import_allocates_numbers_and_creates_domains(self):
+        errors = self._import('.csv', (
+            "domain,question_text,correct_answer,round_number\n"
+            "Logic Puzzles,Q2,b,\n"
+            "Geography,Q3,c,5\n"
+            "Geography,Q4,d,\n"
+        ))
+        self.assertEqual(errors, "")
+        numbers = dict(Round.objects.filter(game=self.game).values_list('question_text', 'round_number'))
+        self.assertEqual(numbers, {"Q1": 1, "Q2": 2, "Q3": 5, "Q4": 6})
+        self.assertTrue(Domain.objects.filter(name="Geography").exists())
+
+    def test_jsonl_import_reports_bad_rows_without_aborting(self):
+        errors = self._import('.jsonl', (
+            '{"domain": "Logic Puzzles", "question_text": "Q2", "correct_answer": "b", "round_number": 1}\n'
+            'not json\n'
+            '{"domain": "Logic Puzzles", "question_text": "Q3"}\n'
+            '{"domain": "Logic Puzzles", "question_text": "Q4", "correct_answer": "d", "round_number": 2}\n'
+        ))
+        self.assertIn("Line 1: Round number 1 already exists", errors)
+        self.assertIn("Line 2: Invalid JSON", errors)
+        self.assertIn("Line 3: Missing correct_answer", errors)
+        self.assertEqual(Round.objects.filter(game=self.game).count(), 2)
+
+
+    def test_imported_rounds_are_played_in_order(self):
+        self._import('.csv', "domain,question_text,correct_answer\nLogic Puzzles,Q2,b\n")
+        lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        player = Participant.objects.create(user=User.objects.create_user('user_a'), current_lobby=lobby, game=self.game)
+        Participant.objects.create(user=User.objects.create_user('user_b'), current_lobby=lobby, game=self.game)
+        client = APIClient()
+        client.force_authenticate(player.user)
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_superuser('admin', password='pw'))
+
+        # Players see and answer the oldest open round, and end-round scores that same round.
+        self.assertEqual(client.get('/api/current-round/').data['current_round']['question_text'], "Q1")
+        client.post('/api/submit-action/', {'action_type': 'SOLVE', 'submitted_answer': 'a'})
+        self.assertEqual(Action.objects.get(participant=player).round.round_number, 1)
+        self.assertEqual(admin.post('/api/admin/end-round/').status_code, 200)
+        self.assertEqual(Action.objects.get(participant=player).points_awarded, 1)
+        self.assertEqual(client.get('/api/current-round/').data['current_round']['question_text'], "Q2")
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkOnboardingTest(TestCase):
+
+    ROSTER = (
+        "username,email,password,hostel\n"
+        "alice,alice@example.com,pw-alice,H1\n"
+        "bob,,pw-bob,\n"
+        "alice,,pw-again,H1\n"
+        "carol,,,H1\n"
+        "dave,,pw-dave,Nowhere\n"
+        "existing,,pw,\n"
+    )
+
+    def setUp(self):
+        self.hostel = Hostel.objects.create(name="H1")
+        User.objects.create_user('existing')
+        self.addCleanup(reset_hash_pool)
+
+    def test_roster_rows_are_created_or_reported(self):
+        report = onboard_roster(read_rows(StringIO(self.ROSTER), 'csv'), workers=2, chunk_size=2)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(
+            [(e['line'], e['error']) for e in report['errors']],
+            [(4, "Duplicate username in roster."), (5, "Missing password."),
+             (6, "Unknown hostel 'Nowhere'."), (7, "Username already exists.")],
+        )
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.check_password('pw-alice'))
+        self.assertEqual(alice.participant.hostel, self.hostel)
+        self.assertEqual(len(Token.objects.get(user=alice).key), 40)
+
+    @override_settings(ONBOARDING_HASH_WORKERS=0)
+    def test_admin_endpoint_accepts_roster_upload(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', password='x'))
+        upload = SimpleUploadedFile('roster.csv', self.ROSTER.encode())
+        response = client.post('/api/admin/onboard/', {'roster': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(len(response.data['errors']), 4)
+
+    @override_settings(ONBOARDING_HASH_WORKERS=0)
+    def test_admin_endpoint_rejects_non_utf8_roster(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', password='x'))
+        upload = SimpleUploadedFile('roster.csv', "username,email,password,hostel\nrené,,pw,\n".encode('latin-1'))
+        response = client.post('/api/admin/onboard/', {'roster': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Roster must be UTF-8 encoded text.')
+        self.assertFalse(User.objects.filter(username='rené').exists())
+
+    def test_imports_share_one_hash_pool(self):
+        onboard_roster(read_rows(StringIO("username,email,password,hostel\nerin,,pw,\n"), 'csv'), workers=2)
+        pool = get_hash_pool(2)
+        onboard_roster(read_rows(StringIO("username,email,password,hostel\nfrank,,pw,\n"), 'csv'), workers=2)
+        self.assertIs(get_hash_pool(2), pool)
+        self.assertTrue(User.objects.get(username='frank').check_password('pw'))
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+])
+class LoginGateTest(TransactionTestCase):
+    # Logins authenticate on the gate's pool threads, which only see committed rows.
+
+    def setUp(self):
+        reset_login_gate()
+        self.addCleanup(reset_login_gate)
+        self.user = User.objects.create_user('player', password='secret')
+        self.client = APIClient()
+
+    def test_login_returns_the_current_token(self):
+        response = self.client.post('/api/login/', {'username': 'player', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['token'], Token.objects.get(user=self.user).key)
+        # Token logins don't touch the user row, so last_login isn't written on every login.
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+        # A revoked token is never handed out again.
+        Token.objects.filter(user=self.user).delete()
+        again = self.client.post('/api/login/', {'username': 'player', 'password': 'secret'})
+        self.assertNotEqual(again.data['token'], response.data['token'])
+        self.assertEqual(again.data['token'], Token.objects.get(user=self.user).key)
+
+        metrics = get_login_gate().metrics()
+        self.assertEqual(metrics['succeeded'], 2)
+        self.assertEqual(metrics['queue_depth'], 0)
+
+    def test_bad_credentials_keep_drf_error_shape(self):
+        failed = []
+        user_login_failed.connect(lambda sender, credentials, **kwargs: failed.append(credentials['username']), weak=False, dispatch_uid='test-login-failed')
+        self.addCleanup(user_login_failed.disconnect, dispatch_uid='test-login-failed')
+
+        response = self.client.post('/api/login/', {'username': 'player', 'password': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'], ['Unable to log in with provided credentials.'])
+        self.assertEqual(get_login_gate().metrics()['failed'], 1)
+        self.assertEqual(failed, ['player'])
+
+    def test_malformed_credentials_are_rejected_before_the_gate(self):
+        for payload in ({'username': 'player', 'password': ['secret']}, {'username': 'player', 'password': 123}, {'username': 'player'}):
+            response = self.client.post('/api/login/', payload, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('password', response.data)
+        self.assertEqual(get_login_gate().metrics()['failed'], 0)
+
+    @override_settings(LOGIN_GATE={'MAX_PENDING': 0, 'RETRY_AFTER': 5})
+    def test_full_gate_sheds_logins(self):
+        reset_login_gate()
+        response = self.client.post('/api/login/', {'username': 'player', 'password': 'secret'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(get_login_gate().metrics()['rejected'], 1)
+
+    def test_timed_out_check_keeps_its_slot_until_it_finishes(self):
+        gate = LoginGate({**LOGIN_DEFAULTS, 'WORKERS': 1, 'MAX_PENDING': 1, 'TIMEOUT': 0.05})
+        self.addCleanup(gate.executor.shutdown)
+        release = threading.Event()
+        with mock.patch('game.login.authenticate', side_effect=lambda *args, **kwargs: release.wait(5) and None):
+            with self.assertRaises(LoginRejected):
+                gate.authenticate(None, 'player', 'secret')
+            # The first check is still hashing, so the gate is still full.
+            with self.assertRaises(LoginRejected):
+                gate.authenticate(None, 'player', 'secret')
+            self.assertEqual(gate.metrics()['rejected'], 1)
+            release.set()
+            gate.executor.submit(lambda: None).result()
+        self.assertEqual(gate.metrics()['in_flight'], 0)
+
+    def _login_legacy_user(self):
+        legacy = User.objects.create_user('legacy')
+        User.objects.filter(pk=legacy.pk).update(password=make_password('pw', hasher='md5'))
+        response = self.client.post('/api/login/', {'username': 'legacy', 'password': 'pw'})
+        self.assertEqual(response.status_code, 200)
+        return legacy
+
+    def test_outdated_hashes_are_upgraded(self):
+        legacy = self._login_legacy_user()
+        legacy.refresh_from_db()
+        self.assertTrue(legacy.password.startswith('pbkdf2_sha256$'))
+
+    @override_settings(LOGIN_GATE={'HASHER_UPGRADE': 'deferred', 'WORKERS': 1})
+    def test_deferred_upgrade_runs_on_the_pool(self):
+        reset_login_gate()
+        legacy = self._login_legacy_user()
+        get_login_gate().executor.submit(lambda: None).result()
+        legacy.refresh_from_db()
+        self.assertTrue(legacy.password.startswith('pbkdf2_sha256$'))
+
+    @override_settings(LOGIN_GATE={'HASHER_UPGRADE': 'never'})
+    def test_upgrade_can_be_turned_off(self):
+        reset_login_gate()
+        legacy = self._login_legacy_user()
+        legacy.refresh_from_db()
+        self.assertTrue(legacy.password.startswith('md5$'))
+
+
+class GameExportTest(TestCase):
+
+    def test_archive_round_trip(self):
+        game = Game.objects.create(name="Test Gambit")
+        domain = Domain.objects.create(name="Logic Puzzles")
+        hostel = Hostel.objects.create(name="H1")
+        p_a = Participant.objects.create(user=User.objects.create_user('user_a'), hostel=hostel)
+        p_b = Participant.objects.create(user=User.objects.create_user('user_b'))
+        round = Round.objects.create(game=game, domain=domain, round_number=1, question_text="Q1", correct_answer="ok")
+        Action.objects.create(round=round, participant=p_a, action_type='DELEGATE', delegated_to=p_b)
+        Action.objects.create(round=round, participant=p_b, action_type='SOLVE', submitted_answer="ok")
+        calculate_scores_for_round(round.id)
+
+        with tempfile.TemporaryDirectory() as directory:
+            export_game(game, directory, chunk_size=1)
+            archive = ArchiveReader(directory)
+            self.assertEqual(archive.manifest['tables']['actions']['rows'], 2)
+
+            with archive.table('participants') as table:
+                self.assertEqual(table.to_dict(), {'id': [p_a.id, p_b.id], 'username': ['user_a', 'user_b'], 'hostel': ['H1', None]})
+
+            with archive.table('actions') as table:
+                columns = table.to_dict()
+                self.assertEqual(columns['action_type'], ['DELEGATE', 'SOLVE'])
+                self.assertEqual(columns['delegated_to_id'], [p_b.id, None])
+                self.assertEqual(columns['is_solve_correct'], [None, True])
+                self.assertEqual(columns['submitted_answer'], [None, "ok"])
+                self.assertEqual(list(table.column('participant_id')), [p_a.id, p_b.id])
+                # Free-form text is stored inline rather than as a dictionary in the footer.
+                spec = next(c for c in table.footer['columns'] if c['name'] == 'submitted_answer')
+                self.assertEqual(spec['type'], 'text')
+                self.assertNotIn('dictionary', spec)
+                held = table.column('points_awarded')
+            # Closing with views still alive releases them instead of raising BufferError.
+            with self.assertRaises(ValueError):
+                held[0]
+
+    def test_archived_game_exports_the_same_tables(self):
+        game = Game.objects.create(name="Old Event", is_active=False)
+        domain = Domain.objects.create(name="Logic Puzzles")
+        p_a = Participant.objects.create(user=User.objects.create_user('user_a'))
+        p_b = Participant.objects.create(user=User.objects.create_user('user_b'))
+        round = Round.objects.create(game=game, domain=domain, round_number=1, question_text="Q1", correct_answer="ok")
+        Action.objects.create(round=round, participant=p_a, action_type='DELEGATE', delegated_to=p_b)
+        Action.objects.create(round=round, participant=p_b, action_type='SOLVE', submitted_answer="ok")
+        calculate_scores_for_round(round.id)
+
+        def exported():
+            with tempfile.TemporaryDirectory() as directory:
+                export_game(game, directory)
+                archive = ArchiveReader(directory)
+                tables = {}
+                for name in archive.tables:
+                    with archive.table(name) as table:
+                        tables[name] = table.to_dict()
+                return tables
+
+        live = exported()
+        archive_game(game)
+        game.refresh_from_db()
+        self.assertTrue(game.is_archived)
+        self.assertEqual(exported(), live)
+        self.assertEqual(len(live['actions']['id']), 2)
+        self.assertEqual(live['participants']['id'], [p_a.id, p_b.id])
+
+    def test_tables_written_with_the_other_byte_order_are_swapped(self):
+        game = Game.objects.create(name="Test Gambit")
+        hostel = Hostel.objects.create(name="H1")
+        for i, score in enumerate((1.5, -2.0)):
+            Participant.objects.create(user=User.objects.create_user(f'user_{i}'), hostel=hostel if i else None).game_scores.create(game=game, score=score)
+
+        with tempfile.TemporaryDirectory() as directory:
+            export_game(game, directory)
+            archive = ArchiveReader(directory)
+            for name in ('participants', 'scores'):
+                with archive.table(name) as table:
+                    expected, footer = table.to_dict(), table.footer
+                # Rewrite the file as a machine with the other byte order would have written it.
+                path = archive.directory / archive.manifest['tables'][name]['file']
+                data = bytearray(path.read_bytes())
+                footer_start = len(data) - len(export.MAGIC) - 8 - struct.unpack('<Q', data[-len(export.MAGIC) - 8:-len(export.MAGIC)])[0]
+                for spec in footer['columns']:
+                    start, end = spec['offset'], spec.get('data_offset', spec['offset'] + spec['length'])
+                    values = array.array(export.TYPECODES[spec['type']])
+                    values.frombytes(data[start:end])
+                    values.byteswap()
+                    data[start:end] = values.tobytes()
+                footer['byteorder'] = 'big' if sys.byteorder == 'little' else 'little'
+                encoded = json.dumps(footer).encode()
+                path.write_bytes(bytes(data[:footer_start]) + encoded + struct.pack('<Q', len(encoded)) + export.MAGIC)
+
+                with archive.table(name) as table:
+                    self.assertEqual(table.to_dict(), expected)
+                    self.assertEqual(len(table.column(table.columns[0])), 2)
+
+    def test_overflowing_dictionary_is_rewritten_as_text(self):
+        game = Game.objects.create(name="Test Gambit")
+        Hostel.objects.bulk_create([Hostel(name=f"H{i}") for i in range(5)])
+        hostels = list(Hostel.objects.order_by('id'))
+        for i in range(7):
+            Participant.objects.create(
+                user=User.objects.create_user(f'user_{i}'), hostel=hostels[i % 5] if i != 3 else None,
+            ).game_scores.create(game=game, score=0)
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch('game.export.DICTIONARY_LIMIT', 3):
+            export_game(game, directory, chunk_size=2)
+            with ArchiveReader(directory).table('participants') as table:
+                specs = {c['name']: c['type'] for c in table.footer['columns']}
+                self.assertEqual((specs['username'], specs['hostel']), ('text', 'text'))
+                hostel = table.column('hostel')
+                self.assertEqual(hostel.tolist(), ['H0', 'H1', 'H2', None, 'H4', 'H0', 'H1'])
+                self.assertEqual((hostel[3], hostel[-1]), (None, 'H1'))
+                self.assertEqual(table.to_dict()['username'], [f'user_{i}' for i in range(7)])
+
+
+class GameArchiveTest(TestCase):
+
+    def setUp(self):
+        self.game = Game.objects.create(name="Old Event")
+        domain = Domain.objects.create(name="Logic Puzzles")
+        lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.p_a = Participant.objects.create(user=User.objects.create_user('user_a'), current_lobby=lobby)
+        self.p_b = Participant.objects.create(user=User.objects.create_user('user_b'), current_lobby=lobby)
+        self.round = Round.objects.create(game=self.game, domain=domain, round_number=1, question_text="Q1", correct_answer="ok")
+        Action.objects.create(round=self.round, participant=self.p_a, action_type='DELEGATE', delegated_to=self.p_b)
+        Action.objects.create(round=self.round, participant=self.p_b, action_type='SOLVE', submitted_answer="ok")
+        calculate_scores_for_round(self.round.id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.p_a.user)
+
+    def test_active_games_cannot_be_archived(self):
+        with self.assertRaises(ValueError):
+            archive_game(self.game)
+
+    def test_archived_game_leaves_live_tables_but_stays_readable(self):
+        graph_before = self.client.get(f'/api/rounds/{self.round.id}/delegation-graph/').data
+        rounds_before = self.client.get(f'/api/rounds/?game={self.game.id}').data
+        ranking_before = list(GameScore.objects.order_by('-score').values_list('participant__user__username', flat=True))
+
+        self.game.is_active = False
+        self.game.save()
+        moved = archive_game(self.game)
+        self.assertEqual(moved, {'rounds': 1, 'actions': 2, 'scores': 2})
+        self.assertFalse(Round.objects.exists())
+        self.assertFalse(Action.objects.exists())
+        self.assertFalse(GameScore.objects.exists())
+        self.assertEqual(ArchivedAction.objects.count(), 2)
+
+        self.assertEqual(self.client.get(f'/api/rounds/{self.round.id}/delegation-graph/').data, graph_before)
+        self.assertEqual(self.client.get(f'/api/rounds/?game={self.game.id}').data, rounds_before)
+        leaderboard = self.client.get(f'/api/leaderboard/?game={self.game.id}').data
+        self.assertEqual([row['participant']['username'] for row in leaderboard], ranking_before)
+
+
+class AsyncViewsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        domain = Domain.objects.create(name="Logic Puzzles")
+        lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.p_a = Participant.objects.create(user=User.objects.create_user('user_a'), current_lobby=lobby)
+        self.p_b = Participant.objects.create(user=User.objects.create_user('user_b'), current_lobby=lobby)
+        done = Round.objects.create(game=self.game, domain=domain, round_number=1, question_text="Q1", correct_answer="ok")
+        Action.objects.create(round=done, participant=self.p_a, action_type='DELEGATE', delegated_to=self.p_b)
+        Action.objects.create(round=done, participant=self.p_b, action_type='SOLVE', submitted_answer="ok")
+        calculate_scores_for_round(done.id)
+        self.done = done
+        self.open = Round.objects.create(game=self.game, domain=domain, round_number=2, question_text="Q2", correct_answer="ok")
+        token = Token.objects.create(user=self.p_a.user)
+        self.headers = {'Authorization': f'Token {token.key}'}
+        reset_poll_throttle()
+        self.addCleanup(reset_poll_throttle)
+
+    def _paths(self):
+        return [
+            ('/api/current-round/', '/api/async/current-round/'),
+            ('/api/leaderboard/', '/api/async/leaderboard/'),
+            (f'/api/rounds/{self.done.id}/delegation-graph/', f'/api/async/rounds/{self.done.id}/delegation-graph/'),
+        ]
+
+    async def test_async_responses_match_sync_views(self):
+        for sync_path, async_path in self._paths():
+            with self.subTest(path=sync_path):
+                expected = await sync_to_async(self.client.get)(sync_path, headers=self.headers)
+                actual = await self.async_client.get(async_path, headers=self.headers)
+                self.assertEqual(actual.status_code, expected.status_code)
+                self.assertEqual(actual.content, expected.content)
+
+    async def test_async_views_negotiate_msgpack_like_sync_views(self):
+        for sync_path, async_path in self._paths():
+            with self.subTest(path=sync_path):
+                expected = await sync_to_async(self.client.get)(sync_path, headers={**self.headers, 'Accept': MEDIA_TYPE})
+                actual = await self.async_client.get(async_path, headers={**self.headers, 'Accept': MEDIA_TYPE})
+                self.assertEqual(actual['Content-Type'], MEDIA_TYPE)
+                self.assertEqual(actual.content, expected.content)
+        by_param = await self.async_client.get('/api/async/leaderboard/?format=msgpack', headers=self.headers)
+        self.assertEqual(by_param['Content-Type'], MEDIA_TYPE)
+        self.assertEqual({row['participant']['username'] for row in unpackb(by_param.content)}, {'user_a', 'user_b'})
+        self.assertEqual((await self.async_client.get('/api/async/leaderboard/', headers={**self.headers, 'Accept': 'text/csv'})).status_code, 406)
+
+    @override_settings(POLL_THROTTLE={'USER_BURST': 2, 'USER_RATE': 0.5})
+    def test_async_polls_draw_on_the_same_budget(self):
+        reset_poll_throttle()
+        get = async_to_sync(self.async_client.get)
+        self.client.get('/api/current-round/', headers=self.headers)
+        first = get('/api/async/current-round/', headers=self.headers)
+        replayed = get('/api/async/current-round/', headers=self.headers)
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed.content, first.content)
+        self.assertEqual(replayed['Retry-After'], '2')
+        self.assertEqual(get_poll_throttle().metrics()['replayed'], 1)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_async_reads_use_the_replica(self):
+        seen = []
+        original = db_router.ReplicaRouter.db_for_read
+        # Route to `default` under the replica's name so the test database serves the reads.
+        with mock.patch('game.db_router.replica_alias', return_value='default'), \
+                mock.patch('game.async_views.replica_alias', return_value='default'), \
+                mock.patch.object(db_router.ReplicaRouter, 'db_for_read',
+                                  lambda router, model, **hints: seen.append(original(router, model)) or seen[-1]):
+            response = async_to_sync(self.async_client.get)('/api/async/leaderboard/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('default', seen)
+        self.assertIsNone(db_router.current_read_alias())
+        self.assertTrue(any(key.endswith(':replica') for key in cache._cache))
+
+    async def test_async_views_require_token(self):
+        response = await self.async_client.get('/api/async/leaderboard/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_submit_invalidates_cached_graph(self):
+        path = f'/api/async/rounds/{self.open.id}/delegation-graph/'
+        self.assertEqual(async_to_sync(self.async_client.get)(path, headers=self.headers).json()['edges'], [])
+        client = APIClient()
+        client.force_authenticate(self.p_b.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/submit-action/', {'action_type': 'DELEGATE', 'delegated_to': self.p_a.id})
+        edges = async_to_sync(self.async_client.get)(path, headers=self.headers).json()['edges']
+        self.assertEqual([(e['source'], e['target']) for e in edges], [(str(self.p_b.id), str(self.p_a.id))])
+
+
+class StateSyncTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        domain = Domain.objects.create(name="Logic Puzzles")
+        self.lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.p_a = Participant.objects.create(user=User.objects.create_user('user_a'), current_lobby=self.lobby)
+        self.p_b = Participant.objects.create(user=User.objects.create_user('user_b'), current_lobby=self.lobby)
+        self.round = Round.objects.create(game=self.game, domain=domain, round_number=1, question_text="Q1", correct_answer="ok")
+        self.client = APIClient()
+        self.client.force_authenticate(self.p_a.user)
+
+    def test_only_changed_pieces_are_returned(self):
+        first = self.client.get('/api/sync/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(set(first.data['changed']), {'round', 'roster', 'leaderboard', 'graph'})
+        self.assertEqual(first.data['changed']['round']['question_text'], "Q1")
+        versions = first.data['versions']
+
+        self.assertEqual(self.client.get('/api/sync/', versions).status_code, 304)
+
+        other = APIClient()
+        other.force_authenticate(self.p_b.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.post('/api/submit-action/', {'action_type': 'DELEGATE', 'delegated_to': self.p_a.id})
+        after_submit = self.client.get('/api/sync/', versions)
+        self.assertEqual(set(after_submit.data['changed']), {'graph'})
+        self.assertEqual(len(after_submit.data['changed']['graph']['edges']), 1)
+        versions = after_submit.data['versions']
+
+        Action.objects.create(round=self.round, participant=self.p_a, action_type='SOLVE', submitted_answer="ok")
+        with self.captureOnCommitCallbacks(execute=True):
+            calculate_scores_for_round(self.round.id)
+        after_scoring = self.client.get('/api/sync/', versions)
+        self.assertEqual(set(after_scoring.data['changed']), {'round', 'leaderboard'})
+        self.assertIsNone(after_scoring.data['changed']['round'])
+
+    @override_settings(SHARED_CACHE=False)
+    def test_versions_agree_across_workers_without_a_shared_cache(self):
+        versions = self.client.get('/api/sync/').data['versions']
+        # Another worker has its own LocMemCache, with its own counters and no cached payloads.
+        cache.clear()
+        self.assertEqual(self.client.get('/api/sync/', versions).status_code, 304)
+        # A write whose bump only reached some other worker's cache still shows up.
+        Action.objects.create(round=self.round, participant=self.p_b, action_type='DELEGATE', delegated_to=self.p_a, lobby=self.lobby)
+        self.assertEqual(set(self.client.get('/api/sync/', versions).data['changed']), {'graph'})
+
+
+@override_settings(SHARED_CACHE=True)
+class SharedCacheStateSyncTest(StateSyncTest):
+    """The same flows with payloads cached under the shared version counters."""
+
+
+class ScoreHistoryTest(TestCase):
+
+    def setUp(self):
+        self.game = Game.objects.create(name="Test Gambit")
+        self.domain = Domain.objects.create(name="Logic Puzzles")
+        lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.p_a = Participant.objects.create(user=User.objects.create_user('user_a'), current_lobby=lobby)
+        self.p_b = Participant.objects.create(user=User.objects.create_user('user_b'), current_lobby=lobby)
+        self.client = APIClient()
+        self.client.force_authenticate(self.p_a.user)
+
+    def _play_round(self, number, answers):
+        round = Round.objects.create(game=self.game, domain=self.domain, round_number=number, question_text="Q", correct_answer="ok")
+        for participant, answer in answers:
+            Action.objects.create(round=round, participant=participant, action_type='SOLVE', submitted_answer=answer)
+        calculate_scores_for_round(round.id)
+
+    def test_trajectories_are_served_as_arrays(self):
+        self._play_round(1, [(self.p_a, "ok")])
+        self._play_round(2, [(self.p_a, "wrong"), (self.p_b, "ok")])
+        self._play_round(3, [(self.p_a, "wrong"), (self.p_b, "wrong")])
+
+        mine = self.client.get('/api/score-history/').data
+        self.assertEqual(mine['rounds'], [1, 2, 3])
+        self.assertEqual(mine['scores'], [1, 0, -1])
+        self.assertEqual(mine['ranks'], [1, 2, 2])
+
+        lobby = self.client.get('/api/score-history/lobby/').data
+        self.assertEqual(lobby['rounds'], [1, 2, 3])
+        by_name = {p['username']: p for p in lobby['participants']}
+        self.assertEqual(by_name['user_b']['scores'], [None, 1, 0])
+        self.assertEqual(by_name['user_b']['ranks'], [None, 1, 1])
+
+
+@override_settings(LOBBY_AFFINITY={'WORKER_INDEX': 0, 'WORKER_COUNT': 1, 'SECRET': 'shh'})
+class LobbyAffinityTest(TestCase):
+
+    def setUp(self):
+        affinity.store.reset()
+        self.addCleanup(affinity.store.reset)
+        self.game = Game.objects.create(name="Test Gambit")
+        domain = Domain.objects.create(name="Logic Puzzles")
+        self.lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.p_a = Participant.objects.create(user=User.objects.create_user('user_a'), current_lobby=self.lobby)
+        self.p_b = Participant.objects.create(user=User.objects.create_user('user_b'), current_lobby=self.lobby)
+        self.round = Round.objects.create(game=self.game, domain=domain, round_number=1, question_text="Q1", correct_answer="ok")
+        self.client = APIClient()
+        self.client.force_authenticate(self.p_a.user)
+
+    def test_owner_serves_lobby_reads_from_memory(self):
+        with override_settings(LOBBY_AFFINITY={}):
+            expected = self.client.get('/api/current-round/').data
+        self.assertEqual(self.client.get('/api/current-round/').data, expected)
+
+        # Once loaded, lobby reads never touch the DB (auth is forced here, so no token lookup either).
+        for path in ('/api/current-round/', '/api/leaderboard/', f'/api/rounds/{self.round.id}/delegation-graph/'):
+            with self.subTest(path=path), self.assertNumQueries(0):
+                self.client.get(path)
+
+    def test_submissions_write_through_to_the_owner_state(self):
+        graph_path = f'/api/rounds/{self.round.id}/delegation-graph/'
+        self.assertEqual(self.client.get(graph_path).data['edges'], [])
+        other = APIClient()
+        other.force_authenticate(self.p_b.user)
+        other.post('/api/submit-action/', {'action_type': 'DELEGATE', 'delegated_to': self.p_a.id})
+
+        self.assertTrue(Action.objects.filter(participant=self.p_b).exists())
+        self.assertEqual(
+            [(e['source'], e['target']) for e in self.client.get(graph_path).data['edges']],
+            [(str(self.p_b.id), str(self.p_a.id))],
+        )
+
+    def test_graph_keeps_actions_of_players_moved_mid_round(self):
+        graph_path = f'/api/rounds/{self.round.id}/delegation-graph/'
+        other = APIClient()
+        other.force_authenticate(self.p_b.user)
+        other.post('/api/submit-action/', {'action_type': 'DELEGATE', 'delegated_to': self.p_a.id})
+        lobby_2 = Lobby.objects.create(name="Lobby 2", game=self.game)
+        Participant.objects.filter(id=self.p_b.id).update(current_lobby=lobby_2)
+        with override_settings(LOBBY_AFFINITY={}):
+            expected = self.client.get(graph_path).data['edges']
+
+        affinity.store.reset()
+        self.assertEqual(self.client.get(graph_path).data['edges'], expected)
+        self.assertEqual([(e['source'], e['target']) for e in expected], [(str(self.p_b.id), str(self.p_a.id))])
+        self.assertEqual(affinity.store.get(lobby_2.id).actions, {})
+
+    def test_reset_requires_the_shared_secret(self):
+        affinity.store.get(self.lobby.id)
+        self.assertEqual(APIClient().post('/api/internal/lobby-state/reset/').status_code, 403)
+        self.assertIn(self.lobby.id, affinity.store.states)
+        response = APIClient().post('/api/internal/lobby-state/reset/', HTTP_X_AFFINITY_SECRET='shh')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(affinity.store.states, {})
+
+    def test_state_reloads_after_writes_that_bypass_the_router(self):
+        def roster():
+            return sorted(p['id'] for p in affinity.store.get(self.lobby.id).roster)
+
+        self.assertEqual(roster(), [self.p_a.id, self.p_b.id])
+        # A write elsewhere that bumps the roster version (here: in this process).
+        Participant.objects.filter(id=self.p_b.id).update(current_lobby=None)
+        self.assertEqual(roster(), [self.p_a.id, self.p_b.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('roster', self.lobby.id)
+        self.assertEqual(roster(), [self.p_a.id])
+
+        # A write nobody announces is picked up once the state's TTL runs out.
+        Participant.objects.filter(id=self.p_b.id).update(current_lobby=self.lobby)
+        self.assertEqual(roster(), [self.p_a.id])
+        with override_settings(LOBBY_AFFINITY={'WORKER_INDEX': 0, 'WORKER_COUNT': 1, 'STATE_TTL': 0}):
+            self.assertEqual(roster(), [self.p_a.id, self.p_b.id])
+
+
+@override_settings(SHARED_CACHE=True)
+class ReadReplicaRoutingTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        domain = Domain.objects.create(name="Logic Puzzles")
+        self.lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.p_a = Participant.objects.create(user=User.objects.create_user('user_a'), current_lobby=self.lobby)
+        self.p_b = Participant.objects.create(user=User.objects.create_user('user_b'), current_lobby=self.lobby)
+        self.round = Round.objects.create(game=self.game, domain=domain, round_number=1, question_text="Q1", correct_answer="ok")
+        self.client = APIClient()
+        self.client.force_authenticate(self.p_a.user)
+
+    def test_router_is_a_noop_without_a_replica(self):
+        self.assertIsNone(db_router.replica_alias())
+        self.assertFalse(db_router.replica_allowed(self.p_a.user))
+        self.assertIsNone(db_router.ReplicaRouter().db_for_read(Round))
+        self.assertEqual(self.client.get('/api/leaderboard/').status_code, 200)
+
+    @mock.patch('game.db_router.replica_alias', return_value='replica')
+    def test_reads_stick_to_the_primary_after_a_write(self, _alias):
+        self.assertTrue(db_router.replica_allowed(self.p_a.user))
+        self.client.post('/api/submit-action/', {'action_type': 'PASS'})
+        self.assertFalse(db_router.replica_allowed(self.p_a.user))
+        self.assertTrue(db_router.replica_allowed(self.p_b.user))
+
+    @mock.patch('game.db_router.replica_alias', return_value='replica')
+    def test_per_process_cache_keeps_reads_on_the_primary(self, _alias):
+        # Another worker couldn't see this worker's stickiness or lag markers.
+        with override_settings(SHARED_CACHE=False):
+            self.assertFalse(db_router.replica_allowed(self.p_a.user))
+        self.assertTrue(db_router.replica_allowed(self.p_a.user))
+
+    @mock.patch('game.db_router.replica_alias', return_value='replica')
+    def test_lag_sensitive_reads_avoid_the_replica_after_scoring(self, _alias):
+        Action.objects.create(round=self.round, participant=self.p_b, action_type='PASS')
+        with self.captureOnCommitCallbacks(execute=True):
+            calculate_scores_for_round(self.round.id)
+        self.assertFalse(db_router.replica_allowed(self.p_b.user, lag_sensitive=True))
+        self.assertTrue(db_router.replica_allowed(self.p_b.user, lag_sensitive=False))
+
+    def test_views_route_reads_and_restore_the_alias(self):
+        seen = []
+        original = db_router.ReplicaRouter.db_for_read
+        # Route to `default` under the replica's name so the test database serves the reads.
+        with mock.patch('game.db_router.replica_alias', return_value='default'), \
+                mock.patch.object(db_router.ReplicaRouter, 'db_for_read',
+                                  lambda router, model, **hints: seen.append(original(router, model)) or seen[-1]):
+            response = self.client.get(f'/api/rounds/{self.round.id}/delegation-graph/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('default', seen)
+        self.assertIsNone(db_router.current_read_alias())
+        # Payloads built from replica reads are cached apart from the primary's.
+        self.assertTrue(any(key.endswith(':replica') for key in cache._cache))
+
+
+class ScalableAdminTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        self.domain = Domain.objects.create(name="Logic Puzzles")
+        self.lobby_1 = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.lobby_2 = Lobby.objects.create(name="Lobby 2", game=self.game)
+        self.round = Round.objects.create(game=self.game, domain=self.domain, round_number=1, question_text="Q1")
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+
+    def _participants(self, count, start=0):
+        return [
+            Participant.objects.create(user=User.objects.create_user(f'user_{i}'), current_lobby=self.lobby_1)
+            for i in range(start, start + count)
+        ]
+
+    def test_action_changelist_queries_do_not_grow_with_rows(self):
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get('/admin/game/action/').status_code, 200)
+            return len(ctx)
+
+        for p in self._participants(3):
+            Action.objects.create(round=self.round, participant=p, action_type='PASS')
+        few = changelist_queries()
+        for p in self._participants(20, start=3):
+            Action.objects.create(round=self.round, participant=p, action_type='DELEGATE', delegated_to=p)
+        self.assertEqual(changelist_queries(), few)
+
+    def test_paginator_estimates_large_unfiltered_tables(self):
+        from .admin import EstimatedCountPaginator
+        for p in self._participants(3):
+            Action.objects.create(round=self.round, participant=p, action_type='PASS')
+        with mock.patch.object(EstimatedCountPaginator, 'EXACT_BELOW', 0):
+            with self.assertNumQueries(1):
+                self.assertEqual(EstimatedCountPaginator(Action.objects.order_by('id'), 50).count, 3)
+            # Filtered lists are still counted exactly.
+            self.assertEqual(EstimatedCountPaginator(Action.objects.filter(action_type='SOLVE'), 50).count, 0)
+
+    def test_score_rounds_action_runs_the_scoring_engine(self):
+        other = Round.objects.create(game=self.game, domain=self.domain, round_number=2, question_text="Q2", correct_answer="ok")
+        p = self._participants(1)[0]
+        Action.objects.create(round=other, participant=p, action_type='SOLVE', submitted_answer="ok")
+        version = get_version('round', self.game.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/game/round/', {
+                'action': 'score_rounds', '_selected_action': [self.round.id, other.id],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Round.objects.filter(is_completed=False).exists())
+        self.assertEqual(GameScore.objects.get(game=self.game, participant=p).score, 1)
+        self.assertEqual(ScoringRun.objects.filter(game=self.game).count(), 2)
+        self.assertNotEqual(get_version('round', self.game.id), version)
+
+    def test_a_round_scored_meanwhile_is_not_scored_twice(self):
+        p = self._participants(1)[0]
+        Action.objects.create(round=self.round, participant=p, action_type='SOLVE', submitted_answer="")
+        self.round.correct_answer = ""
+        self.round.save()
+        original_filter = Action.objects.filter
+
+        def end_round_wins_the_race(*args, **kwargs):
+            # Runs after this call's is_completed check: another request scores the round first.
+            with mock.patch.object(Action.objects, 'filter', original_filter):
+                calculate_scores_for_round(self.round.id)
+            return original_filter(*args, **kwargs)
+
+        with mock.patch.object(Action.objects, 'filter', side_effect=end_round_wins_the_race):
+            calculate_scores_for_round(self.round.id)
+        self.assertEqual(GameScore.objects.get(game=self.game, participant=p).score, 1)
+        self.assertEqual(HistoryEntry.objects.filter(participant=p).count(), 1)
+        self.assertEqual(ScoringRun.objects.filter(game=self.game).count(), 1)
+
+    def test_reassign_lobby_action(self):
+        participants = self._participants(3)
+        versions = [get_version('roster', lobby.id) for lobby in (self.lobby_1, self.lobby_2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/game/participant/', {
+                'action': 'reassign_lobby', 'lobby': self.lobby_2.id,
+                '_selected_action': [p.id for p in participants[:2]],
+            })
+        self.assertEqual(
+            list(Participant.objects.order_by('id').values_list('current_lobby_id', flat=True)),
+            [self.lobby_2.id, self.lobby_2.id, self.lobby_1.id],
+        )
+        self.assertNotEqual([get_version('roster', lobby.id) for lobby in (self.lobby_1, self.lobby_2)], versions)
+
+    def test_reassign_lobby_rejects_moves_across_games(self):
+        other_game = Game.objects.create(name="Other Gambit")
+        foreign = Lobby.objects.create(name="Lobby X", game=other_game)
+        participants = self._participants(2)
+        Participant.objects.filter(id=participants[1].id).update(game=self.game)
+        self.client.post('/admin/game/participant/', {
+            'action': 'reassign_lobby', 'lobby': foreign.id, '_selected_action': [p.id for p in participants],
+        })
+        self.assertEqual(set(Participant.objects.values_list('current_lobby_id', flat=True)), {self.lobby_1.id})
+
+        # Participants without a game or lobby of their own can join any game's lobby.
+        loose = Participant.objects.create(user=User.objects.create_user('loose'))
+        self.client.post('/admin/game/participant/', {
+            'action': 'reassign_lobby', 'lobby': foreign.id, '_selected_action': [loose.id],
+        })
+        loose.refresh_from_db()
+        self.assertEqual(loose.current_lobby_id, foreign.id)
+
+
+class BulkSelfRatingTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.domains = [Domain.objects.create(name=f"Domain {i}") for i in range(5)]
+        self.participant = Participant.objects.create(user=User.objects.create_user('user_a'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.participant.user)
+
+    def _payload(self, domains):
+        return [{'domain': d.id, 'rating': 7, 'justification': "Because."} for d in domains]
+
+    def test_creates_all_ratings_in_one_insert(self):
+        self.client.post('/api/self-ratings/bulk/', [], format='json')  # warms the domain id cache
+        # Only the bulk INSERT inside its savepoint (the forced user already carries its participant).
+        with self.assertNumQueries(3):
+            response = self.client.post('/api/self-ratings/bulk/', self._payload(self.domains), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(SelfRating.objects.filter(participant=self.participant).count(), 5)
+
+    def test_unknown_and_repeated_domains_are_rejected(self):
+        response = self.client.post('/api/self-ratings/bulk/', [{'domain': 999, 'rating': 3, 'justification': "x"}], format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/self-ratings/bulk/', self._payload(self.domains[:1] * 2), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SelfRating.objects.exists())
+
+    def test_duplicates_roll_back_the_whole_batch(self):
+        SelfRating.objects.create(participant=self.participant, domain=self.domains[2], rating=1, justification="x")
+        response = self.client.post('/api/self-ratings/bulk/', {'ratings': self._payload(self.domains)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['duplicates'], [self.domains[2].id])
+        self.assertEqual(SelfRating.objects.count(), 1)
+
+    def test_new_domains_invalidate_the_cached_set(self):
+        self.client.post('/api/self-ratings/bulk/', [], format='json')
+        extra = Domain.objects.create(name="Late Domain")
+        response = self.client.post('/api/self-ratings/bulk/', self._payload([extra]), format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class InfluenceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        self.domain = Domain.objects.create(name="Logic Puzzles")
+        self.p = [Participant.objects.create(user=User.objects.create_user(f'user_{i}')) for i in range(4)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.p[0].user)
+
+    def _score_round(self, number, delegations):
+        round_obj = Round.objects.create(game=self.game, domain=self.domain, round_number=number, question_text="Q", correct_answer="ok")
+        for p in self.p:
+            target = delegations.get(p)
+            Action.objects.create(round=round_obj, participant=p, delegated_to=target,
+                                  action_type='DELEGATE' if target else 'SOLVE', submitted_answer="ok")
+        calculate_scores_for_round(round_obj.id)
+
+    def test_chain_reach_resolves_chains_and_ignores_cycles(self):
+        reach = influence.chain_reach(range(1, 9), {1: 2, 2: 3, 4: 3, 5: 6, 6: 5, 7: 5})
+        self.assertEqual(reach, {1: 0, 2: 0, 3: 3, 4: 0, 5: 0, 6: 0, 7: 0, 8: 0})
+
+    def test_pagerank_is_a_distribution_favouring_trusted_nodes(self):
+        ranks = influence.pagerank('abcd', {('a', 'c'): 1, ('b', 'c'): 2, ('c', 'd'): 1})
+        self.assertAlmostEqual(sum(ranks.values()), 1.0)
+        self.assertEqual(max(ranks, key=ranks.get), 'd')
+        self.assertGreater(ranks['c'], ranks['a'])
+
+    def test_pure_python_fallback_matches(self):
+        edges = {(i, (i * 7 + 3) % 50): 1 + i % 3 for i in range(50)}
+        expected = influence.pagerank(range(50), edges)
+        with mock.patch.object(influence, 'np', None):
+            actual = influence.pagerank(range(50), edges)
+            self.assertEqual(influence.chain_reach(range(5), {0: 1, 1: 2}), {0: 0, 1: 0, 2: 2, 3: 0, 4: 0})
+        # Both stop within TOLERANCE of the same fixed point (here every node is on a cycle).
+        self.assertLess(sum(abs(actual[node] - expected[node]) for node in range(50)), 10 * influence.TOLERANCE)
+        self.assertAlmostEqual(sum(actual.values()), 1.0)
+
+    def test_scoring_stores_round_and_cumulative_influence(self):
+        a, b, c, d = self.p
+        self._score_round(1, {a: b, b: c})
+        self._score_round(2, {a: c, d: c})
+
+        round_1 = dict(InfluenceScore.objects.filter(game=self.game, round_number=1).values_list('participant_id', 'reach'))
+        self.assertEqual(round_1, {a.id: 0, b.id: 0, c.id: 2, d.id: 0})
+        cumulative = InfluenceScore.objects.filter(game=self.game, round_number=None)
+        self.assertEqual(cumulative.get(participant=c).reach, 4)
+
+        response = self.client.get('/api/influence/')
+        self.assertEqual(response.data['results'][0]['participant'], c.id)
+        response = self.client.get('/api/influence/', {'round': 1, 'limit': 2})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_cumulative_influence_weights_repeated_delegations(self):
+        a, b, c, d = self.p
+        self._score_round(1, {a: b, c: d})
+        self._score_round(2, {a: b})
+        self._score_round(3, {a: b, d: c})
+
+        cumulative = dict(InfluenceScore.objects.filter(game=self.game, round_number=None)
+                          .values_list('participant_id', 'pagerank'))
+        expected = influence.pagerank(cumulative, {(a.id, b.id): 3, (c.id, d.id): 1, (d.id, c.id): 1})
+        for p_id, score in expected.items():
+            self.assertAlmostEqual(cumulative[p_id], score)
+        reach = dict(InfluenceScore.objects.filter(game=self.game, round_number=None).values_list('participant_id', 'reach'))
+        self.assertEqual(reach, {a.id: 0, b.id: 3, c.id: 1, d.id: 1})
+
+
+class CollusionDetectionTest(TestCase):
+
+    def setUp(self):
+        self.game = Game.objects.create(name="Test Gambit")
+        self.domain = Domain.objects.create(name="Logic Puzzles")
+        self.p = [Participant.objects.create(user=User.objects.create_user(f'user_{i}')) for i in range(5)]
+        self.rounds = 0
+
+    def _score_round(self, delegations):
+        self.rounds += 1
+        round_obj = Round.objects.create(game=self.game, domain=self.domain, round_number=self.rounds, question_text="Q", correct_answer="ok")
+        for p in self.p:
+            target = delegations.get(p)
+            Action.objects.create(round=round_obj, participant=p, delegated_to=target,
+                                  action_type='DELEGATE' if target else 'SOLVE', submitted_answer="ok")
+        calculate_scores_for_round(round_obj.id)
+
+    def _groups(self, kind):
+        return {(g.members_key, g.strength) for g in SuspiciousGroup.objects.filter(kind=kind)}
+
+    def test_reciprocal_pairs_across_rounds_are_flagged(self):
+        a, b, c, d, _ = self.p
+        # Never a same-round cycle: a -> b in odd rounds, b -> a in even ones.
+        self._score_round({a: b, c: d})
+        self._score_round({b: a})
+        self.assertFalse(SuspiciousGroup.objects.exists())
+        self._score_round({a: b})
+        self._score_round({b: a})
+        self.assertEqual(self._groups('PAIR'), {(SuspiciousGroup.members_key_for([a.id, b.id]), 2)})
+        self.assertEqual(DelegationEdgeStat.objects.get(source=a, target=b).count, 2)
+
+    def test_three_rings_across_rounds_are_flagged(self):
+        a, b, c, _, _ = self.p
+        for _ in range(2):
+            self._score_round({a: b})
+            self._score_round({b: c})
+            self._score_round({c: a})
+        self.assertEqual(self._groups('RING'), {(SuspiciousGroup.members_key_for([a.id, b.id, c.id]), 2)})
+        self.assertFalse(self._groups('PAIR'))
+
+    def test_rings_are_found_across_lookup_chunks(self):
+        a, b, c, d, e = self.p
+        # Two rings completed in the same round, with every id lookup split into its own query.
+        with mock.patch('game.collusion.LOOKUP_CHUNK', 1):
+            for _ in range(2):
+                self._score_round({a: b, c: d})
+                self._score_round({b: e, d: a})
+                self._score_round({e: a, a: c})
+        self.assertEqual(self._groups('RING'), {
+            (SuspiciousGroup.members_key_for([a.id, b.id, e.id]), 2),
+            (SuspiciousGroup.members_key_for([a.id, c.id, d.id]), 2),
+        })
+
+    def test_admin_endpoint_lists_unreviewed_groups(self):
+        a, b, _, _, _ = self.p
+        for _ in range(2):
+            self._score_round({a: b})
+            self._score_round({b: a})
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', password='pw'))
+        response = client.get('/api/admin/collusion/', {'game': self.game.id})
+        self.assertEqual([m['username'] for m in response.data[0]['members']], ['user_0', 'user_1'])
+        SuspiciousGroup.objects.update(reviewed=True)
+        self.assertEqual(client.get('/api/admin/collusion/', {'game': self.game.id}).data, [])
+
+
+class MultiGameTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        domain = Domain.objects.create(name="Logic Puzzles")
+        self.games, self.rounds, self.players = [], [], []
+        for name in ("College A", "College B"):
+            game = Game.objects.create(name=name)
+            lobby = Lobby.objects.create(name="Lobby 1", game=game)
+            self.games.append(game)
+            self.rounds.append(Round.objects.create(game=game, domain=domain, round_number=1, question_text=f"{name} Q1", correct_answer="ok"))
+            self.players.append([
+                Participant.objects.create(user=User.objects.create_user(f'{name[-1]}{i}'), game=game, current_lobby=lobby)
+                for i in range(2)
+            ])
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create_superuser('admin', password='pw'))
+
+    def _client(self, participant):
+        client = APIClient()
+        client.force_authenticate(participant.user)
+        return client
+
+    def test_gameplay_is_scoped_to_the_participants_game(self):
+        b0, b1 = self.players[1]
+        self.assertEqual(self._client(b0).get('/api/current-round/').data['current_round']['id'], self.rounds[1].id)
+        self.assertEqual(
+            [p['id'] for p in self._client(b0).get('/api/current-round/').data['delegation_targets']], [b1.id]
+        )
+
+        response = self._client(b0).post('/api/submit-action/', {'action_type': 'SOLVE', 'submitted_answer': 'ok'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Action.objects.get(participant=b0).round, self.rounds[1])
+
+    def test_ending_a_round_needs_the_game_when_several_run(self):
+        self.assertEqual(self.admin.post('/api/admin/end-round/').status_code, 400)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.admin.post('/api/admin/end-round/', {'game_id': self.games[1].id})
+        self.assertEqual(response.status_code, 200)
+        self.rounds[0].refresh_from_db()
+        self.rounds[1].refresh_from_db()
+        self.assertEqual((self.rounds[0].is_completed, self.rounds[1].is_completed), (False, True))
+
+    def test_leaderboard_only_shows_the_lobbys_game(self):
+        a0, a1 = self.players[0]
+        GameScore.objects.create(game=self.games[0], participant=a0, score=3)
+        GameScore.objects.create(game=self.games[1], participant=a1, score=9)  # stray row from another game
+        response = self._client(a0).get('/api/leaderboard/')
+        self.assertEqual([(row['participant']['id'], row['score']) for row in response.data], [(a0.id, 3)])
+
+    def test_registration_picks_a_game(self):
+        payload = {'username': 'newbie', 'email': 'n@example.com', 'password': 'pw12345!'}
+        self.assertEqual(APIClient().post('/api/register/', payload).status_code, 400)
+        self.assertFalse(User.objects.filter(username='newbie').exists())
+        response = APIClient().post('/api/register/', dict(payload, game_id=self.games[1].id))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Participant.objects.get(id=response.data['participant_id']).game, self.games[1])
+
+
+class LobbyRebalanceTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        self.lobbies = [Lobby.objects.create(name=f"Lobby {i}", game=self.game) for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', password='pw'))
+
+    def _fill(self, sizes):
+        members = []
+        for lobby, size in zip(self.lobbies, sizes):
+            members.append([
+                Participant.objects.create(user=User.objects.create_user(f'{lobby.id}_{i}'), game=self.game, current_lobby=lobby)
+                for i in range(size)
+            ])
+        return members
+
+    def _sizes(self):
+        return [Participant.objects.filter(current_lobby=lobby).count() for lobby in self.lobbies]
+
+    def test_moves_the_fewest_participants_in_one_update(self):
+        self._fill([8, 3, 5])
+        versions = [get_version('roster', lobby.id) for lobby in self.lobbies]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/admin/rebalance-lobbies/', {'tolerance': 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['moves']), 2)
+        self.assertEqual(sorted(self._sizes()), [5, 5, 6])
+        # The untouched lobby keeps its cached roster.
+        new_versions = [get_version('roster', lobby.id) for lobby in self.lobbies]
+        self.assertEqual([old == new for old, new in zip(versions, new_versions)], [False, False, True])
+
+    def test_balanced_lobbies_and_dry_runs_change_nothing(self):
+        self._fill([4, 5, 4])
+        self.assertEqual(plan_rebalance(self.game), [])
+        Participant.objects.filter(current_lobby=self.lobbies[2]).delete()
+        response = self.client.post('/api/admin/rebalance-lobbies/', {'dry_run': True}, format='json')
+        self.assertEqual(len(response.data['moves']), 3)
+        self.assertEqual(self._sizes(), [4, 5, 0])
+
+    def test_preserving_skill_sends_strong_players_to_weak_lobbies(self):
+        strong, weak = self._fill([5, 1, 0])[:2]
+        for i, p in enumerate(strong):
+            GameScore.objects.create(game=self.game, participant=p, score=10 + i)
+        for p in weak:
+            GameScore.objects.create(game=self.game, participant=p, score=0)
+        moves = plan_rebalance(self.game, tolerance=1, preserve_skill=True)
+        # The strong lobby gives away its strongest players, and the strongest of them joins the
+        # weak lobby rather than the empty one.
+        self.assertEqual([p for p, _, _ in moves], [strong[4], strong[3], strong[2]])
+        self.assertEqual(moves[0][2], self.lobbies[1].id)
+        self.assertEqual({to for _, _, to in moves[1:]}, {self.lobbies[2].id})
+
+    def test_refuses_during_a_round(self):
+        members = self._fill([4, 1, 1])
+        round_obj = Round.objects.create(game=self.game, domain=Domain.objects.create(name="D"), round_number=1, question_text="Q")
+        Action.objects.create(round=round_obj, participant=members[0][0], action_type='PASS')
+        self.assertEqual(self.client.post('/api/admin/rebalance-lobbies/', {}, format='json').status_code, 400)
+
+
+@override_settings(POLL_THROTTLE={'USER_RATE': 0.5, 'USER_BURST': 2, 'LOBBY_RATE': 0.5, 'LOBBY_BURST': 3})
+class PollThrottleTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_poll_throttle()
+        self.addCleanup(reset_poll_throttle)
+        self.game = Game.objects.create(name="Test Gambit")
+        lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.participants = [
+            Participant.objects.create(user=User.objects.create_user(f'user_{i}'), game=self.game, current_lobby=lobby)
+            for i in range(3)
+        ]
+        Round.objects.create(game=self.game, domain=Domain.objects.create(name="Logic"), round_number=1, question_text="Q1")
+
+    def _client(self, participant):
+        client = APIClient()
+        client.force_authenticate(participant.user)
+        return client
+
+    def test_over_budget_polls_replay_the_last_response_without_queries(self):
+        client = self._client(self.participants[0])
+        first = client.get('/api/current-round/')
+        client.get('/api/current-round/')
+        with CaptureQueriesContext(connection) as queries:
+            replayed = client.get('/api/current-round/')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed.data, first.data)
+        self.assertEqual(replayed['Retry-After'], '2')
+        self.assertEqual(get_poll_throttle().metrics()['replayed'], 1)
+
+    def test_over_budget_without_a_response_to_replay_is_rejected(self):
+        throttle = get_poll_throttle()
+        user_id = self.participants[0].user_id
+        throttle.acquire([('user', user_id)])
+        throttle.acquire([('user', user_id)])
+        response = self._client(self.participants[0]).get('/api/leaderboard/')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_lobby_members_share_a_budget(self):
+        with override_settings(POLL_THROTTLE={'USER_RATE': 0.5, 'USER_BURST': 5, 'LOBBY_RATE': 0.5, 'LOBBY_BURST': 3}):
+            reset_poll_throttle()
+            clients = [self._client(p) for p in self.participants]
+            # First polls run before the caller's lobby is known and only draw on their own bucket.
+            for client in clients:
+                self.assertNotIn('Retry-After', client.get('/api/leaderboard/'))
+            for client in clients:
+                self.assertNotIn('Retry-After', client.get('/api/leaderboard/'))
+            # Every user still has tokens, but the lobby's three are spent.
+            self.assertIn('Retry-After', clients[0].get('/api/leaderboard/'))
+
+
+class SingleFlightTest(TestCase):
+
+    def setUp(self):
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        self.lock_dir = lock_dir.name
+        settings_override = override_settings(SINGLE_FLIGHT={'LOCK_DIR': lock_dir.name, 'WAIT_TIMEOUT': 5})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.flights = SingleFlight()
+
+    def _run_concurrently(self, count, compute):
+        results, errors = [], []
+
+        def request():
+            try:
+                results.append(self.flights.do('leaderboard:1', compute))
+            except Exception as exc:
+                errors.append(exc)
+        threads = [threading.Thread(target=request) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def _build_blocked_until(self, release, calls, result=None, error=None):
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            if error:
+                raise error
+            return result
+        return compute
+
+    def _wait_for_leader(self, calls):
+        # The leader is blocked in compute; give the other threads time to queue behind it.
+        deadline = time.monotonic() + 5
+        while not calls:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        time.sleep(0.1)
+
+    def test_concurrent_requests_share_one_build(self):
+        release, calls = threading.Event(), []
+        threads, results, _ = self._run_concurrently(5, self._build_blocked_until(release, calls, result=[{'score': 3}]))
+        self._wait_for_leader(calls)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[{'score': 3}]] * 5)
+        self.assertEqual(self.flights.metrics(), {'computed': 1, 'coalesced': 4, 'filled_by_other_process': 0, 'wait_timeouts': 0, 'lock_timeouts': 0, 'in_flight': 0})
+
+    def test_waiters_share_the_leaders_error(self):
+        release, calls = threading.Event(), []
+        threads, results, errors = self._run_concurrently(3, self._build_blocked_until(release, calls, error=ValueError("boom")))
+        self._wait_for_leader(calls)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(calls), results, len(errors)), (1, [], 3))
+        # Nothing stays in flight, so the next request builds afresh.
+        self.assertEqual(self.flights.do('leaderboard:1', lambda: 'ok'), 'ok')
+
+    def test_local_memory_cache_skips_the_cross_process_lock(self):
+        lookups = []
+        value = self.flights.do('leaderboard:1', lambda: 'built here', lookup=lambda: lookups.append(1))
+        self.assertEqual((value, lookups, os.listdir(self.lock_dir)), ('built here', [], []))
+
+    def test_leader_rechecks_the_cache_after_another_process_held_the_lock(self):
+        import fcntl
+        shared = {}
+        fd = os.open(lock_path('leaderboard:1', {'LOCK_DIR': self.lock_dir}), os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        def other_process_finishes():
+            time.sleep(0.2)
+            shared['leaderboard:1'] = 'built elsewhere'
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        threading.Thread(target=other_process_finishes).start()
+
+        with override_settings(SINGLE_FLIGHT={'CROSS_PROCESS': True, 'LOCK_DIR': self.lock_dir}):
+            # Locks are per key: another key isn't held up.
+            started = time.monotonic()
+            self.assertEqual(self.flights.do('leaderboard:2', lambda: 'other key'), 'other key')
+            self.assertLess(time.monotonic() - started, 0.2)
+            value = self.flights.do('leaderboard:1', lambda: 'built here', lookup=lambda: shared.get('leaderboard:1'))
+        self.assertEqual(value, 'built elsewhere')
+        self.assertEqual(self.flights.metrics()['filled_by_other_process'], 1)
+        self.assertEqual(os.listdir(self.lock_dir), [])
+
+    def test_leader_computes_unlocked_when_the_lock_is_held_too_long(self):
+        import fcntl
+        fd = os.open(lock_path('leaderboard:1', {'LOCK_DIR': self.lock_dir}), os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        self.addCleanup(os.close, fd)
+
+        lookups = []
+        with override_settings(SINGLE_FLIGHT={'CROSS_PROCESS': True, 'LOCK_DIR': self.lock_dir, 'WAIT_TIMEOUT': 0.2}):
+            started = time.monotonic()
+            value = self.flights.do('leaderboard:1', lambda: 'built here', lookup=lambda: lookups.append(1))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual((value, lookups), ('built here', []))
+        self.assertEqual(self.flights.metrics()['lock_timeouts'], 1)
+
+
+class ScoringTracingTest(TestCase):
+
+    def setUp(self):
+        self.game = Game.objects.create(name="Test Gambit")
+        lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.round = Round.objects.create(
+            game=self.game, domain=Domain.objects.create(name="Logic"), round_number=1, question_text="Q1", correct_answer="ok"
+        )
+        p = [Participant.objects.create(user=User.objects.create_user(f'user_{i}'), current_lobby=lobby) for i in range(6)]
+        # A chain 0 -> 1 -> 2 ending in a solve, and a two-cycle 3 <-> 4 that 5 delegates into.
+        Action.objects.create(round=self.round, participant=p[2], action_type='SOLVE', submitted_answer="ok")
+        for source, target in ((0, 1), (1, 2), (3, 4), (4, 3), (5, 3)):
+            Action.objects.create(round=self.round, participant=p[source], action_type='DELEGATE', delegated_to=p[target])
+
+    def test_scoring_records_phases_and_graph_stats(self):
+        with self.assertLogs('game.tracing', level='INFO') as logs:
+            calculate_scores_for_round(self.round.id)
+        run = ScoringRun.objects.get(game=self.game, round_number=1)
+        self.assertEqual(
+            [phase['name'] for phase in run.phases],
+            ['load', 'cycles', 'terminal', 'delegation', 'bonus', 'persist', 'standings', 'history', 'roster', 'collusion', 'influence'],
+        )
+        self.assertEqual(run.phases[0]['rows'], 6)
+        self.assertEqual((run.participants, run.delegations), (6, 5))
+        self.assertEqual((run.max_chain_depth, run.cycles, run.cycle_members, run.largest_cycle), (2, 1, 2, 2))
+        # Actions are loaded with their participants in one query, not one per action.
+        self.assertEqual(run.phases[0]['queries'], 1)
+        self.assertGreaterEqual(run.query_count, sum(phase['queries'] for phase in run.phases))
+        self.assertIn("Scored round 1", logs.output[0])
+
+    def test_chain_depth_ignores_chains_into_cycles(self):
+        graph = {1: 2, 2: 3, 3: 4, 5: 6, 6: 5, 7: 5, 8: 9}
+        stats = delegation_stats(graph, {frozenset({5, 6})})
+        self.assertEqual(stats, {'max_chain_depth': 3, 'cycles': 1, 'cycle_members': 2, 'largest_cycle': 2})
+
+    def test_trend_flags_phases_that_grew_per_participant(self):
+        def run(participants, delegation_ms, persist_ms):
+            phases = [{'name': 'delegation', 'ms': delegation_ms, 'queries': 0}, {'name': 'persist', 'ms': persist_ms, 'queries': 10}]
+            return ScoringRun(participants=participants, total_ms=delegation_ms + persist_ms, query_count=10, phases=phases)
+        # Newest first: the game doubled in size; persist grew with it, delegation grew faster.
+        runs = [run(200, 80, 200), run(100, 10, 100), run(100, 10, 100), run(100, 10, 100)]
+        trend = scoring_trend(runs)
+        self.assertEqual(trend['regressions'], ['delegation'])
+        self.assertEqual(trend['phases']['persist']['ratio'], 1.0)
+        self.assertEqual(scoring_trend(runs[:2])['regressions'], [])
+
+    def test_admin_endpoint_reports_runs_and_trend(self):
+        calculate_scores_for_round(self.round.id)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', password='pw'))
+        response = client.get(f'/api/admin/scoring-runs/?game={self.game.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([run['round'] for run in response.data['runs']], [1])
+        self.assertEqual(response.data['trend']['runs_compared'], 0)
+
+
+class RoundRosterSnapshotTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        self.lobby_a = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.lobby_b = Lobby.objects.create(name="Lobby 2", game=self.game)
+        self.p = [
+            Participant.objects.create(user=User.objects.create_user(f'user_{i}'), game=self.game, current_lobby=self.lobby_a)
+            for i in range(3)
+        ]
+        self.round = Round.objects.create(
+            game=self.game, domain=Domain.objects.create(name="Logic"), round_number=1, question_text="Q1", correct_answer="ok"
+        )
+
+    def _client(self, participant):
+        client = APIClient()
+        client.force_authenticate(participant.user)
+        return client
+
+    def _graph(self, participant, prefix='/api/'):
+        token, _ = Token.objects.get_or_create(user=participant.user)
+        data = Client().get(
+            f'{prefix}rounds/{self.round.id}/delegation-graph/', headers={'Authorization': f'Token {token.key}'}
+        ).json()
+        return sorted(node['id'] for node in data['nodes']), [(e['source'], e['target']) for e in data['edges']]
+
+    def test_scored_round_graph_survives_lobby_moves(self):
+        self._client(self.p[0]).post('/api/submit-action/', {'action_type': 'DELEGATE', 'delegated_to': self.p[1].id}, format='json')
+        self._client(self.p[1]).post('/api/submit-action/', {'action_type': 'SOLVE', 'submitted_answer': 'ok'}, format='json')
+        self.assertEqual(list(Action.objects.values_list('lobby_id', flat=True).distinct()), [self.lobby_a.id])
+        calculate_scores_for_round(self.round.id)
+        self.assertEqual(RoundRosterEntry.objects.filter(game=self.game, round_number=1, lobby=self.lobby_a).count(), 3)
+        before = self._graph(self.p[2])
+
+        # The delegator moves lobbies afterwards; their past round is still drawn as it was played.
+        Participant.objects.filter(id=self.p[0].id).update(current_lobby=self.lobby_b)
+        cache.clear()
+        expected = (sorted(str(p.id) for p in self.p), [(str(self.p[0].id), str(self.p[1].id))])
+        self.assertEqual(before, expected)
+        self.assertEqual(self._graph(self.p[2]), expected)
+        self.assertEqual(self._graph(self.p[0]), expected)
+        self.assertEqual(self._graph(self.p[0], prefix='/api/async/'), expected)
+
+    def test_lobby_edges_use_the_round_lobby_index(self):
+        plan = graph_edges(self.round, self.lobby_a.id).explain()
+        self.assertIn('game_action_round_i_7a09c0_idx', plan)
+
+
+class PersonalHistoryTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        self.domain = Domain.objects.create(name="Logic Puzzles")
+        lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        self.p = [
+            Participant.objects.create(user=User.objects.create_user(f'user_{i}'), game=self.game, current_lobby=lobby)
+            for i in range(6)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.p[0].user)
+
+    def _play_round(self, number, actions):
+        with self.captureOnCommitCallbacks(execute=True):
+            round = Round.objects.create(game=self.game, domain=self.domain, round_number=number, question_text="Q", correct_answer="ok")
+        for participant, action_type, extra in actions:
+            Action.objects.create(round=round, participant=participant, action_type=action_type, **extra)
+        calculate_scores_for_round(round.id)
+
+    def test_entries_record_the_resolved_chain(self):
+        p = self.p
+        self._play_round(1, [
+            (p[0], 'DELEGATE', {'delegated_to': p[1]}),
+            (p[1], 'DELEGATE', {'delegated_to': p[2]}),
+            (p[2], 'SOLVE', {'submitted_answer': 'ok'}),
+            (p[3], 'PASS', {}),
+            (p[4], 'DELEGATE', {'delegated_to': p[5]}),
+            (p[5], 'DELEGATE', {'delegated_to': p[4]}),
+        ])
+        entries = {e.participant_id: e for e in HistoryEntry.objects.filter(game=self.game, round_number=1)}
+        self.assertEqual(len(entries), 6)
+        self.assertEqual((entries[p[0].id].chain_end_id, entries[p[0].id].chain_length), (p[2].id, 2))
+        self.assertEqual(entries[p[0].id].outcome, HistoryEntry.Outcome.CORRECT)
+        self.assertEqual((entries[p[2].id].chain_end_id, entries[p[2].id].chain_length), (p[2].id, 0))
+        self.assertEqual(entries[p[3].id].outcome, HistoryEntry.Outcome.PASSED)
+        self.assertEqual(entries[p[4].id].outcome, HistoryEntry.Outcome.CYCLE)
+        self.assertIsNone(entries[p[4].id].chain_end_id)
+
+        data = self.client.get('/api/history/').data
+        self.assertEqual(data['count'], 1)
+        entry = data['results'][0]
+        self.assertEqual(entry['delegated_to'], {'id': p[1].id, 'username': 'user_1'})
+        self.assertEqual(entry['chain_end'], {'id': p[2].id, 'username': 'user_2'})
+        self.assertEqual((entry['domain'], entry['outcome']), ("Logic Puzzles", 'CORRECT'))
+        self.assertEqual(entry['score_after'], entry['points'])
+
+    @override_settings(SHARED_CACHE=True)
+    def test_pages_are_cached_until_the_next_round_closes(self):
+        for number in range(1, 4):
+            self._play_round(number, [(self.p[0], 'SOLVE', {'submitted_answer': 'ok' if number % 2 else 'no'})])
+        data = self.client.get('/api/history/', {'page': 1, 'page_size': 2}).data
+        self.assertEqual((data['count'], [e['round'] for e in data['results']]), (3, [3, 2]))
+        self.assertEqual([e['score_after'] for e in data['results']], [1, 0])
+        # The whole page comes from one indexed query plus the count.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/history/', {'page': 2, 'page_size': 2})
+        self.assertEqual(sum('game_historyentry' in q['sql'] for q in queries.captured_queries), 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/history/', {'page': 2, 'page_size': 2})
+        self.assertFalse(any('game_historyentry' in q['sql'] for q in queries.captured_queries))
+
+        self._play_round(4, [(self.p[0], 'SOLVE', {'submitted_answer': 'ok'})])
+        data = self.client.get('/api/history/', {'page': 1, 'page_size': 2}).data
+        self.assertEqual([e['round'] for e in data['results']], [4, 3])
+        self.assertEqual(self.client.get('/api/history/', {'page': 'x'}).status_code, 400)
+
+
+class MessagePackRendererTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.game = Game.objects.create(name="Test Gambit")
+        lobby = Lobby.objects.create(name="Lobby 1", game=self.game)
+        for i in range(3):
+            participant = Participant.objects.create(user=User.objects.create_user(f'user_{i}'), game=self.game, current_lobby=lobby)
+            GameScore.objects.create(game=self.game, participant=participant, score=i * 1.5)
+        self.client = APIClient()
+        self.client.force_authenticate(participant.user)
+
+    def test_round_trip_interns_repeated_keys(self):
+        data = {
+            'nodes': [{'id': str(i), 'data': {'label': f'user_{i}'}, 'position': {'x': 0, 'y': -i}} for i in range(40)],
+            'stats': [None, True, False, -1, 255, 70000, -2 ** 40, 2.5, 'é' * 40, 'x' * 300],
+        }
+        encoded = packb(data)
+        self.assertEqual(unpackb(encoded), data)
+        # Each key is spelled out once; later nodes refer to it with a single byte.
+        self.assertEqual(encoded.count(b'label'), 1)
+        self.assertEqual(unpackb(packb({1: 'a', None: 'b'})), {'1': 'a', 'null': 'b'})
+
+    def test_json_stays_the_default(self):
+        response = self.client.get('/api/leaderboard/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_binary_format_is_negotiated(self):
+        expected = self.client.get('/api/leaderboard/').json()
+        response = self.client.get('/api/leaderboard/', HTTP_ACCEPT=MEDIA_TYPE)
+        self.assertEqual(response['Content-Type'], MEDIA_TYPE)
+        self.assertEqual(unpackb(response.content), expected)
+        self.assertLess(len(response.content), len(JSONRenderer().render(expected)))
+
+    def test_binary_request_bodies_are_parsed(self):
+        domain = Domain.objects.create(name="Logic")
+        response = self.client.post(
+            '/api/self-ratings/bulk/', packb([{'domain': domain.id, 'rating': 7, 'justification': "Because."}]),
+            content_type=MEDIA_TYPE,
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/api/self-ratings/bulk/', b'\x91\xc1', content_type=MEDIA_TYPE)
+        self.assertEqual(response.status_code, 400)
+
+
+class RatingSearchTest(TestCase):
+
+    def setUp(self):
+        self.game = Game.objects.create(name="Test Gambit")
+        self.math = Domain.objects.create(name="Math")
+        self.music = Domain.objects.create(name="Music")
+        self.people = [
+            Participant.objects.create(user=User.objects.create_user(f'user_{i}'), game=self.game) for i in range(4)
+        ]
+        self.medalist = SelfRating.objects.create(
+            participant=self.people[0], domain=self.math, rating=9, justification="Competition math medalist."
+        )
+        self.hobbyist = SelfRating.objects.create(
+            participant=self.people[1], domain=self.math, rating=4,
+            justification="I did some competition prep years ago, mostly geometry, and I still enjoy math puzzles on weekends.",
+        )
+        SelfRating.objects.create(participant=self.people[2], domain=self.music, rating=8, justification="Played in math rock bands.")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', password='pw'))
+
+    def _search(self, **params):
+        response = self.client.get('/api/admin/ratings/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_results_are_ranked_and_highlighted(self):
+        data = self._search(q='competition math')
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([r['id'] for r in data['results']], [self.medalist.id, self.hobbyist.id])
+        self.assertEqual(data['results'][0]['snippet'], "[Competition] [math] medalist.")
+        self.assertGreater(data['results'][0]['rank'], data['results'][1]['rank'])
+
+    def test_filters_and_pagination(self):
+        self.assertEqual([r['id'] for r in self._search(q='math', min_rating=5, domain=self.math.id)['results']], [self.medalist.id])
+        data = self._search(q='math', page=2, page_size=2)
+        self.assertEqual((data['count'], len(data['results'])), (3, 1))
+        self.assertEqual(self._search(q='puzzl*')['results'][0]['id'], self.hobbyist.id)
+        # Operators and quotes in the input are treated as plain words.
+        self.assertEqual(self._search(q='math" OR justification:*')['count'], 0)
+        self.assertEqual(self.client.get('/api/admin/ratings/search/').status_code, 400)
+
+    def test_index_follows_bulk_writes_updates_and_deletes(self):
+        SelfRating.objects.bulk_create([
+            SelfRating(participant=self.people[3], domain=self.music, rating=6, justification="Conservatory violinist."),
+        ])
+        self.assertEqual(self._search(q='violinist')['count'], 1)
+        SelfRating.objects.filter(id=self.medalist.id).update(justification="Chess olympiad team.")
+        self.assertEqual(self._search(q='medalist')['count'], 0)
+        self.assertEqual(self._search(q='olympiads')['results'][0]['id'], self.medalist.id)
+        self.hobbyist.delete()
+        self.assertEqual(self._search(q='geometry')['count'], 0)
+
+
+class SoakTestCommandTest(LiveServerTestCase):
+
+    def _soak(self, *args):
+        out = StringIO()
+        call_command(
+            'soak_test', '--url', f'{self.live_server_url}/api', '--lobby-size', '2', '--round-seconds', '1',
+            '--submit-window', '0.5', '--poll-interval', '0.2', *args, stdout=out,
+        )
+        report = out.getvalue()
+        # Every endpoint row reports a 0.0% error rate, and no failure details follow the table.
+        table = report.split('\n\n')[0].splitlines()
+        rows = [row for row in map(str.split, table) if row and row[0] in soak_test.PHASES]
+        self.assertTrue(rows)
+        self.assertEqual([row[4] for row in rows], ['0.0%'] * len(rows), report)
+        self.assertNotRegex(report, r'\n  \w+ [\w-]+: ')
+        return report
+
+    def test_round_cycle_against_a_live_server(self):
+        report = self._soak('--players', '4', '--rounds', '2', '--keep')
+        self.assertIn('4 players (4 logged in)', report)
+        for phase, endpoint in (('open', 'current-round'), ('submit', 'submit-action'), ('leaderboard', 'leaderboard')):
+            self.assertRegex(report, rf'{phase} +{endpoint} ')
+        game = Game.objects.get(name__startswith="Soak test")
+        self.assertEqual(Lobby.objects.filter(game=game).count(), 2)
+        self.assertEqual(list(Round.objects.filter(game=game).values_list('is_completed', flat=True)), [True, True])
+        self.assertEqual(Action.objects.filter(round__game=game).count(), 8)
+
+    def test_cleans_up_without_keep(self):
+        self._soak('--players', '2', '--rounds', '1')
+        self.assertFalse(Game.objects.exists())
+        self.assertFalse(Domain.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith='soak').exists())
@@ -0,0 +1,180 @@
+"""
+Token-bucket throttling for the endpoints the client polls (current round, leaderboard).
+
+Buckets live in this worker's memory, so checking one costs a dict lookup under a lock rather
+than a cache round trip. Each poll takes a token from the caller's bucket and from their
+lobby's bucket. A caller who is over budget gets the last response this worker served them,
+with a Retry-After header, and no DB work is done. If there is no earlier response to
+replay, they get a 429.
+
+Budgets are per worker process: with N workers a client can poll up to N times the
+configured rate. That is fine for absorbing runaway tabs, which is the point of this module.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'ENABLED': True,
+    'USER_RATE': 2.0,      # tokens per second refilled into each user's bucket
+    'USER_BURST': 10,      # bucket size: polls a user can make back to back
+    'LOBBY_RATE': 50.0,    # shared by everyone in a lobby
+    'LOBBY_BURST': 200,
+    'MAX_ENTRIES': 50000,  # buckets and replayable responses kept, least recently used dropped first
+}
+
+
+class PollThrottle:
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        # key -> [tokens, last refill time]
+        self.buckets = OrderedDict()
+        # (view, user id, path) -> (lobby id, status, data) of the last response served
+        self.responses = OrderedDict()
+        self.counters = {'allowed': 0, 'replayed': 0, 'rejected': 0}
+
+    def _limits(self, key):
+        scope = 'USER' if key[0] == 'user' else 'LOBBY'
+        return self.config[f'{scope}_RATE'], self.config[f'{scope}_BURST']
+
+    def acquire(self, keys):
+        """
+        Takes one token from every bucket in `keys`, or from none of them.
+        Returns 0 on success, otherwise the seconds until all of them have a token again.
+        """
+        now = time.monotonic()
+        with self.lock:
+            wait = 0.0
+            for key in keys:
+                rate, burst = self._limits(key)
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = [float(burst), now]
+                else:
+                    bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                    bucket[1] = now
+                    self.buckets.move_to_end(key)
+                if bucket[0] < 1:
+                    wait = max(wait, (1 - bucket[0]) / rate if rate > 0 else 60.0)
+            if not wait:
+                for key in keys:
+                    self.buckets[key][0] -= 1
+            self._trim(self.buckets)
+        return wait
+
+    def check(self, response_key, user_id):
+        """
+        Admits one poll. Returns None if it may go ahead, otherwise (status, data, headers) to
+        answer with instead: the caller's last response replayed, or a 429.
+        The lobby bucket is keyed by the lobby recorded with that last response.
+        """
+        if not self.config['ENABLED']:
+            return None
+        lobby_id = self.lobby_of(response_key)
+        buckets = [('user', user_id)] + ([('lobby', lobby_id)] if lobby_id else [])
+        wait = self.acquire(buckets)
+        if not wait:
+            self.count('allowed')
+            return None
+        headers = {'Retry-After': str(math.ceil(wait))}
+        last = self.last_response(response_key)
+        if last is not None:
+            self.count('replayed')
+            return last[1], last[2], headers
+        self.count('rejected')
+        return status.HTTP_429_TOO_MANY_REQUESTS, {"detail": "Polling too fast; try again shortly."}, headers
+
+    def lobby_of(self, response_key):
+        with self.lock:
+            entry = self.responses.get(response_key)
+        return entry[0] if entry else None
+
+    def last_response(self, response_key):
+        with self.lock:
+            return self.responses.get(response_key)
+
+    def remember(self, response_key, lobby_id, status_code, data):
+        with self.lock:
+            self.responses[response_key] = (lobby_id, status_code, data)
+            self.responses.move_to_end(response_key)
+            self._trim(self.responses)
+
+    def count(self, outcome):
+        with self.lock:
+            self.counters[outcome] += 1
+
+    def _trim(self, entries):
+        while len(entries) > self.config['MAX_ENTRIES']:
+            entries.popitem(last=False)
+
+    def metrics(self):
+        with self.lock:
+            return {**self.counters, 'buckets': len(self.buckets), 'replayable_responses': len(self.responses)}
+
+
+_throttle = None
+_throttle_lock = threading.Lock()
+
+
+def get_poll_throttle():
+    """Returns the process-wide PollThrottle, built from settings.POLL_THROTTLE on first use."""
+    global _throttle
+    with _throttle_lock:
+        if _throttle is None:
+            _throttle = PollThrottle({**DEFAULTS, **getattr(settings, 'POLL_THROTTLE', {})})
+        return _throttle
+
+
+def reset_poll_throttle():
+    """Drops all buckets and remembered responses (used when settings change)."""
+    global _throttle
+    with _throttle_lock:
+        _throttle = None
+
+
+class PollThrottled(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class PollThrottleMixin:
+    """
+    For DRF polling views (async_views.py applies the same check to its async twins). The lobby
+    bucket is keyed by the lobby recorded with the caller's last response, so the check itself
+    needs no query. A caller whose first poll has not been answered yet only draws on their own
+    bucket.
+    """
+
+    def _poll_key(self, request):
+        return (type(self).__name__, request.user.pk, request.get_full_path())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        refused = get_poll_throttle().check(self._poll_key(request), request.user.pk)
+        if refused is None:
+            return
+        status_code, data, headers = refused
+        self._poll_throttled = True
+        raise PollThrottled(Response(data, status=status_code, headers=headers))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, PollThrottled):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        throttle = get_poll_throttle()
+        if throttle.config['ENABLED'] and not getattr(self, '_poll_throttled', False) and response.status_code == 200:
+            participant = getattr(request.user, 'participant', None)
+            throttle.remember(
+                self._poll_key(request),
+                participant.current_lobby_id if participant else None,
+                response.status_code, response.data,
+            )
+        return super().finalize_response(request, response, *args, **kwargs)
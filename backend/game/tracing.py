@@ -0,0 +1,167 @@
+"""
+Phase-level tracing for the scoring pipeline.
+
+calculate_scores_for_round wraps each phase in `trace.phase(name)`. Every phase records its
+wall time, the queries it ran (counted with a connection.execute_wrapper, so nothing is
+monkeypatched), and whatever row count the phase reports. One ScoringRun row is saved per
+scored round. scoring_trend() compares the latest run with earlier ones, normalized per
+participant so a game simply growing isn't reported as a regression.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from statistics import median
+
+from django.db import connection
+
+from .models import ScoringRun
+
+logger = logging.getLogger(__name__)
+
+# A phase is flagged when its latest per-participant cost is this many times its earlier median...
+REGRESSION_RATIO = 1.5
+# ...and it took at least this long (sub-millisecond phases are mostly noise).
+REGRESSION_MIN_MS = 5
+# Earlier runs needed before anything is flagged.
+TREND_MIN_RUNS = 3
+
+
+class _Phase:
+    __slots__ = ('name', 'ms', 'queries', 'rows')
+
+    def __init__(self, name):
+        self.name = name
+        self.ms = 0.0
+        self.queries = 0
+        self.rows = None
+
+
+class ScoringTrace:
+    def __init__(self):
+        self.phases = []
+        self.queries = 0
+        self._current = None
+        self._started = None
+        self.stats = {}
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        if self._current is not None:
+            self._current.queries += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def run(self):
+        """Wraps the whole scoring call: starts the clock and counts queries on this thread."""
+        self._started = time.perf_counter()
+        with connection.execute_wrapper(self._count_query):
+            yield self
+
+    @contextmanager
+    def phase(self, name):
+        phase = _Phase(name)
+        self.phases.append(phase)
+        self._current = phase
+        started = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.ms = (time.perf_counter() - started) * 1000
+            self._current = None
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self._started) * 1000
+
+    def save(self, game, round_obj):
+        """Stores the run. Called after scoring's transaction, so this insert isn't counted."""
+        run = ScoringRun.objects.create(
+            game=game,
+            round_number=round_obj.round_number,
+            total_ms=self.total_ms,
+            query_count=self.queries,
+            phases=[
+                {'name': p.name, 'ms': round(p.ms, 3), 'queries': p.queries, 'rows': p.rows}
+                for p in self.phases
+            ],
+            **self.stats,
+        )
+        logger.info(
+            "Scored round %s of game %s in %.1f ms with %d queries (%s)",
+            round_obj.round_number, game.id, run.total_ms, run.query_count,
+            ", ".join(f"{p.name} {p.ms:.1f} ms" for p in self.phases),
+        )
+        return run
+
+
+def delegation_stats(delegation_graph, cycles):
+    """
+    Chain and cycle figures for a round. `delegation_graph` maps delegator -> delegate and
+    `cycles` is a collection of member sets. Chain depth counts edges up to the first node that
+    does not delegate; chains that run into a cycle are not counted.
+    """
+    cycle_members = set().union(*cycles) if cycles else set()
+    depth = {}
+    for start in delegation_graph:
+        path = []
+        node = start
+        while node in delegation_graph and node not in depth and node not in cycle_members:
+            path.append(node)
+            node = delegation_graph[node]
+        if node in cycle_members:
+            reached = None
+        elif node in depth:
+            reached = depth[node]
+        else:
+            reached = 0
+        for node in reversed(path):
+            reached = None if reached is None else reached + 1
+            depth[node] = reached
+    return {
+        'max_chain_depth': max((d for d in depth.values() if d is not None), default=0),
+        'cycles': len(cycles),
+        'cycle_members': len(cycle_members),
+        'largest_cycle': max((len(c) for c in cycles), default=0),
+    }
+
+
+def scoring_trend(runs):
+    """
+    `runs` are a game's ScoringRuns, newest first. Compares the newest run's per-participant
+    time and query count, overall and per phase, with the median over the earlier runs.
+    """
+    if not runs:
+        return {'runs_compared': 0, 'phases': {}, 'regressions': []}
+    latest, earlier = runs[0], runs[1:]
+
+    def per_participant(run, value):
+        return value / max(run.participants, 1)
+
+    def summarize(latest_ms, latest_queries, earlier_costs):
+        entry = {
+            'latest_ms': round(latest_ms, 3),
+            'latest_queries': latest_queries,
+            'ms_per_participant': round(per_participant(latest, latest_ms), 4),
+        }
+        if earlier_costs:
+            baseline = median(earlier_costs)
+            entry['baseline_ms_per_participant'] = round(baseline, 4)
+            entry['ratio'] = round(per_participant(latest, latest_ms) / baseline, 2) if baseline else None
+        return entry
+
+    phases = {'total': summarize(
+        latest.total_ms, latest.query_count, [per_participant(r, r.total_ms) for r in earlier]
+    )}
+    for phase in latest.phases:
+        earlier_costs = [
+            per_participant(run, p['ms']) for run in earlier for p in run.phases if p['name'] == phase['name']
+        ]
+        phases[phase['name']] = summarize(phase['ms'], phase['queries'], earlier_costs)
+
+    regressions = []
+    if len(earlier) >= TREND_MIN_RUNS:
+        regressions = [
+            name for name, entry in phases.items()
+            if entry.get('ratio') and entry['ratio'] >= REGRESSION_RATIO and entry['latest_ms'] >= REGRESSION_MIN_MS
+        ]
+    return {'runs_compared': len(earlier), 'phases': phases, 'regressions': regressions}
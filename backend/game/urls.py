@@ -1,11 +1,15 @@
 from django.urls import path
+from .async_views import AsyncCurrentRoundView, AsyncDelegationGraphView, AsyncLeaderboardView
 from .views import (
     DelegationGraphView, RegisterUserView, CustomAuthToken, 
     ParticipantProfileView, DomainListView, RoundListView, 
-    SelfRatingCreateListView, HostelListView,
+    SelfRatingCreateListView, BulkSelfRatingView, HostelListView,
     CurrentRoundView, SubmitActionView,
     LeaderboardView, AdminEndRoundView, AllRatingsListView,
-    AdminAssignLobbiesView
+    AdminAssignLobbiesView, HostelStandingsView, AdminBulkOnboardView,
+    AdminLoginMetricsView, AdminPollMetricsView, AdminCoalescingMetricsView, StateSyncView,
+    ScoreHistoryView, LobbyScoreHistoryView, PersonalHistoryView, InternalLobbyStateResetView, InfluenceView,
+    AdminCollusionView, AdminRebalanceLobbiesView, AdminScoringRunsView, AdminRatingSearchView,
 )
 
 urlpatterns = [
@@ -15,16 +19,38 @@ urlpatterns = [
     path('domains/', DomainListView.as_view(), name='domain-list'),
     path('hostels/', HostelListView.as_view(), name='hostel-list'),
     path('self-ratings/', SelfRatingCreateListView.as_view(), name='self-rating-list-create'),
+    path('self-ratings/bulk/', BulkSelfRatingView.as_view(), name='self-rating-bulk'),
     path('all-ratings/', AllRatingsListView.as_view(), name='all-ratings-list'),
 
     path('current-round/', CurrentRoundView.as_view(), name='current-round'),
     path('submit-action/', SubmitActionView.as_view(), name='submit-action'),
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('hostel-standings/', HostelStandingsView.as_view(), name='hostel-standings'),
+    path('sync/', StateSyncView.as_view(), name='state-sync'),
+    path('score-history/', ScoreHistoryView.as_view(), name='score-history'),
+    path('score-history/lobby/', LobbyScoreHistoryView.as_view(), name='lobby-score-history'),
+    path('history/', PersonalHistoryView.as_view(), name='personal-history'),
+    path('influence/', InfluenceView.as_view(), name='influence'),
 
     path('rounds/', RoundListView.as_view(), name='round-list'),
     path('rounds/<int:round_id>/delegation-graph/', DelegationGraphView.as_view(), name='delegation-graph'),
     # path('lobbies/<int:lobby_id>/leaderboard/', LobbyLeaderboardView.as_view(), name='lobby-leaderboard'),
 
+    # Async variants of the hot read endpoints, for ASGI deployments (see async_views.py).
+    path('async/current-round/', AsyncCurrentRoundView.as_view(), name='async-current-round'),
+    path('async/leaderboard/', AsyncLeaderboardView.as_view(), name='async-leaderboard'),
+    path('async/rounds/<int:round_id>/delegation-graph/', AsyncDelegationGraphView.as_view(), name='async-delegation-graph'),
+
+    path('internal/lobby-state/reset/', InternalLobbyStateResetView.as_view(), name='internal-lobby-state-reset'),
+
     path('admin/end-round/', AdminEndRoundView.as_view(), name='admin-end-round'),
     path('admin/assign-lobbies/', AdminAssignLobbiesView.as_view(), name='admin-assign-lobbies'),
+    path('admin/rebalance-lobbies/', AdminRebalanceLobbiesView.as_view(), name='admin-rebalance-lobbies'),
+    path('admin/onboard/', AdminBulkOnboardView.as_view(), name='admin-bulk-onboard'),
+    path('admin/login-metrics/', AdminLoginMetricsView.as_view(), name='admin-login-metrics'),
+    path('admin/poll-metrics/', AdminPollMetricsView.as_view(), name='admin-poll-metrics'),
+    path('admin/coalescing-metrics/', AdminCoalescingMetricsView.as_view(), name='admin-coalescing-metrics'),
+    path('admin/collusion/', AdminCollusionView.as_view(), name='admin-collusion'),
+    path('admin/scoring-runs/', AdminScoringRunsView.as_view(), name='admin-scoring-runs'),
+    path('admin/ratings/search/', AdminRatingSearchView.as_view(), name='admin-rating-search'),
 ]
\ No newline at end of file
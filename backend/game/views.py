@@ -1,17 +1,76 @@
+import hashlib
+import hmac
+import io
+
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status, serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.views import APIView
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 
-from .models import Action, Game, GameScore, Participant, Domain, SelfRating, Hostel, Round, Lobby
-from .serializers import GameScoreSerializer, UserSerializer, ParticipantProfileSerializer, SelfRatingSerializer, PublicSelfRatingSerializer, HostelSerializer, RoundSerializer, SimpleParticipantSerializer, ActionSerializer
+from .models import Action, Game, GameScore, Participant, Domain, SelfRating, Hostel, Round, Lobby, HostelStanding, ScoringRun, SuspiciousGroup
+from .serializers import GameScoreSerializer, UserSerializer, ParticipantProfileSerializer, SelfRatingSerializer, PublicSelfRatingSerializer, HostelSerializer, RoundSerializer, SimpleParticipantSerializer, ActionSerializer, HostelStandingSerializer, BulkSelfRatingSerializer, LoginSerializer
 
 from .scoring import calculate_scores_for_round
-from .lobby_utils import assign_participants_to_lobbies
+from . import affinity
+from .archive import find_round, rounds_for_game, scores_for_game
+from .cache_versions import bump_version, get_version, payload_key, shared_cache
+from .db_router import ReplicaReadMixin, mark_user_write
+from .domains import domain_ids
+from .payloads import (
+    cached, current_round, delegation_graph_payload, graph_version, leaderboard_payload, roster_payload, round_lobby_id,
+    round_payload,
+)
+from .lobby_utils import assign_participants_to_lobbies, rebalance_lobbies
+from .games import GameRequired, active_game_for, default_game, game_id_for, open_rounds, require_game
+from .import_utils import detect_format, is_utf8, read_rows
+from .influence import influence_ranking
+from .login import LoginRejected, get_login_gate
+from .onboarding import onboard_roster
+from .score_history import lobby_trajectories, participant_trajectory, personal_history_page
+from .search import search_justifications
+from .standings import STANDINGS_CACHE_TIMEOUT, move_participant, standings_cache_key
+from .singleflight import flights
+from .throttling import PollThrottleMixin, get_poll_throttle
+from .tracing import scoring_trend
+
+def _game_from_param(game_id):
+    if not str(game_id).isdigit():
+        raise serializers.ValidationError({"game": "Game must be an integer id."})
+    return get_object_or_404(Game, id=game_id)
+
+def _participant_game(request):
+    """The active game the caller plays in; 404 if it has ended or they have none."""
+    game = active_game_for(request.user.participant)
+    if not game:
+        raise NotFound("No active game at the moment.")
+    return game
+
+def _admin_game(request, optional=False):
+    """
+    The game an admin request targets: game_id in the body or query, or the only active game.
+    With optional=True, None is returned instead of a 404 when no game is running.
+    """
+    game_id = request.data.get('game_id') if hasattr(request.data, 'get') else None
+    game_id = game_id or request.query_params.get('game_id')
+    if game_id is not None and not str(game_id).isdigit():
+        raise serializers.ValidationError({"game_id": "Must be an integer id."})
+    try:
+        return require_game(int(game_id) if game_id is not None else None)
+    except Game.DoesNotExist as exc:
+        if optional and game_id is None:
+            return None
+        raise NotFound(str(exc) if game_id is None else "Game not found.")
+    except GameRequired as exc:
+        raise serializers.ValidationError({"game_id": str(exc)})
 
 class RegisterUserView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -21,6 +80,18 @@ class RegisterUserView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+
+        # Players join the game they name, or the only one running.
+        game_id = request.data.get('game_id')
+        if game_id:
+            game = Game.objects.filter(id=game_id, is_active=True).first() if str(game_id).isdigit() else None
+            if game is None:
+                return Response({"game_id": "Invalid game ID provided."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            game = default_game()
+            if game is None and Game.objects.filter(is_active=True).exists():
+                return Response({"game_id": "Several games are running; choose one."}, status=status.HTTP_400_BAD_REQUEST)
+
         user = serializer.save()
 
         hostel_id = request.data.get('hostel_id')
@@ -31,7 +102,7 @@ class RegisterUserView(generics.CreateAPIView):
             except Hostel.DoesNotExist:
                 return Response({"hostel_id": "Invalid hostel ID provided."}, status=status.HTTP_400_BAD_REQUEST)
         
-        participant = Participant.objects.create(user=user, hostel=hostel)
+        participant = Participant.objects.create(user=user, hostel=hostel, game=game)
 
         token, created = Token.objects.get_or_create(user=user)
 
@@ -43,11 +114,29 @@ class RegisterUserView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED, headers=headers)
 
 class CustomAuthToken(ObtainAuthToken):
+    """
+    Logs a user in and returns their token.
+    Password checks run through the shared LoginGate (see login.py), which caps how many
+    run at once and sheds the excess with a 503 instead of tying up every worker.
+    """
     def post(self, request, *args, **kwargs):
-        serializer = self.serializer_class(data=request.data,
-                                           context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        user = serializer.validated_data['user']
+        credentials = LoginSerializer(data=request.data)
+        credentials.is_valid(raise_exception=True)
+
+        gate = get_login_gate()
+        try:
+            user = gate.authenticate(request._request, **credentials.validated_data)
+        except LoginRejected:
+            return Response(
+                {'detail': 'Too many logins in progress, please retry shortly.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(gate.config['RETRY_AFTER'])},
+            )
+        if user is None:
+            raise serializers.ValidationError(
+                {'non_field_errors': ['Unable to log in with provided credentials.']}, code='authorization'
+            )
+
         token, created = Token.objects.get_or_create(user=user)
         return Response({
             'token': token.key,
@@ -55,6 +144,36 @@ class CustomAuthToken(ObtainAuthToken):
             'username': user.username
         })
 
+class AdminLoginMetricsView(APIView):
+    """
+    An admin-only endpoint reporting login throughput and queue depth
+    for the worker process that serves the request.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_login_gate().metrics())
+
+class AdminPollMetricsView(APIView):
+    """
+    An admin-only endpoint reporting how many polls this worker process allowed, answered
+    with a replayed response, or rejected.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_poll_throttle().metrics())
+
+class AdminCoalescingMetricsView(APIView):
+    """
+    An admin-only endpoint reporting how many payload builds this worker process ran, and how
+    many requests shared another request's build instead.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(flights.metrics())
+
 class ParticipantProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = ParticipantProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -63,6 +182,7 @@ class ParticipantProfileView(generics.RetrieveUpdateAPIView):
         return self.request.user.participant
 
     def perform_update(self, serializer):
+        old_hostel_id = serializer.instance.hostel_id
         hostel_id = self.request.data.get('hostel_id')
         if hostel_id is not None:
             try:
@@ -70,7 +190,10 @@ class ParticipantProfileView(generics.RetrieveUpdateAPIView):
                 serializer.instance.hostel = hostel
             except Hostel.DoesNotExist:
                 raise serializers.ValidationError({"hostel_id": "Invalid hostel ID provided."})
-        serializer.save()
+        participant = serializer.save()
+        # Keep the materialized hostel standings in step with the move.
+        move_participant(participant, old_hostel_id, participant.hostel_id)
+        mark_user_write(self.request.user.id)
 
 class DomainListView(generics.ListAPIView):
     queryset = Domain.objects.all()
@@ -102,6 +225,40 @@ class SelfRatingCreateListView(generics.ListCreateAPIView):
             raise serializers.ValidationError("You can only submit ratings for your own participant profile.")
             
         serializer.save()
+        mark_user_write(self.request.user.id)
+
+class BulkSelfRatingView(APIView):
+    """
+    Creates all of the caller's self-ratings from one payload:
+    [{"domain": <id>, "rating": 0-10, "justification": "..."}, ...] (or {"ratings": [...]}).
+    All-or-nothing: if any domain is already rated, nothing is saved and the duplicates are listed.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        data = request.data.get('ratings') if isinstance(request.data, dict) else request.data
+        serializer = BulkSelfRatingSerializer(data=data, context={'domain_ids': domain_ids()})
+        serializer.is_valid(raise_exception=True)
+
+        participant = request.user.participant
+        domains = [item['domain'] for item in serializer.validated_data]
+        ratings = [
+            SelfRating(participant=participant, domain_id=item['domain'], rating=item['rating'], justification=item['justification'])
+            for item in serializer.validated_data
+        ]
+        try:
+            with transaction.atomic():
+                SelfRating.objects.bulk_create(ratings)
+        except IntegrityError:
+            duplicates = sorted(SelfRating.objects.filter(
+                participant=participant, domain_id__in=domains
+            ).values_list('domain_id', flat=True))
+            return Response(
+                {'error': 'Some domains are already rated.', 'duplicates': duplicates},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        mark_user_write(request.user.id)
+        return Response(SelfRatingSerializer(ratings, many=True).data, status=status.HTTP_201_CREATED)
 
 class AdminAssignLobbiesView(APIView):
     permission_classes = [IsAdminUser]
@@ -111,38 +268,99 @@ class AdminAssignLobbiesView(APIView):
         if not lobby_size or not isinstance(lobby_size, int) or lobby_size <= 0:
             return Response({'error': 'A valid integer lobby_size is required.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        result = assign_participants_to_lobbies(lobby_size)
+        result = assign_participants_to_lobbies(lobby_size, _admin_game(request))
         
         if "error" in result:
             return Response(result, status=status.HTTP_400_BAD_REQUEST)
             
         return Response(result, status=status.HTTP_200_OK)
 
-class AllRatingsListView(generics.ListAPIView):
+class AdminRebalanceLobbiesView(APIView):
+    """
+    Evens out lobby sizes between rounds with the fewest moves.
+    Body: game_id (optional with one active game), tolerance (default 1),
+    preserve_skill (default false), dry_run (default false).
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        tolerance = request.data.get('tolerance', 1)
+        if not isinstance(tolerance, int) or isinstance(tolerance, bool):
+            return Response({'error': 'tolerance must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        result = rebalance_lobbies(
+            _admin_game(request),
+            tolerance=tolerance,
+            preserve_skill=bool(request.data.get('preserve_skill', False)),
+            dry_run=bool(request.data.get('dry_run', False)),
+        )
+        if "error" in result:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+class AdminBulkOnboardView(APIView):
+    """
+    An admin-only endpoint that registers a whole roster file (CSV or JSONL) in one go.
+    Rows that fail validation are reported back without aborting the rest of the batch.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        roster = request.FILES.get('roster')
+        if not roster:
+            return Response({'error': 'A roster file is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = detect_format(roster.name, request.data.get('format'))
+        if not fmt:
+            return Response({'error': 'Roster must be a .csv or .jsonl file.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not is_utf8(roster.chunks()):
+            return Response({'error': 'Roster must be UTF-8 encoded text.'}, status=status.HTTP_400_BAD_REQUEST)
+        roster.seek(0)
+        with io.TextIOWrapper(roster.file, encoding='utf-8', newline='') as handle:
+            report = onboard_roster(read_rows(handle, fmt), game=_admin_game(request, optional=True))
+
+        return Response(report, status=status.HTTP_200_OK)
+
+class AllRatingsListView(ReplicaReadMixin, generics.ListAPIView):
     """
     Provides a public, read-only list of all self-ratings from all participants.
     """
     queryset = SelfRating.objects.all().select_related('participant__user', 'domain')
     serializer_class = PublicSelfRatingSerializer
     permission_classes = [IsAuthenticated] # Only logged-in users can see this
+
+    def get_queryset(self):
+        # Only the ratings of players in the caller's game.
+        game_id = game_id_for(self.request.user.participant)
+        queryset = super().get_queryset()
+        return queryset.filter(participant__game_id=game_id) if game_id else queryset
     
 class HostelListView(generics.ListAPIView):
     queryset = Hostel.objects.all()
     serializer_class = HostelSerializer
     permission_classes = [AllowAny]
 
-class CurrentRoundView(APIView):
+class CurrentRoundView(PollThrottleMixin, APIView):
     """
     Provides the details for the current active round and a list of participants.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        active_game = Game.objects.filter(is_active=True).first()
-        if not active_game:
-            return Response({"detail": "No active game at the moment."}, status=404)
-
-        current_round = Round.objects.filter(game=active_game, is_completed=False).order_by('-round_number').first()
+        participant = request.user.participant
+        if affinity.owns(participant.current_lobby_id):
+            # This worker owns the lobby: answer from its in-memory state.
+            state = affinity.store.get(participant.current_lobby_id)
+            if state.round is None:
+                return Response({"detail": "No active round at the moment."}, status=status.HTTP_404_NOT_FOUND)
+            return Response({
+                'current_round': state.round,
+                'delegation_targets': [p for p in state.roster if p['id'] != participant.id],
+            })
+
+        active_game = _participant_game(request)
+
+        current_round = open_rounds(active_game.id).first()
         if not current_round:
             return Response({"detail": "No active round at the moment."}, status=status.HTTP_404_NOT_FOUND)
         
@@ -179,11 +397,11 @@ class SubmitActionView(generics.CreateAPIView):
     def get_serializer_context(self):
         # Pass the current round to the serializer for validation
         context = super().get_serializer_context()
-        active_game = Game.objects.filter(is_active=True).first()
+        active_game = active_game_for(self.request.user.participant)
         if not active_game:
             raise serializers.ValidationError("No active game to submit an action for.")
         
-        current_round = Round.objects.filter(is_completed=False).order_by('-round_number').first()
+        current_round = open_rounds(active_game.id).first()
         if not current_round:
             # This should ideally be handled with a custom exception
             raise serializers.ValidationError("No active round available to submit an action for.")
@@ -194,10 +412,18 @@ class SubmitActionView(generics.CreateAPIView):
         current_round = self.get_serializer_context()['round']
         
         # Automatically associate the action with the current participant and round
-        serializer.save(
-            participant=self.request.user.participant,
-            round=current_round
+        participant = self.request.user.participant
+        action = serializer.save(
+            participant=participant,
+            round=current_round,
+            lobby_id=participant.current_lobby_id,
         )
+        bump_version('graph', current_round.id, participant.current_lobby_id)
+        # Read-your-writes: this user's graph reads go to the primary for a while.
+        mark_user_write(self.request.user.id)
+        if affinity.owns(participant.current_lobby_id):
+            # Write-through: the DB row is saved, now keep the owner's copy in step.
+            affinity.store.get(participant.current_lobby_id).record_action(current_round.id, participant.id, action.delegated_to_id)
 
 # class LeaderboardView(generics.ListAPIView):
 #     """
@@ -215,37 +441,271 @@ class SubmitActionView(generics.CreateAPIView):
         
 #         return GameScore.objects.filter(game=active_game).order_by('-score')
 
-class LeaderboardView(APIView):
+class LeaderboardView(PollThrottleMixin, ReplicaReadMixin, APIView):
     """
     Provides the leaderboard for the currently logged-in user's lobby.
     The lobby is determined automatically from the user's profile.
     """
     permission_classes = [IsAuthenticated]
+    replica_lag_sensitive = True
 
     def get(self, request, *args, **kwargs):
+        game_id = request.query_params.get('game')
+        if game_id:
+            # Final standings of a specific (possibly archived) game.
+            game = _game_from_param(game_id)
+            if game.is_archived:
+                queryset = scores_for_game(game).select_related('participant__user').order_by('-score')
+                return Response(GameScoreSerializer(queryset, many=True).data)
+
         participant = request.user.participant
+        if not game_id and affinity.owns(participant.current_lobby_id):
+            return Response(affinity.store.get(participant.current_lobby_id).leaderboard)
+
         lobby = participant.current_lobby
 
         if not lobby:
             # If the user isn't in a lobby, return an empty list.
             return Response([], status=status.HTTP_200_OK)
 
-        # Get all scores for participants who are in the user's lobby
+        if not game_id or str(lobby.game_id) == game_id:
+            # The lobby's own game: cached per leaderboard version, one build per version.
+            return Response(leaderboard_payload(lobby.id))
+
+        # Get all scores for participants who are in the user's lobby, in the requested game
         queryset = GameScore.objects.filter(participant__current_lobby=lobby).order_by('-score')
+        queryset = queryset.filter(game=game) if game_id else queryset.filter(game_id=lobby.game_id)
         
         # Serialize the data and return it
         serializer = GameScoreSerializer(queryset, many=True)
         return Response(serializer.data)
     
+class HostelStandingsView(APIView):
+    """
+    Provides the hostel-level standings for the caller's game.
+    Served from the materialized HostelStanding table and, with a shared cache, cached until the
+    next round is scored or someone changes hostel.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        active_game = _participant_game(request)
+
+        def build():
+            queryset = HostelStanding.objects.filter(game=active_game).select_related(
+                'hostel', 'best_participant__user'
+            ).order_by('-total_score')
+            return HostelStandingSerializer(queryset, many=True).data
+
+        # The cached copy is dropped on every change, which only reaches all workers through a shared cache.
+        if not shared_cache():
+            return Response(build())
+        key = standings_cache_key(active_game.id)
+        data = cache.get(key)
+        if data is None:
+            data = build()
+            cache.set(key, data, STANDINGS_CACHE_TIMEOUT)
+        return Response(data)
+
+class ScoreHistoryView(APIView):
+    """
+    Returns the logged-in participant's score and rank after every scored round of their game,
+    as parallel arrays.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        active_game = _participant_game(request)
+        return Response(participant_trajectory(active_game, request.user.participant))
+
+class LobbyScoreHistoryView(APIView):
+    """
+    Returns score and rank trajectories for everyone in the logged-in participant's lobby.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        active_game = _participant_game(request)
+        lobby_id = request.user.participant.current_lobby_id
+        if not lobby_id:
+            return Response({"detail": "You are not in a lobby."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(lobby_trajectories(active_game, lobby_id))
+
+class PersonalHistoryView(APIView):
+    """
+    The logged-in participant's rounds, newest first: what they did, who they trusted, where the
+    chain ended and what it earned. Query params: ?page=<n>, ?page_size=<n> (default 20).
+    Cached per page until the next round of their game closes.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request, *args, **kwargs):
+        page, page_size = request.query_params.get('page', '1'), request.query_params.get('page_size', '20')
+        if not page.isdigit() or not page_size.isdigit():
+            raise serializers.ValidationError("page and page_size must be integers.")
+        page = max(int(page), 1)
+        page_size = min(max(int(page_size), 1), self.MAX_PAGE_SIZE)
+
+        active_game = _participant_game(request)
+        participant = request.user.participant
+        def build():
+            total, entries = personal_history_page(active_game, participant, (page - 1) * page_size, page_size)
+            return {'count': total, 'page': page, 'page_size': page_size, 'results': entries}
+        key = payload_key('history', participant.id, active_game.id, page, page_size, get_version('round', active_game.id))
+        return Response(cached(key, build))
+
+class InfluenceView(APIView):
+    """
+    Ranks participants by transitive trust influence (PageRank over delegations, plus chain reach).
+    Query params: ?game=<id> (default: the caller's game), ?round=<number> (default: all rounds), ?limit=<n>.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_LIMIT = 500
+
+    def get(self, request, *args, **kwargs):
+        game_id = request.query_params.get('game')
+        game = _game_from_param(game_id) if game_id else _participant_game(request)
+        round_number, limit = request.query_params.get('round'), request.query_params.get('limit', '50')
+        if (round_number is not None and not round_number.isdigit()) or not limit.isdigit():
+            raise serializers.ValidationError("round and limit must be integers.")
+        round_number = int(round_number) if round_number is not None else None
+        limit = min(int(limit), self.MAX_LIMIT)
+
+        # Influence only changes when a round is scored, which bumps the game's round version.
+        key = payload_key('influence', game.id, round_number, limit, get_version('round', game.id))
+        data = cached(key, lambda: influence_ranking(game, round_number, limit))
+        return Response({'game': game.id, 'round': round_number, 'results': data})
+
+class AdminCollusionView(APIView):
+    """
+    Lists reciprocal pairs and delegation rings that keep repeating across rounds, strongest first.
+    Query params: ?game=<id> (default: the only active game), ?kind=PAIR|RING, ?include_reviewed=1.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        game_id = request.query_params.get('game')
+        game = _game_from_param(game_id) if game_id else _admin_game(request)
+        groups = SuspiciousGroup.objects.filter(game=game).order_by('-strength', '-last_round_number')
+        kind = request.query_params.get('kind')
+        if kind:
+            if kind not in SuspiciousGroup.Kind.values:
+                raise serializers.ValidationError({"kind": f"Must be one of {SuspiciousGroup.Kind.values}."})
+            groups = groups.filter(kind=kind)
+        if request.query_params.get('include_reviewed') != '1':
+            groups = groups.filter(reviewed=False)
+
+        groups = list(groups)
+        usernames = dict(Participant.objects.filter(
+            id__in={p_id for group in groups for p_id in group.member_ids}
+        ).values_list('id', 'user__username'))
+        return Response([
+            {
+                'id': group.id,
+                'kind': group.kind,
+                'members': [{'id': p_id, 'username': usernames.get(p_id)} for p_id in group.member_ids],
+                'strength': group.strength,
+                'first_round': group.first_round_number,
+                'last_round': group.last_round_number,
+                'reviewed': group.reviewed,
+            }
+            for group in groups
+        ])
+
+class AdminRatingSearchView(APIView):
+    """
+    Full-text search over self-rating justifications, best matches first.
+    Query params: ?q=<terms> (required; every term must match, a trailing * matches a prefix),
+    ?domain=<id>, ?min_rating=<n>, ?max_rating=<n>, ?game=<id>, ?page=<n>, ?page_size=<n>.
+    """
+    permission_classes = [IsAdminUser]
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        query = params.get('q', '').strip()
+        if not query:
+            raise serializers.ValidationError({"q": "A search query is required."})
+        numbers = {}
+        for name, default in (('domain', None), ('min_rating', None), ('max_rating', None),
+                              ('game', None), ('page', '1'), ('page_size', '20')):
+            value = params.get(name, default)
+            if value is not None and not value.isdigit():
+                raise serializers.ValidationError({name: "Must be a non-negative integer."})
+            numbers[name] = int(value) if value is not None else None
+        page = max(numbers['page'], 1)
+        page_size = min(max(numbers['page_size'], 1), self.MAX_PAGE_SIZE)
+
+        total, ratings = search_justifications(
+            query, domain_id=numbers['domain'], min_rating=numbers['min_rating'], max_rating=numbers['max_rating'],
+            game_id=numbers['game'], offset=(page - 1) * page_size, limit=page_size,
+        )
+        return Response({
+            'count': total,
+            'page': page,
+            'page_size': page_size,
+            'results': [
+                {
+                    'id': rating.id,
+                    'participant': {'id': rating.participant_id, 'username': rating.participant.user.username},
+                    'domain': rating.domain.name,
+                    'rating': rating.rating,
+                    'justification': rating.justification,
+                    'snippet': rating.snippet,
+                    'rank': rating.search_rank,
+                }
+                for rating in ratings
+            ],
+        })
+
+class AdminScoringRunsView(APIView):
+    """
+    Phase timings and query counts of recent scoring runs, newest first, with a trend report
+    that flags phases whose per-participant cost has grown against earlier rounds.
+    Query params: ?game=<id> (default: the only active game), ?limit=<n> (default 20).
+    """
+    permission_classes = [IsAdminUser]
+    MAX_LIMIT = 200
+
+    def get(self, request, *args, **kwargs):
+        game_id = request.query_params.get('game')
+        game = _game_from_param(game_id) if game_id else _admin_game(request)
+        limit = request.query_params.get('limit', '20')
+        if not limit.isdigit():
+            raise serializers.ValidationError("limit must be an integer.")
+        runs = list(ScoringRun.objects.filter(game=game).order_by('-round_number', '-id')[:min(int(limit), self.MAX_LIMIT)])
+        return Response({
+            'runs': [
+                {
+                    'round': run.round_number,
+                    'created_at': run.created_at,
+                    'total_ms': run.total_ms,
+                    'query_count': run.query_count,
+                    'participants': run.participants,
+                    'delegations': run.delegations,
+                    'max_chain_depth': run.max_chain_depth,
+                    'cycles': run.cycles,
+                    'cycle_members': run.cycle_members,
+                    'largest_cycle': run.largest_cycle,
+                    'phases': run.phases,
+                }
+                for run in runs
+            ],
+            'trend': scoring_trend(runs),
+        })
+
 class AdminEndRoundView(APIView):
     """
-    An admin-only endpoint to trigger the scoring for the current active round.
+    An admin-only endpoint to trigger the scoring for the current active round of a game.
+    Pass game_id when several games are running.
     """
     permission_classes = [IsAdminUser]
 
     def post(self, request, *args, **kwargs):
         # Find the current round to be ended
-        current_round = Round.objects.filter(is_completed=False).order_by('round_number').first()
+        game = _admin_game(request)
+        current_round = open_rounds(game.id).first()
 
         if not current_round:
             return Response({'error': 'No active round to end.'}, status=status.HTTP_404_NOT_FOUND)
@@ -255,50 +715,114 @@ class AdminEndRoundView(APIView):
         
         return Response({'status': f'Scoring successfully initiated for round {current_round.round_number}.'})
 
-class RoundListView(generics.ListAPIView):
+class RoundListView(ReplicaReadMixin, generics.ListAPIView):
     """
     Provides a list of all rounds, with the newest first.
     Useful for selecting a round to view its delegation graph.
     """
-    queryset = Round.objects.all().order_by('-round_number')
     serializer_class = RoundSerializer
     permission_classes = [IsAuthenticated]
 
-class DelegationGraphView(APIView):
+    def get_queryset(self):
+        # ?game=<id> lists one game's rounds, including games that have been archived.
+        game_id = self.request.query_params.get('game')
+        if game_id:
+            return rounds_for_game(_game_from_param(game_id)).order_by('-round_number')
+        # Otherwise the rounds of the caller's own game.
+        game_id = game_id_for(self.request.user.participant)
+        if game_id is None:
+            game = default_game()
+            game_id = game.id if game else None
+        return Round.objects.filter(game_id=game_id).order_by('-round_number')
+
+class DelegationGraphView(ReplicaReadMixin, APIView):
     """
     Returns the data needed to draw a trust graph for a specific round.
     """
     permission_classes = [IsAuthenticated]
+    replica_lag_sensitive = True
 
     def get(self, request, round_id, *args, **kwargs):
-        try:
-            round_obj = Round.objects.get(id=round_id)
-        except Round.DoesNotExist:
+        lobby_id = request.user.participant.current_lobby_id
+        if affinity.owns(lobby_id):
+            state = affinity.store.get(lobby_id)
+            if state.round_id == round_id:
+                return Response(state.delegation_graph())
+
+        # Rounds of archived games are served from the archive tables.
+        round_obj = find_round(round_id)
+        if round_obj is None:
             return Response({"detail": "Round not found."}, status=status.HTTP_404_NOT_FOUND)
         
-        user_lobby = request.user.participant.current_lobby
-        if not user_lobby:
+        # Scored rounds are drawn for the lobby the caller was in at the time.
+        round_lobby = round_lobby_id(round_obj, request.user.participant)
+        if not round_lobby:
             return Response({"detail": "You are not in a lobby."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 1. Get ALL participants in the lobby to serve as the nodes.
-        all_lobby_participants = Participant.objects.filter(current_lobby=user_lobby).select_related('user')
-        nodes = [{'id': str(p.id), 'data': {'label': p.user.username}, 'position': {'x': 0, 'y': 0}} for p in all_lobby_participants]
-        
-        # 2. Get only the actions from that lobby for the specific round to create the edges.
-        actions = Action.objects.filter(
-            round=round_obj, 
-            participant__current_lobby=user_lobby
-        ).select_related('participant', 'delegated_to')
-
-        edges = []
-        for action in actions:
-            if action.action_type == Action.ActionType.DELEGATE and action.delegated_to:
-                edges.append({
-                    'id': f"e-{action.participant.id}-{action.delegated_to.id}",
-                    'source': str(action.participant.id),
-                    'target': str(action.delegated_to.id),
-                    'animated': True,
-                })
-        
-        return Response({'nodes': nodes, 'edges': edges})
+        # Nodes are the lobby's members in that round; edges are the lobby's delegations in it.
+        return Response(delegation_graph_payload(round_obj, round_lobby))
+
+class InternalLobbyStateResetView(APIView):
+    """
+    Called by the lobby router after admin writes so affinity workers drop their in-memory lobby state.
+    Authenticated by the shared LOBBY_AFFINITY secret rather than a user token.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
 
+    def post(self, request, *args, **kwargs):
+        secret = settings.LOBBY_AFFINITY.get('SECRET')
+        if not secret or not hmac.compare_digest(request.headers.get('X-Affinity-Secret', '').encode(), secret.encode()):
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        affinity.store.reset(request.data.get('lobby_id'))
+        return Response({'status': 'reset'})
+
+def _content_version(data):
+    return hashlib.blake2b(JSONRenderer().render(data), digest_size=8).hexdigest()
+
+class StateSyncView(APIView):
+    """
+    One poll for the whole gameplay dashboard.
+    The client sends the versions it last saw (?round=&roster=&leaderboard=&graph=) and gets back
+    only the pieces whose version moved, or 304 Not Modified when nothing did.
+    The graph piece is the delegation graph of the open round, or of the latest round if none is open.
+    Without a cache shared by all workers the version counters differ between workers, so every
+    piece is built and versioned by a digest of its content instead.
+    """
+    permission_classes = [IsAuthenticated]
+    PIECES = ('round', 'roster', 'leaderboard', 'graph')
+
+    def get(self, request, *args, **kwargs):
+        active_game = _participant_game(request)
+        lobby_id = request.user.participant.current_lobby_id
+
+        builders = {'round': (get_version('round', active_game.id), lambda: round_payload(active_game))}
+        if lobby_id:
+            graph_round = current_round(active_game) or Round.objects.filter(game=active_game).order_by('-round_number').first()
+            builders['roster'] = (get_version('roster', lobby_id), lambda: roster_payload(lobby_id))
+            builders['leaderboard'] = (get_version('leaderboard', lobby_id), lambda: leaderboard_payload(lobby_id))
+            if graph_round:
+                builders['graph'] = (
+                    graph_version(graph_round.id, lobby_id),
+                    lambda: dict(delegation_graph_payload(graph_round, lobby_id), round_id=graph_round.id),
+                )
+
+        if shared_cache():
+            versions = {piece: str(builders[piece][0]) if piece in builders else None for piece in self.PIECES}
+            changed = {
+                piece: builders[piece][1]()
+                for piece in builders
+                if request.query_params.get(piece) != versions[piece]
+            }
+        else:
+            built = {piece: build() for piece, (_, build) in builders.items()}
+            versions = {piece: _content_version(built[piece]) if piece in built else None for piece in self.PIECES}
+            changed = {piece: data for piece, data in built.items() if request.query_params.get(piece) != versions[piece]}
+        # A piece that disappeared (e.g. the player left their lobby) also counts as a change.
+        for piece in self.PIECES:
+            if piece not in builders and request.query_params.get(piece):
+                changed[piece] = None
+
+        if not changed:
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return Response({'versions': versions, 'changed': changed})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -92,6 +93,42 @@ DATABASES = {
     }
 }
 
+# Optional read replica for the heavy read endpoints (see game/db_router.py). Locally, point
+# TRUST_GAME_REPLICA_DB at a second SQLite file and refresh it with `manage.py refresh_replica`.
+if os.environ.get("TRUST_GAME_REPLICA_DB"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["TRUST_GAME_REPLICA_DB"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["game.db_router.ReplicaRouter"]
+
+# Cache versions, cached payloads and the read-replica markers must be visible to every worker
+# process, so deployments with more than one worker set TRUST_GAME_REDIS_URL (needs the `redis`
+# package). Without it each process has its own LocMemCache, and game/cache_versions.py turns
+# payload caching off (SHARED_CACHE True/False overrides that check).
+if os.environ.get("TRUST_GAME_REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["TRUST_GAME_REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+SHARED_CACHE = None
+
+READ_REPLICA = {
+    "ALIAS": "replica",
+    # Reads stay on the primary this long after a user's own write.
+    "STICKY_SECONDS": 10,
+    # Upper bound on replica lag; lag-sensitive reads avoid the replica this long after scoring.
+    "MAX_LAG_SECONDS": 5,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -138,4 +175,69 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication",
     ],
+    # JSON stays first so clients that don't ask for the binary format get the same bytes as before.
+    # The MessagePack codec (game/renderers.py) is pure Python: it trades server CPU for bandwidth,
+    # encoding somewhat slower than JSON for payloads about a third the size.
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "game.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+        "game.renderers.MessagePackParser",
+    ],
+}
+
+# Login burst handling (see game/login.py).
+LOGIN_GATE = {
+    "WORKERS": 4,
+    "MAX_PENDING": 64,
+    "TIMEOUT": 10,
+    "RETRY_AFTER": 2,
+    # When an outdated password hash is upgraded: "inline", "deferred" (after the login returns) or "never".
+    "HASHER_UPGRADE": "inline",
+}
+
+# Logins and the admin check passwords through the gate's hasher-upgrade policy.
+AUTHENTICATION_BACKENDS = ["game.login.UpgradePolicyBackend"]
+
+# Token buckets for the polled gameplay endpoints (see game/throttling.py).
+# Rates are tokens per second; a poll over budget replays the caller's last response.
+POLL_THROTTLE = {
+    "ENABLED": True,
+    "USER_RATE": 2.0,
+    "USER_BURST": 10,
+    "LOBBY_RATE": 50.0,
+    "LOBBY_BURST": 200,
+}
+
+# Coalescing of concurrent payload builds (see game/singleflight.py). Builds are coalesced
+# across worker processes too (per-key lock files in LOCK_DIR) only when the default cache is
+# shared between them; CROSS_PROCESS True/False overrides that check.
+SINGLE_FLIGHT = {
+    "ENABLED": True,
+    "WAIT_TIMEOUT": 10,
+}
+
+# Optional lobby-affinity mode (see game/affinity.py and the run_lobby_router command).
+# Each worker is started with its own LOBBY_AFFINITY_WORKER index; WORKER_COUNT 0 disables it.
+LOBBY_AFFINITY = {
+    "WORKER_INDEX": int(os.environ.get("LOBBY_AFFINITY_WORKER", "-1")),
+    "WORKER_COUNT": int(os.environ.get("LOBBY_AFFINITY_WORKERS", "0")),
+    "SECRET": os.environ.get("LOBBY_AFFINITY_SECRET", ""),
+    # Seconds before a worker reloads a lobby's state even if nothing told it to.
+    "STATE_TTL": 30,
+}
+
+# Scoring reports each round's phase timings on the "game" logger (see game/tracing.py).
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "game": {"handlers": ["console"], "level": os.environ.get("TRUST_GAME_LOG_LEVEL", "INFO")},
+    },
 }
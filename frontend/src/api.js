@@ -49,6 +49,9 @@ async function request(path, { method = "GET", body, auth = true } = {}) {
 
   console.log(`${BASE}${path}`, path, { method, body }, "=>", res.status, data);
 
+  // 304 Not Modified (from /sync/) means the caller's copy is still current.
+  if (res.status === 304) return null;
+
   if (!res.ok) {
     const message = (data && (data.detail || data.error)) || res.statusText;
     throw new Error(message || "Request failed");
@@ -82,11 +85,40 @@ export const apiSubmitAction = (payload) =>
   request("/submit-action/", { method: "POST", body: payload });
 
 export const apiLeaderboard = () => request("/leaderboard/");
+export const apiHostelStandings = () => request("/hostel-standings/");
+export const apiScoreHistory = () => request("/score-history/");
+export const apiLobbyScoreHistory = () => request("/score-history/lobby/");
+export const apiHistory = ({ page = 1, pageSize = 20 } = {}) =>
+  request(`/history/?page=${page}&page_size=${pageSize}`);
 export const apiRounds = () => request("/rounds/");
 export const apiRoundGraph = (roundId) =>
   request(`/rounds/${roundId}/delegation-graph/`);
 
+/* Influence ranking; omit `round` for the whole game. */
+export const apiInfluence = ({ game, round, limit } = {}) => {
+  const params = new URLSearchParams();
+  if (game != null) params.set("game", game);
+  if (round != null) params.set("round", round);
+  if (limit != null) params.set("limit", limit);
+  const query = params.toString();
+  return request(`/influence/${query ? `?${query}` : ""}`);
+};
+
+/* State sync: pass the `versions` from the previous response ({} on the first call).
+   Resolves to { versions, changed } with only the changed pieces, or null if nothing changed. */
+export const apiSyncState = (versions = {}) => {
+  const params = new URLSearchParams();
+  for (const [piece, version] of Object.entries(versions)) {
+    if (version != null) params.set(piece, version);
+  }
+  const query = params.toString();
+  return request(`/sync/${query ? `?${query}` : ""}`);
+};
+
 export const apiPostSelfRatings = (payload) =>
   request("/self-ratings/", { method: "POST", body: payload });
+/* ratings: [{ domain, rating, justification }, ...]. All-or-nothing; a 400 lists `duplicates`. */
+export const apiPostSelfRatingsBulk = (ratings) =>
+  request("/self-ratings/bulk/", { method: "POST", body: ratings });
 export const apiGetSelfRatings = () => request("/self-ratings/");
 export const apiGetAllRatings = () => request("/all-ratings/");